@@ -1,8 +1,12 @@
 from django.contrib import admin
+from django.db import transaction
+
 from .models import (
     Operario, Administrador, Ecoladrillo, Material, 
     RegistroEcoladrillo, RetiroEcoladrillo, RegistroMaterial, Reporte,
-    ReporteStockFecha, ReporteResumenInventario, ReporteResumenRetiros
+    ReporteStockFecha, ReporteResumenInventario, ReporteResumenRetiros,
+    StockDiarioEcoladrillo, StockDiarioMaterial, MovimientoDiarioEcoladrillo, MovimientoDiarioMaterial,
+    TrabajoReporte
 )
 
 @admin.register(Operario)
@@ -18,8 +22,19 @@ class AdministradorAdmin(admin.ModelAdmin):
     search_fields = ('nombre', 'email')
     ordering = ('nombre',)
 
+class CambiaInventarioAdmin(admin.ModelAdmin):
+    """
+    Borra de a uno para que cada borrado aumente la versión del inventario (y en los
+    movimientos devuelva su stock); el borrado masivo del admin no pasa por delete()
+    """
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for objeto in queryset:
+                objeto.delete()
+
 @admin.register(Ecoladrillo)
-class EcoladrilloAdmin(admin.ModelAdmin):
+class EcoladrilloAdmin(CambiaInventarioAdmin):
     list_display = ('id_ecoladrillo', 'nombre', 'size', 'material_principal', 'cantidad_material_requerida', 'cantidad')
     search_fields = ('nombre',)
     list_filter = ('size', 'material_principal')
@@ -27,14 +42,14 @@ class EcoladrilloAdmin(admin.ModelAdmin):
     readonly_fields = ('cantidad',)  # El stock se maneja automáticamente
 
 @admin.register(Material)
-class MaterialAdmin(admin.ModelAdmin):
+class MaterialAdmin(CambiaInventarioAdmin):
     list_display = ('id_insumo', 'nombre', 'tipo', 'cantidad_disponible', 'unidad_medida')
     search_fields = ('nombre', 'tipo')
     list_filter = ('tipo', 'unidad_medida')
     ordering = ('nombre',)
 
 @admin.register(RegistroEcoladrillo)
-class RegistroEcoladrilloAdmin(admin.ModelAdmin):
+class RegistroEcoladrilloAdmin(CambiaInventarioAdmin):
     list_display = ('id_registro', 'fecha', 'ecoladrillo', 'cantidad')
     search_fields = ('ecoladrillo__nombre',)
     list_filter = ('fecha', 'ecoladrillo')
@@ -42,7 +57,7 @@ class RegistroEcoladrilloAdmin(admin.ModelAdmin):
     ordering = ('-fecha',)
 
 @admin.register(RetiroEcoladrillo)
-class RetiroEcoladrilloAdmin(admin.ModelAdmin):
+class RetiroEcoladrilloAdmin(CambiaInventarioAdmin):
     list_display = ('id_retiro', 'fecha', 'ecoladrillo', 'cantidad', 'motivo')
     search_fields = ('ecoladrillo__nombre', 'motivo')
     list_filter = ('fecha', 'ecoladrillo')
@@ -50,13 +65,57 @@ class RetiroEcoladrilloAdmin(admin.ModelAdmin):
     ordering = ('-fecha',)
 
 @admin.register(RegistroMaterial)
-class RegistroMaterialAdmin(admin.ModelAdmin):
+class RegistroMaterialAdmin(CambiaInventarioAdmin):
     list_display = ('id_registro_material', 'fecha', 'material', 'cantidad', 'origen')
     search_fields = ('material__nombre', 'origen')
     list_filter = ('fecha', 'material')
     date_hierarchy = 'fecha'
     ordering = ('-fecha',)
 
+@admin.register(StockDiarioEcoladrillo)
+class StockDiarioEcoladrilloAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'ecoladrillo', 'cantidad')
+    search_fields = ('ecoladrillo__nombre',)
+    list_filter = ('fecha',)
+    date_hierarchy = 'fecha'
+    ordering = ('-fecha',)
+    readonly_fields = ('fecha', 'ecoladrillo', 'cantidad')  # Se generan con el comando generar_stock_diario
+
+@admin.register(StockDiarioMaterial)
+class StockDiarioMaterialAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'material', 'cantidad')
+    search_fields = ('material__nombre',)
+    list_filter = ('fecha',)
+    date_hierarchy = 'fecha'
+    ordering = ('-fecha',)
+    readonly_fields = ('fecha', 'material', 'cantidad')
+
+@admin.register(MovimientoDiarioEcoladrillo)
+class MovimientoDiarioEcoladrilloAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'ecoladrillo', 'producido', 'retirado')
+    search_fields = ('ecoladrillo__nombre',)
+    list_filter = ('fecha',)
+    date_hierarchy = 'fecha'
+    ordering = ('-fecha',)
+    readonly_fields = ('fecha', 'ecoladrillo', 'producido', 'retirado')  # Se mantienen con cada movimiento
+
+@admin.register(MovimientoDiarioMaterial)
+class MovimientoDiarioMaterialAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'material', 'recibido', 'consumido')
+    search_fields = ('material__nombre',)
+    list_filter = ('fecha',)
+    date_hierarchy = 'fecha'
+    ordering = ('-fecha',)
+    readonly_fields = ('fecha', 'material', 'recibido', 'consumido')
+
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(admin.ModelAdmin):
+    list_display = ('id_trabajo', 'tipo_reporte', 'estado', 'progreso', 'intentos', 'fecha_creacion', 'reporte')
+    list_filter = ('estado', 'tipo_reporte')
+    date_hierarchy = 'fecha_creacion'
+    ordering = ('-fecha_creacion',)
+    readonly_fields = ('procesador', 'intentos', 'fecha_creacion', 'fecha_inicio', 'fecha_fin')
+
 @admin.register(Reporte)
 class ReporteAdmin(admin.ModelAdmin):
     list_display = ('id_reporte', 'tipo_reporte', 'fecha_generacion', 'operario')
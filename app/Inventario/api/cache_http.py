@@ -0,0 +1,202 @@
+import hashlib
+from collections import namedtuple
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from ..cache import cache_render_reportes
+from ..metricas import medir
+from ..models import Reporte, VersionInventario
+
+# Operario de una representación que no lo incluye (la consulta no trajo la relación)
+SIN_OPERARIO = object()
+
+RenderReporte = namedtuple('RenderReporte', 'contenido tipo_contenido etag operario')
+RepresentacionReporte = namedtuple('RepresentacionReporte', 'datos operario')
+
+
+class ETagInventarioMixin:
+    """
+    GET condicionales para las acciones cuyo resultado solo depende del inventario.
+
+    El ETag sale de la versión de las tablas de `tablas_etag` (VersionInventario; todas si
+    no se indica ninguna), la URL completa y el Accept pedido. Si el cliente envía
+    If-None-Match con ese ETag, se responde 304 tras leer solo la versión, sin consultar
+    las tablas del catálogo ni serializar. Con Cache-Control: no-cache el navegador
+    revalida en cada consulta periódica y reutiliza su copia mientras nada cambie.
+
+    La comparación se hace en el manejador de la acción, después de la autenticación, los
+    permisos y el throttling de DRF: un 304 nunca evita esos controles.
+
+    Límite: la versión solo aumenta con los cambios que pasan por los modelos (save(),
+    delete() y los métodos de stock). Un QuerySet.update() o delete() o SQL directo sobre
+    esas tablas no la cambia, y hasta el siguiente cambio registrado el ETag anterior
+    sigue validando la copia del cliente.
+    """
+    acciones_con_etag = ()
+    tablas_etag = ()
+
+    def etag_inventario(self, request, version):
+        clave = '|'.join((str(version), request.get_full_path(), request.headers.get('Accept', '')))
+        # Débil: identifica la misma representación, no los mismos bytes (el JSON se arma de nuevo)
+        return f'W/"{hashlib.sha1(clave.encode()).hexdigest()}"'
+
+    def dispatch(self, request, *args, **kwargs):
+        metodo = request.method.lower()
+        if metodo not in ('get', 'head') or self.action_map.get(metodo) not in self.acciones_con_etag:
+            return super().dispatch(request, *args, **kwargs)
+
+        # as_view() ya dejó el manejador de la acción en el atributo del método HTTP
+        setattr(self, metodo, self._con_etag(getattr(self, metodo)))
+        # La versión se lee antes que los datos: si cambian en medio, el ETag queda viejo y la
+        # siguiente consulta trae la respuesta nueva (nunca se valida contenido desactualizado).
+        # La acción reutiliza esa misma versión para sus cachés y conteos.
+        with VersionInventario.leida_una_vez():
+            return super().dispatch(request, *args, **kwargs)
+
+    def _con_etag(self, manejador):
+        """Envuelve el manejador para responder 304 si el ETag del cliente sigue vigente"""
+        def condicional(request, *args, **kwargs):
+            etag = self.etag_inventario(request, VersionInventario.actual(*self.tablas_etag))
+            respuesta = get_conditional_response(request, etag=etag)
+            if isinstance(respuesta, HttpResponseNotModified):
+                respuesta['ETag'] = etag
+            else:
+                respuesta = manejador(request, *args, **kwargs)
+                if 200 <= respuesta.status_code < 300:
+                    respuesta['ETag'] = etag
+            patch_vary_headers(respuesta, ('Accept',))
+            patch_cache_control(respuesta, no_cache=True)
+            return respuesta
+        return condicional
+
+
+def operario_de_reporte(reporte):
+    """Nombre del operario ya cargado con el reporte (None si no tiene), o SIN_OPERARIO si no se cargó"""
+    campo = Reporte._meta.get_field('operario')
+    # Con select_subclasses() el operario queda en la instancia de Reporte a la que apunta el subtipo
+    enlace = reporte._meta.get_ancestor_link(Reporte)
+    base = enlace.get_cached_value(reporte, default=None) if enlace else None
+    if not campo.is_cached(reporte) and not (base and campo.is_cached(base)):
+        return SIN_OPERARIO
+    return reporte.operario.nombre if reporte.operario else None
+
+
+def _generado(reporte):
+    # generar_* crea el reporte con datos_reporte vacío y lo llena después: eso no se guarda
+    return 'datos_reporte' in reporte.get_deferred_fields() or bool(reporte.datos_reporte)
+
+
+def _vigente(id_reporte, operario):
+    """El reporte sigue existiendo y su operario tiene el nombre con que se armó la representación"""
+    fila = Reporte.objects.filter(pk=id_reporte).values_list('operario__nombre').first()
+    return fila is not None and (operario is SIN_OPERARIO or fila[0] == operario)
+
+
+class RenderReporteMixin:
+    """
+    Sirve el detalle de los reportes generados desde los bytes de la respuesta ya armada.
+
+    Un reporte no cambia después de que generar_* llena datos_reporte: la respuesta JSON de
+    cada URL (con sus ?fields=, ?omit= y ?completo=) y Accept se arma una vez por proceso y
+    queda en cache_render_reportes, acotada por cantidad y por bytes. Antes de servirla solo
+    se lee el nombre del operario por la clave primaria: si el reporte se borró la entrada se
+    descarta y la vista responde 404, y si el operario cambió de nombre o se borró la
+    respuesta se arma de nuevo.
+
+    La caché se consulta en el manejador de la acción, después de la autenticación, los
+    permisos y el throttling de DRF. El ETag es fuerte (sha1 de los bytes) y Cache-Control:
+    private, no-cache hace que el navegador revalide cada vez, así un borrado o un cambio
+    de permisos se nota en la consulta siguiente.
+    """
+    acciones_inmutables = ()
+
+    def get_object(self):
+        self._reporte_renderizado = super().get_object()
+        return self._reporte_renderizado
+
+    def dispatch(self, request, *args, **kwargs):
+        metodo = request.method.lower()
+        if (metodo in ('get', 'head') and str(kwargs.get('pk', '')).isdigit()
+                and self.action_map.get(metodo) in self.acciones_inmutables):
+            # as_view() ya dejó el manejador de la acción en el atributo del método HTTP
+            setattr(self, metodo, self._desde_render(getattr(self, metodo)))
+        return super().dispatch(request, *args, **kwargs)
+
+    def _desde_render(self, manejador):
+        """Envuelve el manejador para servir los bytes guardados del reporte (o un 304)"""
+        def servir(request, *args, **kwargs):
+            clave = (int(kwargs['pk']), request.get_full_path(), request.headers.get('Accept', ''))
+            entrada = cache_render_reportes.obtener(clave)
+            if entrada is not None and not _vigente(clave[0], entrada.operario):
+                cache_render_reportes.descartar(clave)
+                entrada = None
+            if entrada is None:
+                # Se finaliza acá (renderer negociado) para poder guardar los bytes
+                respuesta = self.finalize_response(request, manejador(request, *args, **kwargs), *args, **kwargs)
+                entrada = self._guardar_render(clave, respuesta)
+                if entrada is None:
+                    return respuesta
+
+            respuesta = get_conditional_response(
+                request, etag=entrada.etag,
+                response=HttpResponse(entrada.contenido, content_type=entrada.tipo_contenido)
+            )
+            respuesta['ETag'] = entrada.etag
+            patch_vary_headers(respuesta, ('Accept',))
+            patch_cache_control(respuesta, private=True, no_cache=True)
+            return respuesta
+        return servir
+
+    def _guardar_render(self, clave, respuesta):
+        """Guarda los bytes de una respuesta JSON exitosa de un reporte ya generado; si no, retorna None"""
+        reporte = getattr(self, '_reporte_renderizado', None)
+        if (respuesta.status_code != 200 or reporte is None or not _generado(reporte)
+                or not isinstance(getattr(respuesta, 'accepted_renderer', None), JSONRenderer)):
+            return None
+        with medir('serializacion'):
+            contenido = respuesta.render().content
+        entrada = RenderReporte(
+            contenido, respuesta['Content-Type'], f'"{hashlib.sha1(contenido).hexdigest()}"',
+            operario_de_reporte(reporte)
+        )
+        cache_render_reportes.guardar(clave, entrada, peso=len(contenido))
+        return entrada
+
+
+def representaciones_de_reportes(reportes, seleccion, serializar):
+    """
+    Representación de cada reporte de una página reutilizando las ya armadas (historial)
+
+    `seleccion` identifica los campos pedidos y `serializar(reporte)` arma la representación de
+    un reporte. Los datos_reporte diferidos de los que faltan se cargan en una sola consulta.
+    """
+    representaciones = {}
+    faltantes = []
+    for reporte in reportes:
+        entrada = cache_render_reportes.obtener((reporte.pk, *seleccion))
+        if entrada is not None and entrada.operario in (SIN_OPERARIO, operario_de_reporte(reporte)):
+            representaciones[reporte.pk] = entrada.datos
+        else:
+            faltantes.append(reporte)
+
+    diferidos = [reporte for reporte in faltantes if 'datos_reporte' in reporte.get_deferred_fields()]
+    if diferidos:
+        datos = dict(
+            Reporte.objects.filter(pk__in=[reporte.pk for reporte in diferidos])
+            .values_list('id_reporte', 'datos_reporte')
+        )
+        for reporte in diferidos:
+            reporte.datos_reporte = datos.get(reporte.pk, {})
+
+    for reporte in faltantes:
+        representacion = serializar(reporte)
+        representaciones[reporte.pk] = representacion
+        if _generado(reporte):
+            cache_render_reportes.guardar(
+                (reporte.pk, *seleccion),
+                RepresentacionReporte(representacion, operario_de_reporte(reporte)),
+                peso=len(JSONRenderer().render(representacion))
+            )
+    return [representaciones[reporte.pk] for reporte in reportes]
@@ -0,0 +1,148 @@
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+_DISPLAY = re.compile(r'^get_(\w+)_display$')
+
+
+def campos_pedidos(request):
+    """
+    Lee ?fields= y ?omit= (nombres separados por coma) de una petición GET
+
+    Retorna (campos, omitir); campos es None cuando no se pidió una selección.
+    """
+    if request is None or request.method != 'GET':
+        return None, []
+    params = request.query_params
+    campos = [c.strip() for c in params.get('fields', '').split(',') if c.strip()] or None
+    omitir = [c.strip() for c in params.get('omit', '').split(',') if c.strip()]
+    return campos, omitir
+
+
+class CamposParcialesMixin:
+    """
+    Serializer que envía solo los campos de context['campos'] y quita los de context['omitir']
+
+    `fuentes` indica qué campos del modelo necesita cada campo calculado
+    (SerializerMethodField); con eso la vista puede recortar también la consulta.
+    """
+    fuentes = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get('campos')
+        if campos:
+            for nombre in set(self.fields) - set(campos):
+                self.fields.pop(nombre)
+        for nombre in self.context.get('omitir', ()):
+            self.fields.pop(nombre, None)
+
+
+def _campo_de_subtipo(modelo, nombre):
+    for subtipo in modelo.__subclasses__():
+        try:
+            subtipo._meta.get_field(nombre)
+            return True
+        except FieldDoesNotExist:
+            if _campo_de_subtipo(subtipo, nombre):
+                return True
+    return False
+
+
+def _necesidades(modelo, serializer):
+    """
+    Campos del modelo y relaciones que usan los campos del serializer, o None si alguno
+    no se puede resolver (en ese caso la consulta no se recorta)
+    """
+    campos = set()
+    relaciones = set()
+    fuentes = getattr(serializer, 'fuentes', {})
+    for nombre, campo in serializer.fields.items():
+        if nombre in fuentes:
+            campos.update(fuentes[nombre])
+            continue
+        if campo.source == '*' or isinstance(campo, serializers.SerializerMethodField):
+            return None
+        atributos = campo.source_attrs
+        primero = atributos[0]
+        display = _DISPLAY.match(primero)
+        if display:
+            primero = display.group(1)
+        try:
+            campo_modelo = modelo._meta.get_field(primero)
+        except FieldDoesNotExist:
+            # Campos propios de un subtipo (reportes leídos con select_subclasses()):
+            # no son columnas del modelo base, así que no cambian qué se difiere
+            if _campo_de_subtipo(modelo, primero):
+                continue
+            return None
+        campos.add(campo_modelo.name)
+        # Con más de un atributo (ecoladrillo.nombre) se necesita el objeto relacionado
+        if campo_modelo.is_relation and len(atributos) > 1:
+            relaciones.add(campo_modelo.name)
+    return campos, relaciones
+
+
+def recortar_consulta(queryset, serializers_usados):
+    """
+    Ajusta el queryset a los campos que van a enviar los serializers dados
+
+    Difiere las columnas del modelo que ningún campo usa y deja solo los JOIN de las
+    relaciones que se leen; si algún campo no se puede resolver, retorna el queryset igual.
+    """
+    modelo = queryset.model
+    campos = set()
+    relaciones = set()
+    for serializer in serializers_usados:
+        necesidades = _necesidades(modelo, serializer)
+        if necesidades is None:
+            return queryset
+        campos |= necesidades[0]
+        relaciones |= necesidades[1]
+
+    clave = modelo._meta.pk
+    diferibles = [
+        campo.name for campo in modelo._meta.concrete_fields
+        if campo.name not in campos and campo is not clave and not campo.primary_key
+    ]
+    if isinstance(queryset.query.select_related, dict):
+        # Solo se quitan los JOIN de claves foráneas; los de subtipos se mantienen
+        directas = {campo.name for campo in modelo._meta.concrete_fields if campo.is_relation}
+        unidos = [r for r in queryset.query.select_related if r in relaciones or r not in directas]
+        queryset = queryset.select_related(None)
+        if unidos:
+            queryset = queryset.select_related(*unidos)
+    if diferibles:
+        queryset = queryset.defer(*diferibles)
+    return queryset
+
+
+class CamposParcialesViewMixin:
+    """
+    ViewSet que acepta ?fields= y ?omit= en sus GET
+
+    El serializer recibe la selección por el contexto y la consulta se recorta a los
+    campos que se van a enviar (columnas diferidas y JOIN innecesarios quitados).
+    """
+
+    def get_serializer_context(self):
+        contexto = super().get_serializer_context()
+        contexto['campos'], contexto['omitir'] = campos_pedidos(self.request)
+        return contexto
+
+    def serializers_de_consulta(self):
+        """Clases de serializer con las que se va a serializar el queryset"""
+        return [self.get_serializer_class()]
+
+    def get_queryset(self):
+        return self.recortar_a_campos(super().get_queryset())
+
+    def recortar_a_campos(self, queryset):
+        campos, omitir = campos_pedidos(self.request)
+        if campos is None and not omitir:
+            return queryset
+        contexto = self.get_serializer_context()
+        return recortar_consulta(
+            queryset, [clase(context=contexto) for clase in self.serializers_de_consulta()]
+        )
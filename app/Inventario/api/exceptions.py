@@ -2,10 +2,19 @@ from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
 
+from ..metricas import medir
+
+
 def custom_exception_handler(exc, context):
     """
     Manejador personalizado de excepciones para estandarizar el formato de errores
     """
+    # Su tiempo se informa aparte (fase excepcion de Server-Timing y /metrics)
+    with medir('excepcion'):
+        return _formatear_excepcion(exc, context)
+
+
+def _formatear_excepcion(exc, context):
     # Llamar al manejador de excepciones por defecto de DRF
     response = exception_handler(exc, context)
 
@@ -86,3 +95,24 @@ def format_validation_errors(serializer_errors):
                 errores.append(f"{field}: {messages}")
     
     return errores
+
+
+def format_batch_errors(errores_por_linea):
+    """
+    Formatea los errores de un lote indicando la línea (empezando en 1) de cada uno
+
+    Recibe una lista alineada con las líneas del lote donde cada elemento es un dict de
+    errores de serializer o una lista de mensajes; las líneas sin errores se omiten.
+    """
+    errores = []
+    detalle = []
+
+    for indice, errores_linea in enumerate(errores_por_linea, start=1):
+        if isinstance(errores_linea, dict):
+            errores_linea = format_validation_errors(errores_linea)
+        if not errores_linea:
+            continue
+        detalle.append({'linea': indice, 'errores': list(errores_linea)})
+        errores.extend(f"Línea {indice}: {mensaje}" for mensaje in errores_linea)
+
+    return {'errores': errores, 'errores_por_linea': detalle}
@@ -0,0 +1,151 @@
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import date
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from ..models import VersionInventario
+
+
+class PaginadorConteoCache(Paginator):
+    """Paginator de Django que reutiliza el COUNT(*) mientras el inventario no cambie"""
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'model'):
+            return VersionInventario.contar(self.object_list)
+        return super().count
+
+
+class ConteoCachePagination(PageNumberPagination):
+    """
+    Paginación por número de página (la predeterminada de la API) con el total en caché.
+
+    El total de filas se calcula una vez por versión del inventario en lugar de en cada
+    página; para catálogos y movimientos grandes evita recorrer la tabla en cada petición.
+    """
+    django_paginator_class = PaginadorConteoCache
+
+
+class ReportePagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para el listado de reportes.
+
+    Cada página se obtiene con un WHERE sobre (fecha_generacion, id_reporte) en lugar de
+    un OFFSET, así el costo no crece con el número de reportes guardados.
+    """
+    ordering = ('-fecha_generacion', '-id_reporte')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CatalogoPagination(ConteoCachePagination):
+    """Paginación del listado de los reportes de stock de ecoladrillos y materiales"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class MovimientoPagination(BasePagination):
+    """
+    Paginación keyset por (fecha, id) para los historiales de movimientos, del más reciente
+    al más antiguo.
+
+    El cursor guarda la fecha e ID de la última fila enviada y la página siguiente se pide con
+    WHERE fecha <= f AND (fecha < f OR id < i), que recorre el índice (fecha, id): el costo de una
+    página no depende de cuán lejos esté. A diferencia de CursorPagination de DRF, que ubica el
+    cursor solo por la primera columna y salta con OFFSET entre filas de la misma fecha, aquí
+    ningún día con muchos movimientos hace más lenta la página. `count` sale de
+    VersionInventario.contar, así que no se recuenta la tabla en cada página.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(tamano, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        tamano = self.get_page_size(request)
+        self.count = VersionInventario.contar(queryset)
+
+        posicion = self._leer_cursor(request)
+        if posicion is None:
+            atras = False
+            filas = queryset.order_by('-fecha', '-pk')
+        else:
+            fecha, pk, atras = posicion
+            # El rango simple sobre fecha permite recorrer el índice (fecha, id) en orden;
+            # la condición OR solo descarta las filas ya enviadas de esa misma fecha
+            if atras:
+                filas = queryset.filter(Q(fecha__gt=fecha) | Q(pk__gt=pk), fecha__gte=fecha).order_by('fecha', 'pk')
+            else:
+                filas = queryset.filter(Q(fecha__lt=fecha) | Q(pk__lt=pk), fecha__lte=fecha).order_by('-fecha', '-pk')
+
+        pagina = list(filas[:tamano + 1])
+        hay_mas = len(pagina) > tamano
+        pagina = pagina[:tamano]
+        if atras:
+            pagina.reverse()
+
+        # Al retroceder siempre hay página siguiente (la de donde se vino); al avanzar,
+        # hay anterior si se llegó con un cursor
+        if atras:
+            self._siguiente = pagina[-1] if pagina else None
+            self._anterior = pagina[0] if hay_mas else None
+        else:
+            self._siguiente = pagina[-1] if hay_mas else None
+            self._anterior = pagina[0] if posicion is not None and pagina else None
+        return pagina
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self._enlace(self._siguiente, atras=False)),
+            ('previous', self._enlace(self._anterior, atras=True)),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['count', 'results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def _enlace(self, fila, atras):
+        if fila is None:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = f"{fila.fecha.isoformat()}|{fila.pk}|{int(atras)}"
+        cursor = base64.urlsafe_b64encode(cursor.encode()).decode()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _leer_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            fecha, pk, atras = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return date.fromisoformat(fecha), int(pk), atras == '1'
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ParseError('Cursor inválido')
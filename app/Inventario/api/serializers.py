@@ -1,21 +1,23 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from .campos import CamposParcialesMixin
 from ..models import (
     Operario, Administrador, Ecoladrillo, Material, 
     RegistroEcoladrillo, RetiroEcoladrillo, RegistroMaterial, Reporte,
-    ReporteStockFecha, ReporteResumenInventario, ReporteResumenRetiros
+    ReporteStockFecha, ReporteResumenInventario, ReporteResumenRetiros, TrabajoReporte
 )
 
-class OperarioSerializer(serializers.ModelSerializer):
+class OperarioSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     class Meta:
         model = Operario
         fields = ['id_usuario', 'nombre', 'email', 'cargo', 'contraseña']
 
-class AdministradorSerializer(serializers.ModelSerializer):
+class AdministradorSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     class Meta:
         model = Administrador
         fields = ['id_usuario', 'nombre', 'email','contraseña']
         
-class EcoladrilloSerializer(serializers.ModelSerializer):
+class EcoladrilloSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     material_principal_nombre = serializers.CharField(source='material_principal.nombre', read_only=True)
     size_display = serializers.CharField(source='get_size_display', read_only=True)
     
@@ -24,26 +26,39 @@ class EcoladrilloSerializer(serializers.ModelSerializer):
         fields = ['id_ecoladrillo', 'nombre', 'descripcion', 'size', 'size_display', 
                  'material_principal', 'material_principal_nombre', 'cantidad_material_requerida', 'cantidad']
 
-class MaterialSerializer(serializers.ModelSerializer):
+class MaterialSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     class Meta:
         model = Material
         fields = ['id_insumo', 'nombre', 'tipo', 'cantidad_disponible', 'unidad_medida']
 
-class RegistroEcoladrilloSerializer(serializers.ModelSerializer):
+class RegistroEcoladrilloSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     ecoladrillo_nombre = serializers.CharField(source='ecoladrillo.nombre', read_only=True)
     
     class Meta:
         model = RegistroEcoladrillo
         fields = ['id_registro', 'fecha', 'ecoladrillo', 'ecoladrillo_nombre', 'cantidad']
 
-class RetiroEcoladrilloSerializer(serializers.ModelSerializer):
+class RegistroEcoladrilloLoteSerializer(serializers.Serializer):
+    """Valida una línea de un lote de producción sin consultar la base de datos"""
+    fecha = serializers.DateField()
+    ecoladrillo = serializers.IntegerField(min_value=1)
+    cantidad = serializers.IntegerField(min_value=1)
+
+class RetiroEcoladrilloSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     ecoladrillo_nombre = serializers.CharField(source='ecoladrillo.nombre', read_only=True)
     
     class Meta:
         model = RetiroEcoladrillo
         fields = ['id_retiro', 'fecha', 'ecoladrillo', 'cantidad', 'motivo', 'ecoladrillo_nombre']
 
-class RegistroMaterialSerializer(serializers.ModelSerializer):
+class RetiroEcoladrilloLoteSerializer(serializers.Serializer):
+    """Valida una línea de un lote de retiros sin consultar la base de datos"""
+    fecha = serializers.DateField()
+    ecoladrillo = serializers.IntegerField(min_value=1)
+    cantidad = serializers.IntegerField(min_value=1)
+    motivo = serializers.CharField(max_length=200)
+
+class RegistroMaterialSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     material_nombre = serializers.CharField(source='material.nombre', read_only=True)
     
     class Meta:
@@ -51,7 +66,7 @@ class RegistroMaterialSerializer(serializers.ModelSerializer):
         fields = ['id_registro_material', 'fecha', 'cantidad', 
                  'material', 'material_nombre', 'origen']
 
-class ReporteSerializer(serializers.ModelSerializer):
+class ReporteSerializer(CamposParcialesMixin, serializers.ModelSerializer):
     operario_nombre = serializers.CharField(source='operario.nombre', read_only=True)
     tipo_reporte_display = serializers.CharField(source='get_tipo_reporte_display', read_only=True)
     
@@ -61,13 +76,54 @@ class ReporteSerializer(serializers.ModelSerializer):
                  'operario', 'operario_nombre', 'datos_reporte']
         read_only_fields = ['fecha_generacion']
 
-class ReporteStockFechaSerializer(serializers.ModelSerializer):
+class ReporteListaSerializer(CamposParcialesMixin, serializers.ModelSerializer):
+    """Fila resumida para el listado de reportes (sin datos_reporte)"""
+    operario_nombre = serializers.CharField(source='operario.nombre', read_only=True)
+    tipo_reporte_display = serializers.CharField(source='get_tipo_reporte_display', read_only=True)
+    parametros = serializers.SerializerMethodField()
+    fuentes = {'parametros': ()}  # Campos del subtipo, siempre incluidos por select_subclasses()
+
+    class Meta:
+        model = Reporte
+        fields = ['id_reporte', 'tipo_reporte', 'tipo_reporte_display', 'fecha_generacion',
+                 'operario', 'operario_nombre', 'parametros']
+        read_only_fields = fields
+
+    def get_parametros(self, obj):
+        """Parámetros propios del subtipo, ya cargados por select_subclasses()"""
+        if isinstance(obj, ReporteStockFecha):
+            return {'fecha_consulta': obj.fecha_consulta}
+        if isinstance(obj, ReporteResumenRetiros):
+            return {'fecha_inicio': obj.fecha_inicio, 'fecha_fin': obj.fecha_fin}
+        return {}
+
+class _ReporteTipoSerializer(CamposParcialesMixin, serializers.ModelSerializer):
+    """
+    Base de los serializers por tipo de reporte.
+    
+    Los campos de `campos_derivados` repiten partes de datos_reporte; con context['compacto']
+    se omiten y cada dato se envía una sola vez, dentro de datos_reporte.
+    """
+    campos_derivados = ()
+    
+    @property
+    def fuentes(self):
+        return {campo: ('datos_reporte',) for campo in self.campos_derivados}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get('compacto'):
+            for campo in self.campos_derivados:
+                self.fields.pop(campo, None)
+
+class ReporteStockFechaSerializer(_ReporteTipoSerializer):
     operario_nombre = serializers.CharField(source='operario.nombre', read_only=True)
     tipo_reporte_display = serializers.CharField(source='get_tipo_reporte_display', read_only=True)
     ecoladrillos_sin_stock = serializers.SerializerMethodField()
     materiales_sin_stock = serializers.SerializerMethodField()
     todos_ecoladrillos = serializers.SerializerMethodField()
     todos_materiales = serializers.SerializerMethodField()
+    campos_derivados = ('ecoladrillos_sin_stock', 'materiales_sin_stock', 'todos_ecoladrillos', 'todos_materiales')
     
     class Meta:
         model = ReporteStockFecha
@@ -88,7 +144,7 @@ class ReporteStockFechaSerializer(serializers.ModelSerializer):
     def get_todos_materiales(self, obj):
         return obj.obtener_todos_materiales()
 
-class ReporteResumenInventarioSerializer(serializers.ModelSerializer):
+class ReporteResumenInventarioSerializer(_ReporteTipoSerializer):
     operario_nombre = serializers.CharField(source='operario.nombre', read_only=True)
     tipo_reporte_display = serializers.CharField(source='get_tipo_reporte_display', read_only=True)
     ecoladrillos_sin_stock = serializers.SerializerMethodField()
@@ -96,6 +152,8 @@ class ReporteResumenInventarioSerializer(serializers.ModelSerializer):
     ecoladrillos_con_stock = serializers.SerializerMethodField()
     materiales_con_stock = serializers.SerializerMethodField()
     resumen_estadisticas = serializers.SerializerMethodField()
+    campos_derivados = ('ecoladrillos_sin_stock', 'materiales_sin_stock', 'ecoladrillos_con_stock',
+                        'materiales_con_stock', 'resumen_estadisticas')
     
     class Meta:
         model = ReporteResumenInventario
@@ -126,13 +184,14 @@ class ReporteResumenInventarioSerializer(serializers.ModelSerializer):
             return obj.datos_reporte['resumen']
         return {}
 
-class ReporteResumenRetirosSerializer(serializers.ModelSerializer):
+class ReporteResumenRetirosSerializer(_ReporteTipoSerializer):
     operario_nombre = serializers.CharField(source='operario.nombre', read_only=True)
     tipo_reporte_display = serializers.CharField(source='get_tipo_reporte_display', read_only=True)
     retiros_detalle = serializers.SerializerMethodField()
     resumen_por_ecoladrillo = serializers.SerializerMethodField()
     estadisticas = serializers.SerializerMethodField()
     periodo_info = serializers.SerializerMethodField()
+    campos_derivados = ('retiros_detalle', 'resumen_por_ecoladrillo', 'estadisticas', 'periodo_info')
     
     class Meta:
         model = ReporteResumenRetiros
@@ -163,3 +222,23 @@ class ReporteResumenRetirosSerializer(serializers.ModelSerializer):
             'fecha_inicio': obj.fecha_inicio.isoformat() if obj.fecha_inicio else None,
             'fecha_fin': obj.fecha_fin.isoformat() if obj.fecha_fin else None
         }
+
+
+class TrabajoReporteSerializer(CamposParcialesMixin, serializers.ModelSerializer):
+    """Estado de una generación de reporte encolada, con el enlace al reporte al terminar"""
+    tipo_reporte_display = serializers.CharField(source='get_tipo_reporte_display', read_only=True)
+    operario_nombre = serializers.CharField(source='operario.nombre', read_only=True)
+    url_reporte = serializers.SerializerMethodField()
+    fuentes = {'url_reporte': ('reporte',)}
+    
+    class Meta:
+        model = TrabajoReporte
+        fields = ['id_trabajo', 'tipo_reporte', 'tipo_reporte_display', 'parametros', 'operario',
+                 'operario_nombre', 'estado', 'progreso', 'intentos', 'mensaje_error', 'reporte',
+                 'url_reporte', 'fecha_creacion', 'fecha_inicio', 'fecha_fin']
+        read_only_fields = fields
+    
+    def get_url_reporte(self, obj):
+        if obj.reporte_id is None:
+            return None
+        return reverse('reporte-detail', args=[obj.reporte_id], request=self.context.get('request'))
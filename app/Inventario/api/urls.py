@@ -4,7 +4,7 @@ from .views import (
     OperarioViewSet, AdministradorViewSet, EcoladrilloViewSet,
     MaterialViewSet, RegistroEcoladrilloViewSet, RetiroEcoladrilloViewSet,
     RegistroMaterialViewSet, ReporteViewSet, ReporteStockFechaViewSet,
-    ReporteResumenInventarioViewSet, ReporteResumenRetirosViewSet
+    ReporteResumenInventarioViewSet, ReporteResumenRetirosViewSet, TrabajoReporteViewSet
 )
 
 # Crear el router para los ViewSets
@@ -24,6 +24,7 @@ router.register(r'reportes', ReporteViewSet, basename='reporte')
 router.register(r'reportes-stock-fecha', ReporteStockFechaViewSet, basename='reporte-stock-fecha')
 router.register(r'reportes-resumen-inventario', ReporteResumenInventarioViewSet, basename='reporte-resumen-inventario')
 router.register(r'reportes-resumen-retiros', ReporteResumenRetirosViewSet, basename='reporte-resumen-retiros')
+router.register(r'trabajos-reporte', TrabajoReporteViewSet, basename='trabajo-reporte')
 
 urlpatterns = [
     # Incluir todas las URLs del router
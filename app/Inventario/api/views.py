@@ -2,25 +2,58 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.reverse import reverse
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.db.models import Sum
+from collections import defaultdict
 from datetime import datetime, timedelta
+import io
 
 from ..models import (
     Operario, Administrador, Ecoladrillo, Material,
     RegistroEcoladrillo, RetiroEcoladrillo, RegistroMaterial, Reporte,
-    ReporteStockFecha, ReporteResumenInventario, ReporteResumenRetiros
+    ReporteStockFecha, ReporteResumenInventario, ReporteResumenRetiros, TrabajoReporte,
+    UMBRAL_STOCK_BAJO, VersionInventario, serie_movimientos_ecoladrillo, stock_ecoladrillos_en_fechas, stock_materiales_en_fechas
 )
 from .serializers import (
     OperarioSerializer, AdministradorSerializer, EcoladrilloSerializer,
     MaterialSerializer, RegistroEcoladrilloSerializer, RetiroEcoladrilloSerializer,
     RegistroMaterialSerializer, ReporteSerializer, ReporteStockFechaSerializer,
-    ReporteResumenInventarioSerializer, ReporteResumenRetirosSerializer
+    ReporteResumenInventarioSerializer, ReporteResumenRetirosSerializer,
+    RegistroEcoladrilloLoteSerializer, RetiroEcoladrilloLoteSerializer, ReporteListaSerializer,
+    TrabajoReporteSerializer
 )
-from .exceptions import format_validation_errors
+from .pagination import CatalogoPagination, MovimientoPagination, ReportePagination
+from .campos import CamposParcialesViewMixin, campos_pedidos
+from .cache_http import ETagInventarioMixin, RenderReporteMixin, representaciones_de_reportes
+from .exceptions import format_validation_errors, format_batch_errors
+from ..importacion import importar_registros_material
+from ..exportacion import exportar_historial
+from ..cache import cache_render_reportes, cache_reportes
 
-class BaseViewSet(viewsets.ModelViewSet):
-    """ViewSet base con manejo consistente de errores"""
+
+def _como_booleano(valor):
+    """Interpreta banderas que llegan como JSON (true/false) o como texto de formulario"""
+    if isinstance(valor, str):
+        return valor.strip().lower() not in ('', 'false', '0', 'no')
+    return bool(valor)
+
+def _representacion_compacta(request, por_defecto):
+    """
+    Indica si los reportes se envían sin los campos que repiten datos_reporte
+    
+    ?completo=true pide la forma completa y ?completo=false la compacta; sin el parámetro
+    se usa `por_defecto` (compacta en los listados, completa en el detalle).
+    """
+    completo = request.query_params.get('completo')
+    if completo is None:
+        return por_defecto
+    return not _como_booleano(completo)
+
+class BaseViewSet(CamposParcialesViewMixin, viewsets.ModelViewSet):
+    """ViewSet base con manejo consistente de errores y selección de campos (?fields= / ?omit=)"""
     
     def create(self, request, *args, **kwargs):
         """Crear objeto con manejo de errores estandarizado"""
@@ -59,6 +92,119 @@ class BaseViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': f'Error inesperado: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def destroy(self, request, *args, **kwargs):
+        """Eliminar objeto con manejo de errores estandarizado (p. ej. un movimiento que dejaría stock negativo)"""
+        instance = self.get_object()
+        try:
+            self.perform_destroy(instance)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def respuesta_reporte_stock(self, resumen, clave):
+        """
+        Combina los totales de un reporte de stock con una página del listado
+        
+        El listado queda bajo `clave` y los datos de la página bajo `paginacion`
+        """
+        paginator = CatalogoPagination()
+        pagina = paginator.paginate_queryset(self.get_queryset(), self.request, view=self)
+        return Response({
+            **resumen,
+            clave: self.get_serializer(pagina, many=True).data,
+            'paginacion': {
+                'pagina': paginator.page.number,
+                'total_paginas': paginator.page.paginator.num_pages,
+                'siguiente': paginator.get_next_link(),
+                'anterior': paginator.get_previous_link(),
+            },
+        })
+    
+    def respuesta_serie(self, campo):
+        """
+        Serie de producción o retiros agrupada por periodo a partir de los parámetros de consulta
+        
+        Parámetros: granularidad (dia, semana o mes; por defecto dia), fecha_inicio y fecha_fin
+        (por defecto los últimos 30 días), ecoladrillo y material (opcionales)
+        """
+        params = self.request.query_params
+        granularidad = params.get('granularidad') or params.get('granularity') or 'dia'
+        granularidad = {'day': 'dia', 'week': 'semana', 'month': 'mes'}.get(granularidad, granularidad)
+        
+        try:
+            fecha_fin = params.get('fecha_fin')
+            fecha_fin = datetime.strptime(fecha_fin, '%Y-%m-%d').date() if fecha_fin else timezone.localdate()
+            fecha_inicio = params.get('fecha_inicio')
+            fecha_inicio = (
+                datetime.strptime(fecha_inicio, '%Y-%m-%d').date() if fecha_inicio
+                else fecha_fin - timedelta(days=30)
+            )
+        except ValueError:
+            return Response({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        filtros = {}
+        for nombre in ('ecoladrillo', 'material'):
+            valor = params.get(nombre)
+            if valor:
+                if not valor.isdigit():
+                    return Response({'error': f'El parámetro {nombre} debe ser un ID numérico'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                filtros[f'{nombre}_id'] = int(valor)
+        
+        try:
+            serie = serie_movimientos_ecoladrillo(campo, granularidad, fecha_inicio, fecha_fin, **filtros)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'granularidad': granularidad,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'total': sum(cantidad for _, cantidad in serie),
+            'serie': [{'periodo': periodo, 'cantidad': cantidad} for periodo, cantidad in serie]
+        })
+    
+    def respuesta_exportacion(self, historial):
+        """
+        Historial de movimientos completo como descarga CSV o NDJSON, enviada por partes
+        
+        Parámetros: formato (csv o ndjson; por defecto csv), fecha_inicio y fecha_fin (opcionales)
+        """
+        params = self.request.query_params
+        formato = params.get('formato', 'csv')
+        try:
+            desde = params.get('fecha_inicio')
+            desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else None
+            hasta = params.get('fecha_fin')
+            hasta = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else None
+        except ValueError:
+            return Response({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            partes = exportar_historial(historial, formato, desde, hasta)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        tipos = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson; charset=utf-8'}
+        respuesta = StreamingHttpResponse(partes, content_type=tipos[formato])
+        nombre = '_'.join([historial] + [str(fecha) for fecha in (desde, hasta) if fecha])
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+        return respuesta
+    
+    def validar_lote(self, lineas, serializer_class):
+        """
+        Valida el formato de todas las líneas de un lote sin consultar la base de datos
+        
+        Retorna (datos_validados, None) o (None, Response con los errores por línea)
+        """
+        if not lineas:
+            return None, Response({'error': 'El lote no tiene líneas'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = serializer_class(data=lineas, many=True)
+        if not serializer.is_valid():
+            return None, Response(format_batch_errors(serializer.errors), status=status.HTTP_400_BAD_REQUEST)
+        return serializer.validated_data, None
+
 class OperarioViewSet(BaseViewSet):
     queryset = Operario.objects.all()
     serializer_class = OperarioSerializer
@@ -69,15 +215,18 @@ class AdministradorViewSet(BaseViewSet):
     serializer_class = AdministradorSerializer
     permission_classes = [AllowAny]
 
-class EcoladrilloViewSet(BaseViewSet):
-    queryset = Ecoladrillo.objects.all()
+class EcoladrilloViewSet(ETagInventarioMixin, BaseViewSet):
+    queryset = Ecoladrillo.objects.all().select_related('material_principal').order_by('id_ecoladrillo')
     serializer_class = EcoladrilloSerializer
     permission_classes = [AllowAny]
+    acciones_con_etag = ('list', 'retrieve', 'stock_bajo', 'stock_disponible', 'reporte_stock')
+    # Los cambios de material y los movimientos también aumentan la versión de 'ecoladrillo'
+    tablas_etag = ('ecoladrillo',)
     
     @action(detail=False, methods=['get'])
     def stock_bajo(self, request):
         """Endpoint para obtener ecoladrillos con stock bajo (menos de 10)"""
-        ecoladrillos_bajo_stock = self.queryset.filter(cantidad__lt=10)
+        ecoladrillos_bajo_stock = self.queryset.filter(cantidad__lt=UMBRAL_STOCK_BAJO)
         serializer = self.get_serializer(ecoladrillos_bajo_stock, many=True)
         return Response(serializer.data)
     
@@ -93,24 +242,21 @@ class EcoladrilloViewSet(BaseViewSet):
     
     @action(detail=False, methods=['get'])
     def reporte_stock(self, request):
-        """Reporte general de stock de todos los ecoladrillos"""
-        ecoladrillos = self.get_queryset()
-        stock_total = sum(e.cantidad for e in ecoladrillos)
-        stock_bajo = ecoladrillos.filter(cantidad__lt=10).count()
-        sin_stock = ecoladrillos.filter(cantidad=0).count()
+        """
+        Reporte general de stock de todos los ecoladrillos
         
-        return Response({
-            'total_tipos_ecoladrillos': ecoladrillos.count(),
-            'stock_total': stock_total,
-            'tipos_con_stock_bajo': stock_bajo,
-            'tipos_sin_stock': sin_stock,
-            'ecoladrillos': self.get_serializer(ecoladrillos, many=True).data
-        })
+        Los totales se calculan en una sola consulta de agregación y el listado se pagina
+        (parámetros page y page_size, por defecto 100 por página y máximo 1000)
+        """
+        return self.respuesta_reporte_stock(Ecoladrillo.resumen_stock(), 'ecoladrillos')
 
-class MaterialViewSet(BaseViewSet):
-    queryset = Material.objects.all()
+class MaterialViewSet(ETagInventarioMixin, BaseViewSet):
+    queryset = Material.objects.all().order_by('id_insumo')
     serializer_class = MaterialSerializer
     permission_classes = [AllowAny]
+    acciones_con_etag = ('list', 'retrieve', 'por_tipo', 'stock_disponible', 'reporte_stock')
+    # Los registros de ecoladrillos e ingresos de material también aumentan la versión de 'material'
+    tablas_etag = ('material',)
     
     @action(detail=False, methods=['get'])
     def por_tipo(self, request):
@@ -139,19 +285,13 @@ class MaterialViewSet(BaseViewSet):
 
     @action(detail=False, methods=['get'])
     def reporte_stock(self, request):
-        """Reporte general de stock de todos los materiales"""
-        materiales = self.get_queryset()
-        stock_total = sum(m.cantidad_disponible for m in materiales)
-        stock_bajo = materiales.filter(cantidad_disponible__lt=10).count()
-        sin_stock = materiales.filter(cantidad_disponible=0).count()
-
-        return Response({
-            'total_tipos_materiales': materiales.count(),
-            'stock_total': stock_total,
-            'tipos_con_stock_bajo': stock_bajo,
-            'tipos_sin_stock': sin_stock,
-            'materiales': self.get_serializer(materiales, many=True).data
-        })
+        """
+        Reporte general de stock de todos los materiales
+        
+        Los totales se calculan en una sola consulta de agregación y el listado se pagina
+        (parámetros page y page_size, por defecto 100 por página y máximo 1000)
+        """
+        return self.respuesta_reporte_stock(Material.resumen_stock(), 'materiales')
 
 
 
@@ -159,6 +299,7 @@ class RegistroEcoladrilloViewSet(BaseViewSet):
     queryset = RegistroEcoladrillo.objects.all().select_related('ecoladrillo', 'ecoladrillo__material_principal')
     serializer_class = RegistroEcoladrilloSerializer
     permission_classes = [AllowAny]
+    pagination_class = MovimientoPagination
     
     @action(detail=False, methods=['get'])
     def por_fecha(self, request):
@@ -171,6 +312,8 @@ class RegistroEcoladrilloViewSet(BaseViewSet):
         
         Ejemplo de uso:
         GET /api/v1/registros-ecoladrillo/por_fecha/?fecha_inicio=2025-08-01&fecha_fin=2025-08-03
+        
+        El resultado se pagina por cursor (fecha, id), del más reciente al más antiguo
         """
         fecha_inicio = request.query_params.get('fecha_inicio')
         fecha_fin = request.query_params.get('fecha_fin')
@@ -190,17 +333,225 @@ class RegistroEcoladrilloViewSet(BaseViewSet):
             except ValueError:
                 return Response({'error': 'Formato de fecha_fin inválido. Use YYYY-MM-DD'}, status=400)
             
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        pagina = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Descargar el historial de producción en CSV o NDJSON
+        
+        Parámetros de consulta:
+        - formato: csv o ndjson (por defecto csv)
+        - fecha_inicio, fecha_fin (opcionales): Rango en formato YYYY-MM-DD
+        
+        Ejemplo de uso:
+        GET /api/v1/registros-ecoladrillo/exportar/?formato=ndjson&fecha_inicio=2025-07-01&fecha_fin=2025-07-31
+        
+        A diferencia de por_fecha, el resultado se envía por partes a medida que se lee,
+        sin armar la lista completa en memoria.
+        """
+        return self.respuesta_exportacion('registros-ecoladrillo')
+    
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """
+        Ecoladrillos producidos por día, semana o mes
+        
+        Parámetros de consulta:
+        - granularidad: dia, semana o mes (por defecto dia)
+        - fecha_inicio, fecha_fin: Rango en formato YYYY-MM-DD (por defecto los últimos 30 días)
+        - ecoladrillo, material (opcionales): Filtrar por ecoladrillo o por su material principal
+        
+        Ejemplo de uso:
+        GET /api/v1/registros-ecoladrillo/series/?granularidad=semana&fecha_inicio=2025-07-01&fecha_fin=2025-08-31
+        """
+        return self.respuesta_serie('producido')
+
+    def create(self, request, *args, **kwargs):
+        """
+        Crear uno o varios registros de producción
+        
+        Acepta un objeto (un registro) o una lista (la producción completa de un turno):
+        [
+            {"fecha": "2025-08-03", "ecoladrillo": 1, "cantidad": 50},
+            {"fecha": "2025-08-03", "ecoladrillo": 2, "cantidad": 30}
+        ]
+        
+        El lote es todo o nada: si alguna línea es inválida o algún material no alcanza
+        (sumando todas las líneas que lo consumen) no se guarda ningún registro y la
+        respuesta indica los errores de cada línea en `errores_por_linea`.
+        
+        Nota: en bases de datos que no devuelven ids en inserciones masivas (MySQL)
+        los registros del lote se devuelven con id_registro en null.
+        """
+        if isinstance(request.data, list):
+            return self._crear_lote(request.data)
+        return super().create(request, *args, **kwargs)
+    
+    def _crear_lote(self, lineas):
+        """Valida el lote con una sola consulta de ecoladrillos y materiales y lo registra"""
+        datos, error = self.validar_lote(lineas, RegistroEcoladrilloLoteSerializer)
+        if error:
+            return error
+        
+        ecoladrillos = Ecoladrillo.objects.select_related('material_principal').in_bulk(
+            {linea['ecoladrillo'] for linea in datos}
+        )
+        
+        errores = [[] for _ in datos]
+        necesario = defaultdict(int)
+        lineas_por_material = defaultdict(list)
+        for indice, linea in enumerate(datos):
+            ecoladrillo = ecoladrillos.get(linea['ecoladrillo'])
+            if ecoladrillo is None:
+                errores[indice].append(f"ecoladrillo: No existe un ecoladrillo con ID {linea['ecoladrillo']}")
+                continue
+            necesario[ecoladrillo.material_principal_id] += ecoladrillo.calcular_material_necesario(linea['cantidad'])
+            lineas_por_material[ecoladrillo.material_principal_id].append(indice)
+        
+        # Verificar cada material contra la demanda sumada de todo el lote
+        materiales = {e.material_principal_id: e.material_principal for e in ecoladrillos.values()}
+        for material_id, total in necesario.items():
+            material = materiales[material_id]
+            if material.cantidad_disponible < total:
+                for indice in lineas_por_material[material_id]:
+                    errores[indice].append(
+                        f"No hay suficiente {material.nombre} disponible para el lote. "
+                        f"Necesario: {total} {material.unidad_medida}, "
+                        f"Disponible: {material.cantidad_disponible} {material.unidad_medida}"
+                    )
+        
+        if any(errores):
+            return Response(format_batch_errors(errores), status=status.HTTP_400_BAD_REQUEST)
+        
+        registros = [
+            RegistroEcoladrillo(
+                fecha=linea['fecha'],
+                ecoladrillo=ecoladrillos[linea['ecoladrillo']],
+                cantidad=linea['cantidad']
+            )
+            for linea in datos
+        ]
+        try:
+            registros = RegistroEcoladrillo.registrar_lote(registros)
+        except ValueError as e:
+            # El stock cambió entre la validación y la actualización condicional
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = self.get_serializer(registros, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 class RetiroEcoladrilloViewSet(BaseViewSet):
     queryset = RetiroEcoladrillo.objects.all().select_related('ecoladrillo')
     serializer_class = RetiroEcoladrilloSerializer
     permission_classes = [AllowAny]
+    pagination_class = MovimientoPagination
+    
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Descargar el historial de retiros en CSV o NDJSON
+        
+        Parámetros de consulta:
+        - formato: csv o ndjson (por defecto csv)
+        - fecha_inicio, fecha_fin (opcionales): Rango en formato YYYY-MM-DD
+        
+        Ejemplo de uso:
+        GET /api/v1/retiros-ecoladrillo/exportar/?formato=ndjson&fecha_inicio=2025-07-01&fecha_fin=2025-07-31
+        
+        A diferencia de por_fecha, el resultado se envía por partes a medida que se lee,
+        sin armar la lista completa en memoria.
+        """
+        return self.respuesta_exportacion('retiros-ecoladrillo')
+    
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """
+        Ecoladrillos retirados por día, semana o mes
+        
+        Mismos parámetros que /registros-ecoladrillo/series/
+        
+        Ejemplo de uso:
+        GET /api/v1/retiros-ecoladrillo/series/?granularidad=mes&ecoladrillo=1
+        """
+        return self.respuesta_serie('retirado')
+    
+    def create(self, request, *args, **kwargs):
+        """
+        Crear uno o varios retiros
+        
+        Acepta un objeto (un retiro) o una lista (todas las líneas de un despacho):
+        [
+            {"fecha": "2025-08-03", "ecoladrillo": 1, "cantidad": 20, "motivo": "Despacho camión 12"},
+            {"fecha": "2025-08-03", "ecoladrillo": 2, "cantidad": 15, "motivo": "Despacho camión 12"}
+        ]
+        
+        Las líneas se agrupan por ecoladrillo y la demanda sumada se verifica contra el
+        stock una sola vez. El lote es todo o nada y usa un número fijo de consultas sin
+        importar cuántas líneas tenga; los errores se indican por línea en `errores_por_linea`.
+        
+        Nota: en bases de datos que no devuelven ids en inserciones masivas (MySQL)
+        los retiros del lote se devuelven con id_retiro en null.
+        """
+        if isinstance(request.data, list):
+            return self._crear_lote(request.data)
+        return super().create(request, *args, **kwargs)
+    
+    def _crear_lote(self, lineas):
+        """Valida el lote con una sola consulta de ecoladrillos y registra los retiros en bloque"""
+        datos, error = self.validar_lote(lineas, RetiroEcoladrilloLoteSerializer)
+        if error:
+            return error
+        
+        ecoladrillos = Ecoladrillo.objects.only('id_ecoladrillo', 'nombre', 'cantidad').in_bulk(
+            {linea['ecoladrillo'] for linea in datos}
+        )
+        
+        errores = [[] for _ in datos]
+        demanda = defaultdict(int)
+        lineas_por_ecoladrillo = defaultdict(list)
+        for indice, linea in enumerate(datos):
+            if linea['ecoladrillo'] not in ecoladrillos:
+                errores[indice].append(f"ecoladrillo: No existe un ecoladrillo con ID {linea['ecoladrillo']}")
+                continue
+            demanda[linea['ecoladrillo']] += linea['cantidad']
+            lineas_por_ecoladrillo[linea['ecoladrillo']].append(indice)
+        
+        for ecoladrillo_id, total in demanda.items():
+            ecoladrillo = ecoladrillos[ecoladrillo_id]
+            if ecoladrillo.cantidad < total:
+                for indice in lineas_por_ecoladrillo[ecoladrillo_id]:
+                    errores[indice].append(
+                        f"No hay suficientes ecoladrillos {ecoladrillo.nombre} disponibles para el lote. "
+                        f"Necesario: {total}, Stock actual: {ecoladrillo.cantidad}"
+                    )
+        
+        if any(errores):
+            return Response(format_batch_errors(errores), status=status.HTTP_400_BAD_REQUEST)
+        
+        retiros = [
+            RetiroEcoladrillo(
+                fecha=linea['fecha'],
+                ecoladrillo=ecoladrillos[linea['ecoladrillo']],
+                cantidad=linea['cantidad'],
+                motivo=linea['motivo']
+            )
+            for linea in datos
+        ]
+        try:
+            retiros = RetiroEcoladrillo.registrar_lote(retiros)
+        except ValueError as e:
+            # El stock cambió entre la validación y el descuento condicional
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = self.get_serializer(retiros, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     @action(detail=False, methods=['get'])
     def por_fecha(self, request):
-        """Filtrar retiros por rango de fechas"""
+        """Filtrar retiros por rango de fechas (paginado por cursor, igual que por_fecha de registros)"""
         fecha_inicio = request.query_params.get('fecha_inicio')
         fecha_fin = request.query_params.get('fecha_fin')
         
@@ -219,8 +570,9 @@ class RetiroEcoladrilloViewSet(BaseViewSet):
             except ValueError:
                 return Response({'error': 'Formato de fecha_fin inválido. Use YYYY-MM-DD'}, status=400)
             
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        pagina = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def por_ecoladrillo(self, request):
@@ -236,9 +588,10 @@ class RetiroEcoladrilloViewSet(BaseViewSet):
         ecoladrillo_id = request.query_params.get('ecoladrillo_id')
         if ecoladrillo_id:
             try:
-                retiros = self.queryset.filter(ecoladrillo_id=ecoladrillo_id)
-                serializer = self.get_serializer(retiros, many=True)
-                return Response(serializer.data)
+                retiros = self.get_queryset().filter(ecoladrillo_id=ecoladrillo_id)
+                pagina = self.paginate_queryset(retiros)
+                serializer = self.get_serializer(pagina, many=True)
+                return self.get_paginated_response(serializer.data)
             except ValueError:
                 return Response({'error': 'ID de ecoladrillo inválido'}, status=400)
         return Response({'error': 'Parámetro ecoladrillo_id requerido'}, status=400)
@@ -247,6 +600,7 @@ class RegistroMaterialViewSet(BaseViewSet):
     queryset = RegistroMaterial.objects.all().select_related('material')
     serializer_class = RegistroMaterialSerializer
     permission_classes = [AllowAny]
+    pagination_class = MovimientoPagination
     
     def create(self, request, *args, **kwargs):
         """
@@ -267,70 +621,103 @@ class RegistroMaterialViewSet(BaseViewSet):
         - origen (opcional): Origen del material
         
         Nota: Este endpoint automáticamente actualiza el stock del material
+        (RegistroMaterial.save registra el ingreso y el stock en una sola transacción)
         """
-        serializer = self.get_serializer(data=request.data)
+        return super().create(request, *args, **kwargs)
+    
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Descargar el historial de ingresos de material en CSV o NDJSON
         
-        if not serializer.is_valid():
-            errores = format_validation_errors(serializer.errors)
-            return Response({'errores': errores}, status=status.HTTP_400_BAD_REQUEST)
+        Parámetros de consulta:
+        - formato: csv o ndjson (por defecto csv)
+        - fecha_inicio, fecha_fin (opcionales): Rango en formato YYYY-MM-DD
+        
+        Ejemplo de uso:
+        GET /api/v1/registros-material/exportar/?formato=ndjson&fecha_inicio=2025-07-01&fecha_fin=2025-07-31
+        
+        A diferencia de por_fecha, el resultado se envía por partes a medida que se lee,
+        sin armar la lista completa en memoria.
+        """
+        return self.respuesta_exportacion('registros-material')
+    
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """
+        Importar ingresos de material desde un archivo CSV
+        
+        Formulario multipart con el campo `archivo`. Columnas del CSV:
+        fecha (YYYY-MM-DD), cantidad, material (ID o nombre) y origen (opcional)
+        
+        Ejemplo de uso:
+        curl -F "archivo=@ingresos.csv" /api/v1/registros-material/importar/
+        
+        El archivo se procesa fila a fila y se inserta por bloques; el stock de cada
+        material se actualiza una sola vez con la suma de sus ingresos. Si alguna fila
+        es inválida no se importa nada y la respuesta lista los errores por línea.
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({'error': 'El campo archivo es requerido'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Guardar el registro
-            registro = serializer.save()
-            
-            # Actualizar cantidad del material
-            material = registro.material
-            material.agregar_stock(registro.cantidad)
-            
-            headers = self.get_success_headers(serializer.data)
-            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+            texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+            resumen = importar_registros_material(texto)
+        except UnicodeDecodeError:
+            return Response({'error': 'El archivo debe estar codificado en UTF-8'}, status=status.HTTP_400_BAD_REQUEST)
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            return Response({'error': f'Error inesperado: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if resumen['total_errores']:
+            return Response(resumen, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resumen, status=status.HTTP_201_CREATED)
 
-class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
+class ReporteViewSet(RenderReporteMixin, CamposParcialesViewMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet solo de lectura para reportes - Los reportes se generan con acciones específicas"""
     queryset = Reporte.objects.all().select_related('operario')
     serializer_class = ReporteSerializer
     permission_classes = [AllowAny]
+    pagination_class = ReportePagination
+    acciones_inmutables = ('retrieve', 'ver_datos', 'obtener_con_serializer_especifico')
     
     def get_queryset(self):
         """Obtiene el queryset con los tipos específicos de reportes"""
-        # Para list() usar los subtipos específicos
+        # Una sola consulta: select_subclasses() resuelve el subtipo con LEFT JOINs
+        # y el operario llega en el mismo JOIN
+        reportes = Reporte.objects.select_subclasses().select_related('operario')
+        if self.action in ('list', 'historial'):
+            # El listado solo muestra la fila resumida; el orden y la paginación
+            # se resuelven en la base de datos. El historial carga aparte los datos
+            # de los reportes que no tiene ya armados
+            reportes = reportes.defer('datos_reporte')
+        return self.recortar_a_campos(reportes)
+    
+    def serializers_de_consulta(self):
+        """El detalle y el historial usan el serializer del tipo de cada reporte"""
         if self.action == 'list':
-            reportes = []
-            
-            # Agregar reportes de stock en fecha
-            for reporte in ReporteStockFecha.objects.select_related('operario'):
-                reportes.append(reporte)
-            
-            # Agregar reportes de resumen de inventario
-            for reporte in ReporteResumenInventario.objects.select_related('operario'):
-                reportes.append(reporte)
-            
-            # Agregar reportes de resumen de retiros
-            for reporte in ReporteResumenRetiros.objects.select_related('operario'):
-                reportes.append(reporte)
-            
-            # Ordenar por fecha de generación (más recientes primero)
-            reportes.sort(key=lambda x: x.fecha_generacion, reverse=True)
-            
-            return reportes
-        else:
-            # Para retrieve() usar el queryset base que permite encontrar por ID
-            return Reporte.objects.select_related('operario').all()
+            return [ReporteListaSerializer]
+        return [ReporteStockFechaSerializer, ReporteResumenInventarioSerializer, ReporteResumenRetirosSerializer]
+    
+    def get_object(self):
+        """Obtiene el reporte con su subtipo concreto una sola vez por petición"""
+        if not hasattr(self, '_reporte'):
+            self._reporte = super().get_object()
+        return self._reporte
     
     def get_serializer_class(self):
         """Retorna el serializer específico según el tipo de reporte"""
+        if self.action == 'list':
+            return ReporteListaSerializer
         if self.action == 'retrieve':
-            try:
-                obj = self.get_object()
-                return self._get_serializer_for_report_type(obj)
-            except:
-                pass
+            return self._get_serializer_for_report_type(self.get_object())
         return ReporteSerializer
     
+    def get_serializer_context(self):
+        contexto = super().get_serializer_context()
+        contexto['compacto'] = _representacion_compacta(self.request, self.action in ('list', 'historial'))
+        return contexto
+    
     def _get_serializer_for_report_type(self, reporte):
         """Determina el serializer correcto basado en el tipo de reporte"""
         if isinstance(reporte, ReporteStockFecha):
@@ -344,35 +731,51 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
     
     def retrieve(self, request, *args, **kwargs):
         """Obtiene un reporte específico usando el serializer apropiado"""
-        instance = self.get_object()
-        
-        # Obtener la instancia específica del subtipo correcto
-        try:
-            if hasattr(instance, 'reportestockfecha'):
-                instance = instance.reportestockfecha
-            elif hasattr(instance, 'reporteresumeninventario'):
-                instance = instance.reporteresumeninventario
-            elif hasattr(instance, 'reporteresumenretiros'):
-                instance = instance.reporteresumenretiros
-        except:
-            pass
-        
-        serializer_class = self._get_serializer_for_report_type(instance)
-        serializer = serializer_class(instance)
+        serializer = self.get_serializer(self.get_object())
         return Response(serializer.data)
     
-    def list(self, request, *args, **kwargs):
-        """Lista todos los reportes usando el serializer apropiado para cada uno"""
-        reportes = self.get_queryset()
-        
-        # Serializar cada reporte con su serializer específico
-        reportes_data = []
-        for reporte in reportes:
-            serializer_class = self._get_serializer_for_report_type(reporte)
-            serializer = serializer_class(reporte)
-            reportes_data.append(serializer.data)
+    def _respuesta_en_cache(self, *clave):
+        """
+        Busca una generación idéntica hecha con la misma versión del inventario
         
-        return Response(reportes_data)
+        Retorna la respuesta guardada (que apunta al reporte existente) o None; en ese
+        caso la clave queda lista para _guardar_en_cache con la versión leída.
+        """
+        self._clave_cache = (*clave, VersionInventario.actual())
+        respuesta = cache_reportes.obtener(self._clave_cache)
+        if respuesta is None:
+            return None
+        # El reporte pudo borrarse después de guardar la respuesta: se genera de nuevo
+        if not Reporte.objects.filter(pk=respuesta['reporte_id']).exists():
+            cache_reportes.descartar(self._clave_cache)
+            return None
+        return Response({
+            **respuesta,
+            'mensaje': 'El inventario no cambió desde la última generación; se devuelve el reporte existente',
+            'desde_cache': True
+        })
+    
+    def _guardar_en_cache(self, respuesta):
+        """Guarda la respuesta de un reporte recién generado y la devuelve con estado 201"""
+        cache_reportes.guardar(self._clave_cache, respuesta)
+        return Response({**respuesta, 'desde_cache': False}, status=status.HTTP_201_CREATED)
+    
+    def _es_asincrono(self, request):
+        """La generación se encola si se pide con asincrono=true en el cuerpo o en la URL"""
+        return _como_booleano(request.data.get('asincrono', request.query_params.get('asincrono', False)))
+    
+    def _encolar(self, tipo_reporte, operario, **parametros):
+        """Guarda el trabajo en la cola y responde 202 con la dirección para consultar su estado"""
+        trabajo = TrabajoReporte.objects.create(
+            tipo_reporte=tipo_reporte, operario=operario, parametros=parametros
+        )
+        url_estado = reverse('trabajo-reporte-detail', args=[trabajo.pk], request=self.request)
+        return Response({
+            'mensaje': 'La generación del reporte quedó en cola',
+            'trabajo_id': trabajo.id_trabajo,
+            'estado': trabajo.estado,
+            'url_estado': url_estado
+        }, status=status.HTTP_202_ACCEPTED, headers={'Location': url_estado})
     
     @action(detail=False, methods=['post'])
     def generar_stock_fecha(self, request):
@@ -388,6 +791,7 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
         Campos:
         - fecha (requerido): Fecha en formato YYYY-MM-DD
         - operario_id (opcional): ID del operario que genera el reporte
+        - asincrono (opcional): true para encolar la generación y responder 202 con el ID del trabajo
         """
         fecha_str = request.data.get('fecha')
         operario_id = request.data.get('operario_id')
@@ -415,6 +819,14 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
                     'error': f'No existe un operario con ID {operario_id}'
                 }, status=status.HTTP_400_BAD_REQUEST)
         
+        if self._es_asincrono(request):
+            return self._encolar('stock_fecha', operario, fecha=fecha_consulta.isoformat())
+        
+        # Con el inventario sin cambios se devuelve el reporte ya generado
+        en_cache = self._respuesta_en_cache('stock_fecha', fecha_consulta, operario and operario.pk)
+        if en_cache:
+            return en_cache
+        
         # Crear reporte usando el nuevo modelo
         reporte = ReporteStockFecha.objects.create(
             tipo_reporte='stock_fecha',
@@ -426,7 +838,7 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
         # Generar datos usando el método del modelo
         datos_reporte = reporte.generar_datos_stock()
         
-        return Response({
+        return self._guardar_en_cache({
             'mensaje': 'Reporte de stock en fecha generado exitosamente',
             'reporte_id': reporte.id_reporte,
             'tipo_reporte': reporte.get_tipo_reporte_display(),
@@ -437,7 +849,7 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
                 'nombre': reporte.operario.nombre if reporte.operario else 'Sistema'
             },
             'datos': datos_reporte
-        }, status=status.HTTP_201_CREATED)
+        })
     
     @action(detail=False, methods=['post'])
     def generar_resumen_inventario(self, request):
@@ -451,6 +863,7 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
         
         Campos:
         - operario_id (opcional): ID del operario que genera el reporte
+        - asincrono (opcional): true para encolar la generación y responder 202 con el ID del trabajo
         
         Respuesta incluye:
         - ecoladrillos_sin_stock: Lista de ecoladrillos sin stock
@@ -471,6 +884,14 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
                     'error': f'No existe un operario con ID {operario_id}'
                 }, status=status.HTTP_400_BAD_REQUEST)
         
+        if self._es_asincrono(request):
+            return self._encolar('resumen_inventario', operario)
+        
+        # Con el inventario sin cambios se devuelve el reporte ya generado
+        en_cache = self._respuesta_en_cache('resumen_inventario', operario and operario.pk)
+        if en_cache:
+            return en_cache
+        
         # Crear reporte usando el nuevo modelo
         reporte = ReporteResumenInventario.objects.create(
             tipo_reporte='resumen_inventario',
@@ -481,7 +902,7 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
         # Generar datos usando el método del modelo
         datos_reporte = reporte.generar_datos_resumen()
         
-        return Response({
+        return self._guardar_en_cache({
             'mensaje': 'Reporte de resumen de inventario generado exitosamente',
             'reporte_id': reporte.id_reporte,
             'tipo_reporte': reporte.get_tipo_reporte_display(),
@@ -491,7 +912,7 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
                 'nombre': reporte.operario.nombre if reporte.operario else 'Sistema'
             },
             'datos': datos_reporte
-        }, status=status.HTTP_201_CREATED)
+        })
     
     @action(detail=False, methods=['post'])
     def generar_resumen_retiros(self, request):
@@ -509,9 +930,11 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
         - fecha_inicio (opcional): Fecha de inicio en formato YYYY-MM-DD (por defecto: 30 días atrás)
         - fecha_fin (opcional): Fecha de fin en formato YYYY-MM-DD (por defecto: hoy)
         - operario_id (opcional): ID del operario que genera el reporte
+        - incluir_detalle (opcional): false para guardar solo el resumen, sin la lista de retiros (por defecto: true)
+        - asincrono (opcional): true para encolar la generación y responder 202 con el ID del trabajo
         
         Respuesta incluye:
-        - retiros_detalle: Lista detallada de todos los retiros
+        - retiros_detalle: Lista detallada de todos los retiros (si se pidió el detalle)
         - resumen_por_ecoladrillo: Resumen agrupado por tipo de ecoladrillo
         - estadisticas: Estadísticas del período
         - periodo_info: Información del período consultado
@@ -519,6 +942,7 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
         fecha_inicio_str = request.data.get('fecha_inicio')
         fecha_fin_str = request.data.get('fecha_fin')
         operario_id = request.data.get('operario_id')
+        incluir_detalle = _como_booleano(request.data.get('incluir_detalle', True))
         
         # Validar operario si se proporciona
         operario = None
@@ -547,6 +971,19 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
                 'error': 'Formato de fecha inválido. Use YYYY-MM-DD'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if self._es_asincrono(request):
+            return self._encolar(
+                'resumen_retiros', operario, fecha_inicio=fecha_inicio.isoformat(),
+                fecha_fin=fecha_fin.isoformat(), incluir_detalle=incluir_detalle
+            )
+        
+        # Con el inventario sin cambios se devuelve el reporte ya generado
+        en_cache = self._respuesta_en_cache(
+            'resumen_retiros', fecha_inicio, fecha_fin, incluir_detalle, operario and operario.pk
+        )
+        if en_cache:
+            return en_cache
+        
         # Crear reporte usando el nuevo modelo
         reporte = ReporteResumenRetiros.objects.create(
             tipo_reporte='resumen_retiros',
@@ -557,9 +994,9 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
         )
         
         # Generar datos usando el método del modelo
-        datos_reporte = reporte.generar_datos_retiros()
+        datos_reporte = reporte.generar_datos_retiros(incluir_detalle=incluir_detalle)
         
-        return Response({
+        return self._guardar_en_cache({
             'mensaje': 'Reporte de resumen de retiros generado exitosamente',
             'reporte_id': reporte.id_reporte,
             'tipo_reporte': reporte.get_tipo_reporte_display(),
@@ -573,45 +1010,146 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
                 'fecha_fin': fecha_fin
             },
             'datos': datos_reporte
-        }, status=status.HTTP_201_CREATED)
+        })
+    
+    @action(detail=False, methods=['get'])
+    def stock_en_fechas(self, request):
+        """
+        Stock de ecoladrillos y materiales al cierre de varias fechas a la vez
+        
+        Parámetros de consulta:
+        - fechas: Lista de fechas separadas por coma en formato YYYY-MM-DD (máximo 100)
+        
+        Ejemplo de uso:
+        GET /api/v1/reportes/stock_en_fechas/?fechas=2025-06-30,2025-07-31
+        
+        El costo es constante respecto a la cantidad de fechas: cada fecha parte del
+        punto de control diario más cercano y solo aplica los movimientos intermedios.
+        """
+        fechas_str = request.query_params.get('fechas', '')
+        try:
+            fechas = sorted({
+                datetime.strptime(fecha.strip(), '%Y-%m-%d').date()
+                for fecha in fechas_str.split(',') if fecha.strip()
+            })
+        except ValueError:
+            return Response({
+                'error': 'Formato de fecha inválido. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not fechas:
+            return Response({'error': 'Parámetro fechas requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(fechas) > 100:
+            return Response({'error': 'Máximo 100 fechas por consulta'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ecoladrillos = list(Ecoladrillo.objects.values('id_ecoladrillo', 'nombre', 'cantidad'))
+        materiales = list(Material.objects.values('id_insumo', 'nombre', 'unidad_medida', 'cantidad_disponible'))
+        stock_ecoladrillos = stock_ecoladrillos_en_fechas(
+            fechas, {e['id_ecoladrillo']: e['cantidad'] for e in ecoladrillos}
+        )
+        stock_materiales = stock_materiales_en_fechas(
+            fechas, {m['id_insumo']: m['cantidad_disponible'] for m in materiales}
+        )
+        
+        return Response({
+            'ecoladrillos': [
+                {'id': e['id_ecoladrillo'], 'nombre': e['nombre']} for e in ecoladrillos
+            ],
+            'materiales': [
+                {'id': m['id_insumo'], 'nombre': m['nombre'], 'unidad_medida': m['unidad_medida']}
+                for m in materiales
+            ],
+            'stock': [
+                {
+                    'fecha': fecha,
+                    'ecoladrillos': stock_ecoladrillos[fecha],
+                    'materiales': stock_materiales[fecha]
+                }
+                for fecha in fechas
+            ]
+        })
     
     @action(detail=False, methods=['get'])
     def historial(self, request):
         """
-        Lista todos los reportes guardados con filtros opcionales
+        Lista los reportes guardados con filtros opcionales, paginados por cursor
         
         Parámetros de consulta opcionales:
         - tipo: Filtrar por tipo de reporte ('stock_fecha', 'resumen_inventario', 'resumen_retiros')
-        - fecha_desde: Filtrar reportes desde una fecha (formato YYYY-MM-DD)
+        - operario: Filtrar por ID del operario que generó el reporte
+        - fecha_desde: Reportes generados desde esa fecha, inclusive (formato YYYY-MM-DD)
+        - fecha_hasta: Reportes generados hasta esa fecha, inclusive (formato YYYY-MM-DD)
+        - page_size: Reportes por página (por defecto 20, máximo 100)
         
         Ejemplo de uso:
         GET /api/v1/reportes/historial/?tipo=resumen_inventario&fecha_desde=2025-08-01
         
         Respuesta incluye todos los campos específicos de cada tipo de reporte
         """
+        try:
+            reportes = self._filtrar_historial(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Serializar usando el serializer específico para cada reporte de la página; los
+        # reportes no cambian, así que se reutiliza lo ya armado con los mismos campos
+        pagina = self.paginate_queryset(reportes)
+        contexto = self.get_serializer_context()
+        campos, omitir = campos_pedidos(request)
+        seleccion = ('historial', contexto['compacto'], tuple(campos or ()), tuple(omitir))
+        reportes_data = representaciones_de_reportes(
+            pagina, seleccion,
+            lambda reporte: self._get_serializer_for_report_type(reporte)(reporte, context=contexto).data
+        )
+        
+        return self.get_paginated_response(reportes_data)
+    
+    def _filtrar_historial(self, params):
+        """Traduce los filtros del historial a condiciones SQL sobre los índices de Reporte"""
         reportes = self.get_queryset()
         
-        # Filtros opcionales
-        tipo = request.query_params.get('tipo')
+        tipo = params.get('tipo')
         if tipo:
-            reportes = [r for r in reportes if r.tipo_reporte == tipo]
+            tipos_validos = [clave for clave, _ in Reporte.TIPOS_REPORTE]
+            if tipo not in tipos_validos:
+                raise ValueError(f"Tipo de reporte inválido. Opciones: {', '.join(tipos_validos)}")
+            reportes = reportes.filter(tipo_reporte=tipo)
         
-        fecha_desde = request.query_params.get('fecha_desde')
-        if fecha_desde:
+        operario_id = params.get('operario')
+        if operario_id:
             try:
-                fecha_desde = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
-                reportes = [r for r in reportes if r.fecha_generacion.date() >= fecha_desde]
+                reportes = reportes.filter(operario_id=int(operario_id))
             except ValueError:
-                pass
+                raise ValueError('El parámetro operario debe ser un ID numérico')
         
-        # Serializar usando el serializer específico para cada reporte
-        reportes_data = []
-        for reporte in reportes:
-            serializer_class = self._get_serializer_for_report_type(reporte)
-            serializer = serializer_class(reporte)
-            reportes_data.append(serializer.data)
+        # Las fechas se convierten en límites de fecha_generacion (inicio del día local)
+        # para comparar la columna directamente y aprovechar los índices
+        fecha_desde = self._parse_fecha_param(params, 'fecha_desde')
+        fecha_hasta = self._parse_fecha_param(params, 'fecha_hasta')
+        if fecha_desde and fecha_hasta and fecha_desde > fecha_hasta:
+            raise ValueError('fecha_desde no puede ser posterior a fecha_hasta')
+        if fecha_desde:
+            reportes = reportes.filter(fecha_generacion__gte=self._inicio_del_dia(fecha_desde))
+        if fecha_hasta:
+            reportes = reportes.filter(
+                fecha_generacion__lt=self._inicio_del_dia(fecha_hasta + timedelta(days=1))
+            )
         
-        return Response(reportes_data)
+        return reportes
+    
+    @staticmethod
+    def _parse_fecha_param(params, nombre):
+        valor = params.get(nombre)
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f'Formato de {nombre} inválido. Use YYYY-MM-DD')
+    
+    @staticmethod
+    def _inicio_del_dia(fecha):
+        return timezone.make_aware(datetime.combine(fecha, datetime.min.time()))
     
     @action(detail=True, methods=['get'])
     def ver_datos(self, request, pk=None):
@@ -629,12 +1167,13 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
         reporte = self.get_object()
         
         # Usar el serializer específico según el tipo de reporte
+        contexto = self.get_serializer_context()
         if isinstance(reporte, ReporteStockFecha):
-            serializer = ReporteStockFechaSerializer(reporte)
+            serializer = ReporteStockFechaSerializer(reporte, context=contexto)
         elif isinstance(reporte, ReporteResumenInventario):
-            serializer = ReporteResumenInventarioSerializer(reporte)
+            serializer = ReporteResumenInventarioSerializer(reporte, context=contexto)
         elif isinstance(reporte, ReporteResumenRetiros):
-            serializer = ReporteResumenRetirosSerializer(reporte)
+            serializer = ReporteResumenRetirosSerializer(reporte, context=contexto)
         else:
             # Fallback al serializer base
             return Response({
@@ -654,6 +1193,23 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
 
     
     
+    @action(detail=False, methods=['get'])
+    def estadisticas_cache(self, request):
+        """
+        Estado de la caché de generación de reportes de este proceso
+        
+        `respuestas_armadas` describe la caché de respuestas de reportes ya generados
+        (detalle, ver_datos e historial), acotada por cantidad y por bytes.
+        
+        Ejemplo de uso:
+        GET /api/v1/reportes/estadisticas_cache/
+        """
+        return Response({
+            **cache_reportes.estadisticas(),
+            'version_inventario': VersionInventario.actual(),
+            'respuestas_armadas': cache_render_reportes.estadisticas()
+        })
+    
     @action(detail=False, methods=['get'])
     def operarios_disponibles(self, request):
         """
@@ -688,34 +1244,52 @@ class ReporteViewSet(viewsets.ReadOnlyModelViewSet):
     def obtener_con_serializer_especifico(self, request, pk=None):
         """Obtiene un reporte usando el serializer específico según su tipo"""
         reporte = self.get_object()
-        
-        # Determinar el serializer específico
-        if isinstance(reporte, ReporteStockFecha):
-            serializer = ReporteStockFechaSerializer(reporte)
-        elif isinstance(reporte, ReporteResumenInventario):
-            serializer = ReporteResumenInventarioSerializer(reporte)
-        elif isinstance(reporte, ReporteResumenRetiros):
-            serializer = ReporteResumenRetirosSerializer(reporte)
-        else:
-            serializer = ReporteSerializer(reporte)
-        
-        return Response(serializer.data)
+        serializer_class = self._get_serializer_for_report_type(reporte)
+        return Response(serializer_class(reporte, context=self.get_serializer_context()).data)
+
+
+class TrabajoReporteViewSet(CamposParcialesViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Estado de las generaciones de reportes encoladas con asincrono=true
+    
+    Parámetros de consulta del listado:
+    - estado (opcional): pendiente, en_proceso, completado o error
+    """
+    queryset = TrabajoReporte.objects.select_related('operario')
+    serializer_class = TrabajoReporteSerializer
+    permission_classes = [AllowAny]
+    
+    def get_queryset(self):
+        trabajos = super().get_queryset()
+        estado = self.request.query_params.get('estado')
+        if self.action == 'list' and estado:
+            trabajos = trabajos.filter(estado=estado)
+        return trabajos
+
+
 # ViewSets específicos para cada tipo de reporte
-class ReporteStockFechaViewSet(viewsets.ReadOnlyModelViewSet):
+class ReporteTipoViewSet(RenderReporteMixin, CamposParcialesViewMixin, viewsets.ReadOnlyModelViewSet):
+    """Base de los ViewSets por tipo: listado compacto por defecto, detalle completo"""
+    permission_classes = [AllowAny]
+    acciones_inmutables = ('retrieve',)
+    
+    def get_serializer_context(self):
+        contexto = super().get_serializer_context()
+        contexto['compacto'] = _representacion_compacta(self.request, self.action == 'list')
+        return contexto
+
+class ReporteStockFechaViewSet(ReporteTipoViewSet):
     """ViewSet específico para reportes de stock en fecha"""
-    queryset = ReporteStockFecha.objects.all()
+    queryset = ReporteStockFecha.objects.select_related('operario')
     serializer_class = ReporteStockFechaSerializer
-    permission_classes = [AllowAny]
 
-class ReporteResumenInventarioViewSet(viewsets.ReadOnlyModelViewSet):
+class ReporteResumenInventarioViewSet(ReporteTipoViewSet):
     """ViewSet específico para reportes de resumen de inventario"""
-    queryset = ReporteResumenInventario.objects.all()
+    queryset = ReporteResumenInventario.objects.select_related('operario')
     serializer_class = ReporteResumenInventarioSerializer
-    permission_classes = [AllowAny]
 
-class ReporteResumenRetirosViewSet(viewsets.ReadOnlyModelViewSet):
+class ReporteResumenRetirosViewSet(ReporteTipoViewSet):
     """ViewSet específico para reportes de resumen de retiros"""
-    queryset = ReporteResumenRetiros.objects.all()
+    queryset = ReporteResumenRetiros.objects.select_related('operario')
     serializer_class = ReporteResumenRetirosSerializer
-    permission_classes = [AllowAny]
     
\ No newline at end of file
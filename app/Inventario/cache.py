@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from threading import Lock
+
+# Reportes distintos que se conservan por proceso antes de descartar el menos usado
+TAMANO_CACHE_REPORTES = 128
+
+# Conteos de filas de listados paginados que se conservan por proceso
+TAMANO_CACHE_CONTEOS = 512
+
+# Respuestas de reportes ya generados que se conservan por proceso, y el total de bytes que ocupan
+TAMANO_CACHE_RENDER_REPORTES = 4096
+BYTES_CACHE_RENDER_REPORTES = 32 * 1024 * 1024
+
+
+class CacheLRU:
+    """
+    Caché en memoria de tamaño acotado que descarta la entrada usada hace más tiempo.
+
+    Con bytes_maximos también se acota la suma de los pesos (en bytes) de las entradas.
+    Lleva la cuenta de aciertos y fallos; es segura entre hilos del mismo proceso.
+    """
+
+    def __init__(self, tamano_maximo, bytes_maximos=None):
+        self.tamano_maximo = tamano_maximo
+        self.bytes_maximos = bytes_maximos
+        self._entradas = OrderedDict()
+        self._pesos = {}
+        self.bytes = 0
+        self._lock = Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        """Retorna el valor guardado o None, y lo marca como el más reciente"""
+        with self._lock:
+            if clave not in self._entradas:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return self._entradas[clave]
+
+    def guardar(self, clave, valor, peso=0):
+        """Guarda el valor con su peso en bytes; si el peso solo ya supera bytes_maximos no se guarda"""
+        with self._lock:
+            if self.bytes_maximos is not None and peso > self.bytes_maximos:
+                return
+            self._quitar(clave)
+            self._entradas[clave] = valor
+            self._pesos[clave] = peso
+            self.bytes += peso
+            while len(self._entradas) > self.tamano_maximo or (
+                self.bytes_maximos is not None and self.bytes > self.bytes_maximos
+            ):
+                self._quitar(next(iter(self._entradas)))
+
+    def descartar(self, clave):
+        with self._lock:
+            self._quitar(clave)
+
+    def _quitar(self, clave):
+        if clave in self._entradas:
+            del self._entradas[clave]
+            self.bytes -= self._pesos.pop(clave)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._pesos.clear()
+            self.bytes = 0
+            self.aciertos = 0
+            self.fallos = 0
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            estadisticas = {
+                'entradas': len(self._entradas),
+                'tamano_maximo': self.tamano_maximo,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
+            if self.bytes_maximos is not None:
+                estadisticas.update(bytes=self.bytes, bytes_maximos=self.bytes_maximos)
+            return estadisticas
+
+
+# Resultados de generación de reportes por (tipo, parámetros, versión del inventario)
+cache_reportes = CacheLRU(TAMANO_CACHE_REPORTES)
+
+# Conteos de listados por (consulta, versión del inventario)
+cache_conteos = CacheLRU(TAMANO_CACHE_CONTEOS)
+
+# Respuestas ya armadas de reportes generados por (reporte, URL, Accept) y representaciones
+# del historial por (reporte, campos pedidos)
+cache_render_reportes = CacheLRU(TAMANO_CACHE_RENDER_REPORTES, BYTES_CACHE_RENDER_REPORTES)
@@ -0,0 +1,102 @@
+import csv
+import json
+
+from .models import RegistroEcoladrillo, RegistroMaterial, RetiroEcoladrillo, recorrer_por_bloques
+
+# Filas que se traen por consulta; cada bloque sigue desde la última fila del anterior
+TAMANO_BLOQUE = 2000
+
+# Líneas que se juntan antes de enviarlas al cliente
+LINEAS_POR_ENVIO = 500
+
+FORMATOS = ('csv', 'ndjson')
+
+# Por cada historial: modelo, clave primaria y columnas (nombre en la salida, campo en values())
+# Los nombres coinciden con los de los serializers de la API
+HISTORIALES = {
+    'registros-ecoladrillo': (RegistroEcoladrillo, 'id_registro', [
+        ('id_registro', 'id_registro'),
+        ('fecha', 'fecha'),
+        ('ecoladrillo', 'ecoladrillo_id'),
+        ('ecoladrillo_nombre', 'ecoladrillo__nombre'),
+        ('cantidad', 'cantidad'),
+    ]),
+    'retiros-ecoladrillo': (RetiroEcoladrillo, 'id_retiro', [
+        ('id_retiro', 'id_retiro'),
+        ('fecha', 'fecha'),
+        ('ecoladrillo', 'ecoladrillo_id'),
+        ('ecoladrillo_nombre', 'ecoladrillo__nombre'),
+        ('cantidad', 'cantidad'),
+        ('motivo', 'motivo'),
+    ]),
+    'registros-material': (RegistroMaterial, 'id_registro_material', [
+        ('id_registro_material', 'id_registro_material'),
+        ('fecha', 'fecha'),
+        ('cantidad', 'cantidad'),
+        ('material', 'material_id'),
+        ('material_nombre', 'material__nombre'),
+        ('origen', 'origen'),
+    ]),
+}
+
+
+class _Eco:
+    """Destino de csv.writer que devuelve la línea escrita en lugar de guardarla"""
+
+    def write(self, valor):
+        return valor
+
+
+def _filas(historial, desde=None, hasta=None):
+    """Recorre el historial en orden (fecha, id) como tuplas, con los nombres unidos en la misma consulta"""
+    modelo, clave, columnas = HISTORIALES[historial]
+    campos = [campo for _, campo in columnas]
+    filas = modelo.objects.all()
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    for fila in recorrer_por_bloques(filas.values(*campos), ['fecha', clave], TAMANO_BLOQUE):
+        yield tuple(fila[campo] for campo in campos)
+
+
+def _por_envios(lineas):
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= LINEAS_POR_ENVIO:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def _lineas_csv(nombres, filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(nombres)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def _lineas_ndjson(nombres, filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(nombres, fila)), ensure_ascii=False, default=str) + '\n'
+
+
+def exportar_historial(historial, formato, desde=None, hasta=None):
+    """
+    Genera el historial de movimientos como texto CSV o NDJSON, por partes.
+
+    Las filas se leen con una consulta por bloque (ver recorrer_por_bloques) y se escriben a
+    medida que llegan, así la memoria no depende del tamaño del historial en ningún motor y
+    la primera parte está lista sin esperar al resto. La primera consulta se ejecuta recién
+    cuando se pide la primera parte.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido. Opciones: {', '.join(FORMATOS)}")
+    if desde and hasta and hasta < desde:
+        raise ValueError("La fecha final no puede ser anterior a la inicial")
+
+    nombres = [nombre for nombre, _ in HISTORIALES[historial][2]]
+    lineas = _lineas_csv if formato == 'csv' else _lineas_ndjson
+    return _por_envios(lineas(nombres, _filas(historial, desde, hasta)))
@@ -0,0 +1,131 @@
+import csv
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+
+from .models import (
+    Material, MovimientoDiarioMaterial, RegistroMaterial, StockDiarioMaterial, VersionInventario
+)
+
+# Filas que se insertan por consulta; acota la memoria sin importar el tamaño del archivo
+TAMANO_BLOQUE = 1000
+
+# Errores que se devuelven en el resumen (el total se cuenta siempre)
+MAX_ERRORES = 100
+
+COLUMNAS_REQUERIDAS = {'fecha', 'cantidad', 'material'}
+
+
+class _ImportacionInvalida(Exception):
+    """Revierte la importación cuando alguna fila del archivo es inválida"""
+
+
+def _registro_desde_fila(fila, materiales_por_id, materiales_por_nombre):
+    """Convierte una fila del CSV en un RegistroMaterial sin consultar la base de datos"""
+    try:
+        fecha = date.fromisoformat((fila.get('fecha') or '').strip())
+    except ValueError:
+        raise ValueError("fecha: Formato de fecha inválido. Use YYYY-MM-DD")
+
+    try:
+        cantidad = int((fila.get('cantidad') or '').strip())
+    except ValueError:
+        raise ValueError("cantidad: Debe ser un número entero")
+    if cantidad <= 0:
+        raise ValueError("cantidad: Debe ser mayor a cero")
+
+    # El material se busca primero por ID y luego por nombre (sin distinguir mayúsculas)
+    referencia = (fila.get('material') or '').strip()
+    material_id = materiales_por_id.get(referencia) or materiales_por_nombre.get(referencia.lower())
+    if material_id is None:
+        raise ValueError(f"material: No existe un material con ID o nombre '{referencia}'")
+
+    return RegistroMaterial(
+        fecha=fecha,
+        cantidad=cantidad,
+        material_id=material_id,
+        origen=(fila.get('origen') or '').strip()[:100],
+    )
+
+
+def importar_registros_material(archivo, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Importa ingresos de material desde un CSV de texto leído fila a fila.
+
+    Columnas: fecha (YYYY-MM-DD), cantidad, material (ID o nombre) y origen (opcional).
+    Los materiales se resuelven con un diccionario cargado una sola vez, las filas se
+    insertan por bloques y el stock se actualiza al final con las cantidades sumadas
+    por material, así la memoria no depende del tamaño del archivo.
+
+    La importación es todo o nada: si alguna fila es inválida no se guarda ninguna y
+    el resumen devuelto lista los errores (hasta MAX_ERRORES).
+    """
+    lector = csv.DictReader(archivo)
+    faltantes = COLUMNAS_REQUERIDAS - set(lector.fieldnames or [])
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(sorted(faltantes))}")
+
+    materiales_por_id = {}
+    materiales_por_nombre = {}
+    for id_insumo, nombre in Material.objects.values_list('id_insumo', 'nombre'):
+        materiales_por_id[str(id_insumo)] = id_insumo
+        materiales_por_nombre.setdefault(nombre.strip().lower(), id_insumo)
+
+    cantidades = defaultdict(int)
+    ajustes = defaultdict(int)
+    errores = []
+    total_errores = 0
+    importados = 0
+    bloque = []
+
+    try:
+        with transaction.atomic():
+            for fila in lector:
+                try:
+                    registro = _registro_desde_fila(fila, materiales_por_id, materiales_por_nombre)
+                except ValueError as e:
+                    total_errores += 1
+                    if len(errores) < MAX_ERRORES:
+                        errores.append(f"Línea {lector.line_num}: {e}")
+                    continue
+
+                # Después del primer error ya no se guarda nada; solo se sigue validando
+                if total_errores:
+                    continue
+
+                bloque.append(registro)
+                cantidades[registro.material_id] += registro.cantidad
+                ajustes[(registro.material_id, registro.fecha)] += registro.cantidad
+                if len(bloque) >= tamano_bloque:
+                    RegistroMaterial.objects.bulk_create(bloque)
+                    importados += len(bloque)
+                    bloque = []
+
+            if total_errores:
+                raise _ImportacionInvalida()
+
+            if bloque:
+                RegistroMaterial.objects.bulk_create(bloque)
+                importados += len(bloque)
+
+            Material.agregar_stock_lote(cantidades)
+            VersionInventario.incrementar('registromaterial')
+            StockDiarioMaterial.ajustar_lote(ajustes)
+            MovimientoDiarioMaterial.sumar_lote(
+                {clave: {'recibido': cantidad} for clave, cantidad in ajustes.items()}
+            )
+    except _ImportacionInvalida:
+        return {
+            'registros_importados': 0,
+            'materiales_actualizados': 0,
+            'total_errores': total_errores,
+            'errores': errores,
+        }
+
+    return {
+        'registros_importados': importados,
+        'materiales_actualizados': len(cantidades),
+        'total_errores': 0,
+        'errores': [],
+    }
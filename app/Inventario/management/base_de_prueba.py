@@ -0,0 +1,37 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def base_de_datos_de_prueba(verbosidad=0):
+    """
+    Crea una base de datos de prueba vacía con las migraciones aplicadas, como hace el test
+    runner, la usa como `default` dentro del bloque y la borra al salir.
+
+    Los benchmarks corren ahí para no tocar los datos ni bloquear a quienes escriben en la
+    base configurada. Con SQLite la base de prueba es un archivo temporal en lugar de una
+    base en memoria, así varios hilos pueden escribir a la vez esperando su turno.
+    """
+    nombre_original = connection.settings_dict['NAME']
+    prueba = connection.settings_dict.setdefault('TEST', {})
+    nombre_prueba_original = prueba.get('NAME')
+    archivo = None
+    if connection.vendor == 'sqlite' and not nombre_prueba_original:
+        descriptor, archivo = tempfile.mkstemp(prefix='benchmark_', suffix='.sqlite3')
+        os.close(descriptor)
+        prueba['NAME'] = archivo
+    try:
+        connection.creation.create_test_db(verbosity=verbosidad, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=verbosidad)
+    finally:
+        prueba['NAME'] = nombre_prueba_original
+        if archivo:
+            for ruta in (archivo, f'{archivo}-journal', f'{archivo}-wal', f'{archivo}-shm'):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
@@ -0,0 +1,312 @@
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from Inventario.cache import cache_conteos, cache_reportes
+from Inventario.management.base_de_prueba import base_de_datos_de_prueba
+from Inventario.models import (
+    Ecoladrillo, Material, Operario, RegistroEcoladrillo, RegistroMaterial, RetiroEcoladrillo,
+    VersionInventario, guardar_stock_diario, reconstruir_movimientos_diarios
+)
+
+# Filas por INSERT al generar el historial
+TAMANO_BLOQUE = 5000
+
+TIPOS_MATERIAL = ('plástico', 'vidrio', 'papel', 'metal')
+
+PERCENTILES = (50, 90, 95, 99)
+
+# En el orden en que se miden: el listado de reportes va al final para incluir los generados
+ESCENARIOS = (
+    'registro', 'reporte_stock_ecoladrillos', 'reporte_stock_materiales', 'generar_stock_fecha',
+    'generar_resumen_inventario', 'generar_resumen_retiros', 'reportes',
+)
+
+# Parámetros de escala guardados con la línea base: solo se comparan corridas de la misma escala
+PARAMETROS_ESCALA = ('materiales', 'ecoladrillos', 'anios', 'movimientos_por_dia', 'semilla', 'con_cache')
+
+
+def _percentil(ordenados, percentil):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    posicion = max(0, -(-percentil * len(ordenados) // 100) - 1)
+    return ordenados[posicion]
+
+
+def _sembrar(azar, materiales, ecoladrillos, anios, movimientos_por_dia, stock_extra):
+    """
+    Genera un catálogo y `anios` años de movimientos que terminan ayer, coherentes con el stock.
+
+    Los retiros nunca superan lo producido hasta ese día y el stock final de cada item es
+    el que dejan sus movimientos. El historial se inserta en bloques sin pasar por la lógica
+    de stock y después se reconstruyen el resumen diario y los puntos de control, como
+    quedarían en una base con ese historial. Retorna (ids de ecoladrillos, primer día, último día).
+    """
+    hoy = timezone.localdate()
+    inicio = hoy - timedelta(days=365 * anios)
+    fin = hoy - timedelta(days=1)
+
+    catalogo_materiales = Material.objects.bulk_create([
+        Material(
+            nombre=f'Benchmark material {i}', tipo=azar.choice(TIPOS_MATERIAL),
+            cantidad_disponible=0, unidad_medida='kg'
+        )
+        for i in range(materiales)
+    ])
+    catalogo = Ecoladrillo.objects.bulk_create([
+        Ecoladrillo(
+            nombre=f'Benchmark ecoladrillo {i}', descripcion='benchmark',
+            material_principal=azar.choice(catalogo_materiales),
+            cantidad_material_requerida=azar.randint(1, 5), cantidad=0
+        )
+        for i in range(ecoladrillos)
+    ])
+
+    stock = defaultdict(int)
+    recibido = defaultdict(int)
+    pendientes = {RegistroEcoladrillo: [], RetiroEcoladrillo: [], RegistroMaterial: []}
+
+    def agregar(movimiento):
+        lista = pendientes[type(movimiento)]
+        lista.append(movimiento)
+        if len(lista) >= TAMANO_BLOQUE:
+            type(movimiento).objects.bulk_create(lista)
+            lista.clear()
+
+    fecha = inicio
+    while fecha <= fin:
+        for _ in range(movimientos_por_dia):
+            ecoladrillo = azar.choice(catalogo)
+            cantidad = azar.randint(1, 20)
+            agregar(RegistroEcoladrillo(fecha=fecha, ecoladrillo=ecoladrillo, cantidad=cantidad))
+            stock[ecoladrillo.pk] += cantidad
+
+        # Cerca de un tercio de los movimientos del día son retiros y un décimo ingresos de material
+        for _ in range(movimientos_por_dia // 3):
+            ecoladrillo = azar.choice(catalogo)
+            if stock[ecoladrillo.pk]:
+                cantidad = azar.randint(1, stock[ecoladrillo.pk])
+                agregar(RetiroEcoladrillo(fecha=fecha, ecoladrillo=ecoladrillo, cantidad=cantidad, motivo='Venta'))
+                stock[ecoladrillo.pk] -= cantidad
+        for _ in range(max(1, movimientos_por_dia // 10)):
+            material = azar.choice(catalogo_materiales)
+            cantidad = azar.randint(50, 500)
+            agregar(RegistroMaterial(fecha=fecha, cantidad=cantidad, material=material, origen='Donación'))
+            recibido[material.pk] += cantidad
+        fecha += timedelta(days=1)
+
+    for modelo, lista in pendientes.items():
+        modelo.objects.bulk_create(lista)
+
+    for ecoladrillo in catalogo:
+        ecoladrillo.cantidad = stock[ecoladrillo.pk]
+    Ecoladrillo.objects.bulk_update(catalogo, ['cantidad'], batch_size=TAMANO_BLOQUE)
+    # El stock inicial de cada material es lo que consumió el historial más un margen, así nunca
+    # quedó negativo: el stock final es entonces lo recibido más ese margen
+    for material in catalogo_materiales:
+        material.cantidad_disponible = recibido[material.pk] + stock_extra
+    Material.objects.bulk_update(catalogo_materiales, ['cantidad_disponible'], batch_size=TAMANO_BLOQUE)
+
+    reconstruir_movimientos_diarios(inicio, fin)
+    guardar_stock_diario(inicio, fin)
+    VersionInventario.incrementar(*VersionInventario.TABLAS)
+    return [ecoladrillo.pk for ecoladrillo in catalogo], inicio, fin
+
+
+def _escenarios(azar, ecoladrillos, operario_id, inicio, fin):
+    """{nombre: función que retorna (método, url, datos)} de cada escenario de ESCENARIOS"""
+    dias = (fin - inicio).days
+
+    def fecha_al_azar():
+        return inicio + timedelta(days=azar.randint(0, dias))
+
+    def registro():
+        return 'post', '/api/v1/registros-ecoladrillo/', {
+            'fecha': str(timezone.localdate()), 'ecoladrillo': azar.choice(ecoladrillos), 'cantidad': azar.randint(1, 5),
+        }
+
+    def resumen_retiros():
+        desde = fecha_al_azar()
+        return 'post', '/api/v1/reportes/generar_resumen_retiros/', {
+            'fecha_inicio': str(desde), 'fecha_fin': str(min(desde + timedelta(days=30), fin)), 'operario_id': operario_id,
+        }
+
+    return {
+        'registro': registro,
+        'reporte_stock_ecoladrillos': lambda: ('get', '/api/v1/ecoladrillos/reporte_stock/', None),
+        'reporte_stock_materiales': lambda: ('get', '/api/v1/materiales/reporte_stock/', None),
+        'generar_stock_fecha': lambda: ('post', '/api/v1/reportes/generar_stock_fecha/', {
+            'fecha': str(fecha_al_azar()), 'operario_id': operario_id,
+        }),
+        'generar_resumen_inventario': lambda: ('post', '/api/v1/reportes/generar_resumen_inventario/', {
+            'operario_id': operario_id,
+        }),
+        'generar_resumen_retiros': resumen_retiros,
+        'reportes': lambda: ('get', '/api/v1/reportes/', None),
+    }
+
+
+def _medir(cliente, peticion, repeticiones, calentamiento, con_cache):
+    """Ejecuta un escenario y retorna sus tiempos (s) y consultas por petición, sin el calentamiento"""
+    tiempos = []
+    consultas_por_peticion = []
+    for i in range(calentamiento + repeticiones):
+        metodo, url, datos = peticion()
+        if not con_cache:
+            cache_reportes.limpiar()
+            cache_conteos.limpiar()
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            if metodo == 'get':
+                respuesta = cliente.get(url)
+            else:
+                respuesta = cliente.post(url, json.dumps(datos), content_type='application/json')
+            duracion = time.perf_counter() - inicio
+        if respuesta.status_code >= 400:
+            raise CommandError(f'{metodo.upper()} {url} respondió {respuesta.status_code}: {respuesta.content[:200]!r}')
+        if i >= calentamiento:
+            tiempos.append(duracion)
+            consultas_por_peticion.append(sum(
+                1 for consulta in consultas.captured_queries
+                if not consulta['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+            ))
+    return tiempos, consultas_por_peticion
+
+
+def _resumir(tiempos, consultas):
+    ordenados = sorted(tiempos)
+    resultado = {f'p{p}_ms': round(_percentil(ordenados, p) * 1000, 2) for p in PERCENTILES}
+    resultado['max_ms'] = round(ordenados[-1] * 1000, 2)
+    resultado['peticiones_por_segundo'] = round(len(tiempos) / sum(tiempos), 1)
+    resultado['consultas'] = max(consultas)
+    return resultado
+
+
+def _comparar(resultados, linea_base, tolerancia):
+    """Lista de regresiones respecto de la línea base: más consultas, o tiempos fuera de la tolerancia"""
+    regresiones = []
+    for nombre, actual in resultados.items():
+        base = linea_base.get(nombre)
+        if base is None:
+            continue
+        if actual['consultas'] > base['consultas']:
+            regresiones.append(f"{nombre}: {actual['consultas']} consultas (línea base {base['consultas']})")
+        if actual['p95_ms'] > base['p95_ms'] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {actual['p95_ms']} ms (línea base {base['p95_ms']} ms)")
+        if actual['peticiones_por_segundo'] < base['peticiones_por_segundo'] * (1 - tolerancia):
+            regresiones.append(
+                f"{nombre}: {actual['peticiones_por_segundo']} pet/s (línea base {base['peticiones_por_segundo']} pet/s)"
+            )
+    return regresiones
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera un inventario sintético (catálogo y años de movimientos) y mide latencia por "
+        "percentiles, peticiones por segundo y consultas de los endpoints más usados de la API. "
+        "Puede guardar los resultados como línea base y comparar corridas posteriores con ella. "
+        "Corre sobre una base de datos de prueba que se crea y se borra, como la de los tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--materiales', type=int, default=50, help='Materiales del catálogo')
+        parser.add_argument('--ecoladrillos', type=int, default=200, help='Ecoladrillos del catálogo')
+        parser.add_argument('--anios', type=int, default=1, help='Años de historial de movimientos')
+        parser.add_argument('--movimientos-por-dia', type=int, default=30,
+                            help='Registros de ecoladrillos por día (más un tercio de retiros)')
+        parser.add_argument('--repeticiones', type=int, default=50, help='Peticiones medidas por escenario')
+        parser.add_argument('--calentamiento', type=int, default=3, help='Peticiones previas sin medir')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla de los datos y parámetros al azar')
+        parser.add_argument('--escenarios', help='Escenarios a medir separados por coma (por defecto todos)')
+        parser.add_argument('--con-cache', action='store_true',
+                            help='No vaciar las cachés de reportes y conteos antes de cada petición')
+        parser.add_argument('--linea-base', default=str(Path(settings.BASE_DIR) / 'benchmark_linea_base.json'),
+                            help='Archivo JSON de la línea base')
+        parser.add_argument('--guardar-linea-base', action='store_true',
+                            help='Guardar los resultados como nueva línea base')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Empeoramiento de tiempos aceptado respecto de la línea base (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        for opcion in ('materiales', 'ecoladrillos', 'anios', 'movimientos_por_dia', 'repeticiones'):
+            if options[opcion] < 1:
+                raise CommandError(f"--{opcion.replace('_', '-')} debe ser mayor a cero")
+
+        if options['escenarios']:
+            pedidos = {nombre.strip() for nombre in options['escenarios'].split(',') if nombre.strip()}
+            desconocidos = pedidos - set(ESCENARIOS)
+            if desconocidos:
+                raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+            medidos = [nombre for nombre in ESCENARIOS if nombre in pedidos]
+        else:
+            medidos = list(ESCENARIOS)
+
+        escala = {parametro: options[parametro] for parametro in PARAMETROS_ESCALA}
+        ruta_linea_base = Path(options['linea_base'])
+        linea_base = None
+        if not options['guardar_linea_base'] and ruta_linea_base.exists():
+            linea_base = json.loads(ruta_linea_base.read_text(encoding='utf-8'))
+            if linea_base.get('escala') != escala:
+                self.stdout.write(self.style.WARNING(
+                    f"La línea base se midió con otra escala ({linea_base.get('escala')}); no se compara"
+                ))
+                linea_base = None
+
+        azar = random.Random(options['semilla'])
+        # Los enlaces de paginación necesitan un host aceptado por ALLOWED_HOSTS
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+        cliente = Client(HTTP_HOST=host)
+        resultados = {}
+
+        # Los datos se generan en una base aparte: la configurada no se toca ni se bloquea
+        with base_de_datos_de_prueba():
+            inicio_siembra = time.perf_counter()
+            with transaction.atomic():
+                ecoladrillos, inicio, fin = _sembrar(
+                    azar, options['materiales'], options['ecoladrillos'], options['anios'],
+                    options['movimientos_por_dia'], stock_extra=(options['repeticiones'] + options['calentamiento']) * 25
+                )
+            operario = Operario.objects.create(
+                nombre='Benchmark', email='benchmark@benchmark.local', cargo='benchmark', contraseña='benchmark'
+            )
+            self.stdout.write(
+                f"Datos generados en {time.perf_counter() - inicio_siembra:.1f} s: "
+                f"{RegistroEcoladrillo.objects.count()} registros, {RetiroEcoladrillo.objects.count()} retiros "
+                f"y {RegistroMaterial.objects.count()} ingresos de material entre {inicio} y {fin}"
+            )
+
+            escenarios = _escenarios(azar, ecoladrillos, operario.pk, inicio, fin)
+            self.stdout.write(
+                f"{'escenario':<28}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}{'pet/s':>9}{'consultas':>11}"
+            )
+            for nombre in medidos:
+                tiempos, consultas = _medir(
+                    cliente, escenarios[nombre], options['repeticiones'], options['calentamiento'], options['con_cache']
+                )
+                resultado = resultados[nombre] = _resumir(tiempos, consultas)
+                self.stdout.write(
+                    f"{nombre:<28}" + ''.join(f"{resultado[f'p{p}_ms']:>9.1f}" for p in PERCENTILES)
+                    + f"{resultado['max_ms']:>9.1f}{resultado['peticiones_por_segundo']:>9.1f}"
+                    + f"{resultado['consultas']:>11}"
+                )
+
+        if options['guardar_linea_base']:
+            ruta_linea_base.write_text(
+                json.dumps({'escala': escala, 'escenarios': resultados}, indent=2, ensure_ascii=False),
+                encoding='utf-8'
+            )
+            self.stdout.write(self.style.SUCCESS(f'Línea base guardada en {ruta_linea_base}'))
+        elif linea_base is not None:
+            regresiones = _comparar(resultados, linea_base['escenarios'], options['tolerancia'])
+            if regresiones:
+                raise CommandError('Empeoró respecto de la línea base:\n' + '\n'.join(regresiones))
+            self.stdout.write(self.style.SUCCESS('Sin regresiones respecto de la línea base'))
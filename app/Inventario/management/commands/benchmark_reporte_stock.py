@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from Inventario.api.serializers import EcoladrilloSerializer
+from Inventario.api.views import EcoladrilloViewSet
+from Inventario.management.base_de_prueba import base_de_datos_de_prueba
+from Inventario.models import Ecoladrillo, Material, VersionInventario
+
+
+def _reporte_legado():
+    """Camino anterior: sumar en Python, tres count() y serializar todo sin select_related"""
+    ecoladrillos = Ecoladrillo.objects.all()
+    return {
+        'total_tipos_ecoladrillos': ecoladrillos.count(),
+        'stock_total': sum(e.cantidad for e in ecoladrillos),
+        'tipos_con_stock_bajo': ecoladrillos.filter(cantidad__lt=10).count(),
+        'tipos_sin_stock': ecoladrillos.filter(cantidad=0).count(),
+        'ecoladrillos': EcoladrilloSerializer(ecoladrillos, many=True).data,
+    }
+
+
+def _reporte_actual():
+    """Camino actual: la acción reporte_stock del ViewSet (agregación + página del listado)"""
+    # Los enlaces de paginación necesitan un host aceptado por ALLOWED_HOSTS
+    host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+    vista = EcoladrilloViewSet.as_view({'get': 'reporte_stock'})
+    respuesta = vista(APIRequestFactory().get('/api/v1/ecoladrillos/reporte_stock/', HTTP_HOST=host))
+    return respuesta.data
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide consultas y tiempo del reporte de stock de ecoladrillos con catálogos de distinto "
+        "tamaño, comparando el camino anterior con el actual. Corre sobre una base de datos de prueba "
+        "que se crea y se borra, como la de los tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='10,100,1000',
+                            help='Tamaños de catálogo separados por coma')
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = sorted({int(t) for t in options['tamanos'].split(',') if t.strip()})
+        except ValueError:
+            raise CommandError('Los tamaños deben ser números enteros separados por coma')
+
+        with base_de_datos_de_prueba():
+            material = Material.objects.create(
+                nombre='Benchmark', tipo='benchmark', cantidad_disponible=0, unidad_medida='kg'
+            )
+            creados = 0
+
+            self.stdout.write(f"{'catálogo':>10}{'escenario':>10}{'consultas':>11}{'ms':>10}")
+            for tamano in tamanos:
+                # El catálogo crece de forma acumulada hasta el tamaño pedido
+                Ecoladrillo.objects.bulk_create([
+                    Ecoladrillo(
+                        nombre=f'Benchmark {i}', descripcion='benchmark', material_principal=material,
+                        cantidad_material_requerida=1, cantidad=i % 20
+                    )
+                    for i in range(creados, tamano)
+                ])
+                # bulk_create no pasa por save(): sin esto el conteo en caché sería el del tamaño anterior
+                VersionInventario.incrementar('ecoladrillo')
+                creados = max(creados, tamano)
+
+                for nombre, reporte in (('legado', _reporte_legado), ('actual', _reporte_actual)):
+                    with CaptureQueriesContext(connection) as consultas:
+                        inicio = time.perf_counter()
+                        reporte()
+                        duracion = time.perf_counter() - inicio
+                    self.stdout.write(
+                        f"{tamano:>10}{nombre:>10}{len(consultas.captured_queries):>11}{duracion * 1000:>10.1f}"
+                    )
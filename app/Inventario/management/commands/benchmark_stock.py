@@ -0,0 +1,165 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, models
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from Inventario.management.base_de_prueba import base_de_datos_de_prueba
+from Inventario.models import Ecoladrillo, Material, RegistroEcoladrillo, RetiroEcoladrillo
+
+
+# Los caminos legados reproducen el guardado anterior al UPDATE condicional: se lee el
+# objeto, se verifica el stock en Python y se guarda la fila completa con el valor
+# calculado. models.Model.save evita las mezclas actuales para ejecutar solo ese código.
+
+def _registro_legado(ecoladrillo_id, cantidad, fecha):
+    """Camino anterior: leer, verificar en Python y guardar cada objeto por separado"""
+    ecoladrillo = Ecoladrillo.objects.get(pk=ecoladrillo_id)
+    if not ecoladrillo.puede_producir(cantidad):
+        raise ValueError("No hay suficiente material disponible")
+    models.Model.save(RegistroEcoladrillo(fecha=fecha, ecoladrillo=ecoladrillo, cantidad=cantidad))
+    ecoladrillo.cantidad += cantidad
+    models.Model.save(ecoladrillo)
+    material = ecoladrillo.material_principal
+    necesario = ecoladrillo.calcular_material_necesario(cantidad)
+    if material.cantidad_disponible < necesario:
+        raise ValueError("No hay suficiente stock para reducir")
+    material.cantidad_disponible -= necesario
+    models.Model.save(material)
+
+
+def _retiro_legado(ecoladrillo_id, cantidad, fecha):
+    ecoladrillo = Ecoladrillo.objects.get(pk=ecoladrillo_id)
+    if ecoladrillo.cantidad < cantidad:
+        raise ValueError("No hay suficientes ecoladrillos disponibles")
+    models.Model.save(
+        RetiroEcoladrillo(fecha=fecha, ecoladrillo=ecoladrillo, cantidad=cantidad, motivo='benchmark')
+    )
+    ecoladrillo.cantidad -= cantidad
+    models.Model.save(ecoladrillo)
+
+
+def _registro_atomico(ecoladrillo_id, cantidad, fecha):
+    """Camino actual: el mismo flujo que hace el serializer (cargar el ecoladrillo y guardar)"""
+    ecoladrillo = Ecoladrillo.objects.get(pk=ecoladrillo_id)
+    RegistroEcoladrillo(fecha=fecha, ecoladrillo=ecoladrillo, cantidad=cantidad).save()
+
+
+def _retiro_atomico(ecoladrillo_id, cantidad, fecha):
+    ecoladrillo = Ecoladrillo.objects.get(pk=ecoladrillo_id)
+    RetiroEcoladrillo(fecha=fecha, ecoladrillo=ecoladrillo, cantidad=cantidad, motivo='benchmark').save()
+
+
+def _crear_ecoladrillo(stock, material_disponible):
+    material = Material.objects.create(
+        nombre='Benchmark', tipo='benchmark', cantidad_disponible=material_disponible, unidad_medida='kg'
+    )
+    return Ecoladrillo.objects.create(
+        nombre='Benchmark', descripcion='benchmark', material_principal=material,
+        cantidad_material_requerida=1, cantidad=stock
+    )
+
+
+def _retiros_concurrentes(operacion, ecoladrillo_id, hilos, por_hilo, fecha):
+    """
+    Lanza `hilos` operarios que retiran una unidad `por_hilo` veces cada uno, todos a la vez
+    sobre el mismo ecoladrillo. Retorna (retiros guardados, retiros rechazados, segundos).
+    """
+    barrera = threading.Barrier(hilos + 1)
+    guardados = [0] * hilos
+    rechazados = [0] * hilos
+
+    def operario(indice):
+        try:
+            barrera.wait()
+            for _ in range(por_hilo):
+                try:
+                    operacion(ecoladrillo_id, 1, fecha)
+                    guardados[indice] += 1
+                except (ValueError, DatabaseError):
+                    rechazados[indice] += 1
+        finally:
+            # Cada hilo abre su propia conexión; se cierra para poder borrar la base de prueba
+            connection.close()
+
+    trabajadores = [threading.Thread(target=operario, args=(indice,)) for indice in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for trabajador in trabajadores:
+        trabajador.join()
+    return sum(guardados), sum(rechazados), time.perf_counter() - inicio
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el camino de stock anterior (leer-verificar-guardar) con el UPDATE condicional "
+        "actual: rendimiento en serie y retiros concurrentes de varios operarios. Corre sobre "
+        "una base de datos de prueba que se crea y se borra, como la de los tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operaciones', type=int, default=500, help='Movimientos por escenario')
+        parser.add_argument('--hilos', type=int, default=8, help='Operarios concurrentes en la prueba de contención')
+
+    def handle(self, *args, **options):
+        with base_de_datos_de_prueba():
+            self._en_serie(options['operaciones'])
+            if options['hilos'] > 1:
+                self._contencion(options['operaciones'], options['hilos'])
+
+    def _en_serie(self, operaciones):
+        escenarios = [
+            ('registro legado', _registro_legado),
+            ('registro atómico', _registro_atomico),
+            ('retiro legado', _retiro_legado),
+            ('retiro atómico', _retiro_atomico),
+        ]
+        ecoladrillo = _crear_ecoladrillo(0, operaciones * 10)
+        fecha = timezone.now().date()
+
+        self.stdout.write("En serie")
+        self.stdout.write(f"{'escenario':<18}{'ops/s':>10}{'consultas/op':>15}")
+        for nombre, operacion in escenarios:
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                for _ in range(operaciones):
+                    operacion(ecoladrillo.pk, 1, fecha)
+                duracion = time.perf_counter() - inicio
+            total = len(consultas.captured_queries)
+            self.stdout.write(
+                f"{nombre:<18}{operaciones / duracion:>10.1f}"
+                f"{total / operaciones:>15.1f}"
+            )
+
+    def _contencion(self, operaciones, hilos):
+        """
+        Cada escenario parte de un stock igual a la mitad de los retiros intentados. Con el
+        camino correcto se guardan exactamente tantos retiros como stock había y el stock
+        termina en cero; las actualizaciones perdidas son retiros guardados que no
+        descontaron stock.
+        """
+        por_hilo = max(1, operaciones // hilos)
+        stock_inicial = hilos * por_hilo // 2
+        fecha = timezone.now().date()
+
+        self.stdout.write("")
+        self.stdout.write(f"Contención: {hilos} operarios x {por_hilo} retiros, stock inicial {stock_inicial}")
+        self.stdout.write(
+            f"{'escenario':<18}{'ops/s':>10}{'guardados':>11}{'rechazados':>12}"
+            f"{'stock final':>13}{'perdidas':>10}"
+        )
+        for nombre, operacion in (('retiro legado', _retiro_legado), ('retiro atómico', _retiro_atomico)):
+            ecoladrillo = _crear_ecoladrillo(stock_inicial, 0)
+            guardados, rechazados, duracion = _retiros_concurrentes(
+                operacion, ecoladrillo.pk, hilos, por_hilo, fecha
+            )
+            ecoladrillo.refresh_from_db()
+            perdidas = guardados - (stock_inicial - ecoladrillo.cantidad)
+            self.stdout.write(
+                f"{nombre:<18}{(guardados + rechazados) / duracion:>10.1f}{guardados:>11}"
+                f"{rechazados:>12}{ecoladrillo.cantidad:>13}{perdidas:>10}"
+            )
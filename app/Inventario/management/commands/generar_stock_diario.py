@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from Inventario.models import guardar_stock_diario
+
+
+class Command(BaseCommand):
+    help = (
+        "Guarda los puntos de control diarios de stock de ecoladrillos y materiales. "
+        "Sin parámetros guarda el cierre del día anterior; pensado para ejecutarse cada noche."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día a guardar (YYYY-MM-DD)')
+        parser.add_argument('--hasta', help='Último día a guardar (YYYY-MM-DD), por defecto ayer')
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        try:
+            hasta = self._parse_fecha(options['hasta']) or hoy - timedelta(days=1)
+            desde = self._parse_fecha(options['desde']) or hasta
+        except ValueError:
+            raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+
+        try:
+            dias = guardar_stock_diario(desde, hasta)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Puntos de control guardados para {dias} día(s) entre {desde} y {hasta}'
+        ))
+
+    @staticmethod
+    def _parse_fecha(valor):
+        if not valor:
+            return None
+        return datetime.strptime(valor, '%Y-%m-%d').date()
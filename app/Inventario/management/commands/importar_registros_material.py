@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Inventario.importacion import TAMANO_BLOQUE, importar_registros_material
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa ingresos de material desde un CSV (fecha, cantidad, material, origen). "
+        "El archivo se lee fila a fila, así que su tamaño no afecta la memoria usada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta', help='Ruta del archivo CSV')
+        parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE,
+                            help='Filas insertadas por consulta')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['ruta'], newline='', encoding='utf-8-sig') as archivo:
+                resumen = importar_registros_material(archivo, options['tamano_bloque'])
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if resumen['total_errores']:
+            for error in resumen['errores']:
+                self.stderr.write(error)
+            raise CommandError(
+                f"El archivo tiene {resumen['total_errores']} fila(s) inválida(s); no se importó ningún registro"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['registros_importados']} registro(s) importados, "
+            f"{resumen['materiales_actualizados']} material(es) actualizados"
+        ))
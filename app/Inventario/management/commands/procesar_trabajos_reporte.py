@@ -0,0 +1,87 @@
+import socket
+import threading
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from Inventario.models import TrabajoReporte
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa la cola de reportes pedidos con asincrono=true. Cada hilo toma un trabajo "
+        "pendiente, genera el reporte y sigue con el próximo; se pueden ejecutar varias "
+        "instancias del comando a la vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=2, help='Trabajos que se generan en paralelo')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera cuando la cola está vacía')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesar los trabajos pendientes y terminar')
+        parser.add_argument('--minutos-abandono', type=int, default=30,
+                            help='Minutos en proceso tras los cuales un trabajo vuelve a la cola')
+
+    def handle(self, *args, **options):
+        if options['hilos'] < 1:
+            raise CommandError('--hilos debe ser al menos 1')
+
+        self.opciones = options
+        self.detener = threading.Event()
+        self._liberar_abandonados()
+
+        nombre = f'{socket.gethostname()}:{threading.get_native_id()}'
+        if options['hilos'] == 1:
+            self._procesar(nombre)
+            return
+
+        hilos = [
+            threading.Thread(target=self._procesar_en_hilo, args=(f'{nombre}-{i}',), daemon=True)
+            for i in range(options['hilos'])
+        ]
+        for hilo in hilos:
+            hilo.start()
+        try:
+            for hilo in hilos:
+                while hilo.is_alive():
+                    hilo.join(timeout=1)
+        except KeyboardInterrupt:
+            # Los trabajos en curso terminan; después cada hilo sale
+            self.detener.set()
+            for hilo in hilos:
+                hilo.join()
+
+    def _liberar_abandonados(self):
+        limite = timezone.now() - timedelta(minutes=self.opciones['minutos_abandono'])
+        liberados = TrabajoReporte.liberar_abandonados(limite)
+        if liberados:
+            self.stdout.write(f'{liberados} trabajo(s) abandonado(s) volvieron a la cola')
+
+    def _procesar_en_hilo(self, nombre):
+        # Cada hilo usa su propia conexión; se cierra al terminar
+        try:
+            self._procesar(nombre)
+        finally:
+            connection.close()
+
+    def _procesar(self, nombre):
+        while not self.detener.is_set():
+            close_old_connections()
+            trabajo = TrabajoReporte.tomar_siguiente(nombre)
+            if trabajo is None:
+                if self.opciones['una_vez']:
+                    return
+                self.detener.wait(self.opciones['intervalo'])
+                self._liberar_abandonados()
+                continue
+
+            trabajo.ejecutar()
+            if trabajo.estado == 'completado':
+                self.stdout.write(self.style.SUCCESS(
+                    f'Trabajo {trabajo.id_trabajo}: reporte {trabajo.reporte_id} generado'
+                ))
+            else:
+                self.stderr.write(f'Trabajo {trabajo.id_trabajo}: {trabajo.mensaje_error}')
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Inventario.models import reconstruir_movimientos_diarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el resumen diario de movimientos (producido, retirado, recibido y consumido) "
+        "a partir de los registros y retiros. Sin parámetros reconstruye todo el historial."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día a reconstruir (YYYY-MM-DD)')
+        parser.add_argument('--hasta', help='Último día a reconstruir (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            desde = self._parse_fecha(options['desde'])
+            hasta = self._parse_fecha(options['hasta'])
+        except ValueError:
+            raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+
+        try:
+            filas_ecoladrillo, filas_material = reconstruir_movimientos_diarios(desde, hasta)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Resumen reconstruido: {filas_ecoladrillo} fila(s) de ecoladrillos '
+            f'y {filas_material} fila(s) de materiales'
+        ))
+
+    @staticmethod
+    def _parse_fecha(valor):
+        if not valor:
+            return None
+        return datetime.strptime(valor, '%Y-%m-%d').date()
@@ -0,0 +1,226 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+# Límites (segundos) de los histogramas de duración por fase
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Límites de los histogramas de consultas SQL por petición
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+_medicion_actual = ContextVar('medicion', default=None)
+
+
+class Medicion:
+    """
+    Tiempos de una petición, separados por fase.
+
+    `db` y las consultas se suman desde un envoltorio de la conexión; `serializacion` y
+    `excepcion` desde los tramos marcados con medir(). Cada tramo descuenta el tiempo de
+    base de datos que ocurrió dentro de él, así las fases no se superponen.
+    """
+    __slots__ = ('consultas', 'db', 'serializacion', 'excepcion', 'vista', '_abiertos', '_inicio_vista')
+
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.serializacion = 0.0
+        self.excepcion = 0.0
+        self.vista = None
+        self._abiertos = set()
+        self._inicio_vista = None
+
+    def envolver_consulta(self, execute, sql, params, many, context):
+        """Envoltorio para connection.execute_wrapper(): cuenta y cronometra cada consulta"""
+        inicio = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - inicio
+            self.consultas += 1
+
+    @contextmanager
+    def tramo(self, fase):
+        # Solo cuenta el tramo más externo de cada fase (tramos anidados de la misma fase)
+        if fase in self._abiertos:
+            yield
+            return
+        self._abiertos.add(fase)
+        db_antes = self.db
+        inicio = perf_counter()
+        try:
+            yield
+        finally:
+            duracion = perf_counter() - inicio - (self.db - db_antes)
+            setattr(self, fase, getattr(self, fase) + duracion)
+            self._abiertos.discard(fase)
+
+    def iniciar_vista(self):
+        self._inicio_vista = (perf_counter(), self.db, self.serializacion, self.excepcion)
+
+    def terminar_vista(self):
+        """Tiempo propio de la vista: lo que no fue base de datos, serialización ni excepciones"""
+        if self._inicio_vista is None or self.vista is not None:
+            return
+        inicio, db, serializacion, excepcion = self._inicio_vista
+        self.vista = (
+            perf_counter() - inicio
+            - (self.db - db) - (self.serializacion - serializacion) - (self.excepcion - excepcion)
+        )
+
+    def fases(self, total):
+        return {
+            'db': self.db,
+            'vista': self.vista or 0.0,
+            'serializacion': self.serializacion,
+            'excepcion': self.excepcion,
+            'total': total,
+        }
+
+    def server_timing(self, total):
+        """Valor del encabezado Server-Timing, con duraciones en milisegundos"""
+        partes = []
+        for fase, duracion in self.fases(total).items():
+            parte = f'{fase};dur={duracion * 1000:.1f}'
+            if fase == 'db':
+                parte += f';desc="{self.consultas} consulta(s)"'
+            partes.append(parte)
+        return ', '.join(partes)
+
+
+def medicion_actual():
+    return _medicion_actual.get()
+
+
+@contextmanager
+def medir(fase):
+    """Suma el tiempo del bloque a la fase de la petición en curso (no hace nada fuera de una petición)"""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    with medicion.tramo(fase):
+        yield
+
+
+@contextmanager
+def medicion_de_peticion():
+    """Activa una Medicion para el código ejecutado dentro del bloque y la retorna"""
+    medicion = Medicion()
+    token = _medicion_actual.set(medicion)
+    try:
+        yield medicion
+    finally:
+        _medicion_actual.reset(token)
+
+
+class Histograma:
+    """Conteos acumulados por límite superior, suma y cantidad de observaciones (formato Prometheus)"""
+    __slots__ = ('limites', 'conteos', 'suma', 'cantidad')
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.cantidad += 1
+
+    def acumulados(self):
+        """[(le, cantidad de observaciones <= le)], terminando en +Inf"""
+        total = 0
+        resultado = []
+        for limite, conteo in zip((*self.limites, '+Inf'), self.conteos):
+            total += conteo
+            resultado.append((limite, total))
+        return resultado
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(**etiquetas):
+    return '{' + ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in etiquetas.items()) + '}'
+
+
+class RegistroMetricas:
+    """
+    Histogramas por ruta de las peticiones atendidas por este proceso.
+
+    Cada observación toma el lock una vez y actualiza contadores en memoria, así el costo
+    por petición es fijo y bajo. Las rutas son nombres de URL (ecoladrillo-list), no las
+    rutas con IDs, para que la cantidad de series quede acotada.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._duraciones = {}
+        self._consultas = {}
+        self._peticiones = {}
+
+    def observar(self, ruta, metodo, estado, medicion, total):
+        with self._lock:
+            for fase, duracion in medicion.fases(total).items():
+                clave = (ruta, metodo, fase)
+                if clave not in self._duraciones:
+                    self._duraciones[clave] = Histograma(LIMITES_SEGUNDOS)
+                self._duraciones[clave].observar(duracion)
+            clave = (ruta, metodo)
+            if clave not in self._consultas:
+                self._consultas[clave] = Histograma(LIMITES_CONSULTAS)
+            self._consultas[clave].observar(medicion.consultas)
+            clave = (ruta, metodo, estado)
+            self._peticiones[clave] = self._peticiones.get(clave, 0) + 1
+
+    def limpiar(self):
+        with self._lock:
+            self._duraciones.clear()
+            self._consultas.clear()
+            self._peticiones.clear()
+
+    def exportar(self):
+        """Texto en el formato de exposición de Prometheus (text/plain; version=0.0.4)"""
+        with self._lock:
+            duraciones = [(clave, h.acumulados(), h.suma, h.cantidad) for clave, h in sorted(self._duraciones.items())]
+            consultas = [(clave, h.acumulados(), h.suma, h.cantidad) for clave, h in sorted(self._consultas.items())]
+            peticiones = sorted(self._peticiones.items())
+
+        lineas = [
+            '# HELP inventario_peticiones_total Peticiones atendidas por ruta, método y código de estado',
+            '# TYPE inventario_peticiones_total counter',
+        ]
+        for (ruta, metodo, estado), cantidad in peticiones:
+            lineas.append(f'inventario_peticiones_total{_etiquetas(ruta=ruta, metodo=metodo, estado=estado)} {cantidad}')
+
+        lineas += [
+            '# HELP inventario_peticion_segundos Duración de las peticiones por ruta y fase (db, vista, serializacion, excepcion, total)',
+            '# TYPE inventario_peticion_segundos histogram',
+        ]
+        for (ruta, metodo, fase), acumulados, suma, cantidad in duraciones:
+            base = dict(ruta=ruta, metodo=metodo, fase=fase)
+            for limite, total in acumulados:
+                lineas.append(f'inventario_peticion_segundos_bucket{_etiquetas(**base, le=limite)} {total}')
+            lineas.append(f'inventario_peticion_segundos_sum{_etiquetas(**base)} {suma:.6f}')
+            lineas.append(f'inventario_peticion_segundos_count{_etiquetas(**base)} {cantidad}')
+
+        lineas += [
+            '# HELP inventario_peticion_consultas Consultas SQL por petición y ruta',
+            '# TYPE inventario_peticion_consultas histogram',
+        ]
+        for (ruta, metodo), acumulados, suma, cantidad in consultas:
+            base = dict(ruta=ruta, metodo=metodo)
+            for limite, total in acumulados:
+                lineas.append(f'inventario_peticion_consultas_bucket{_etiquetas(**base, le=limite)} {total}')
+            lineas.append(f'inventario_peticion_consultas_sum{_etiquetas(**base)} {suma:g}')
+            lineas.append(f'inventario_peticion_consultas_count{_etiquetas(**base)} {cantidad}')
+        return '\n'.join(lineas) + '\n'
+
+
+# Métricas de las peticiones de este proceso, expuestas en /metrics
+metricas = RegistroMetricas()
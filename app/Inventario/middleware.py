@@ -0,0 +1,80 @@
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.db import connections
+from django.urls import reverse
+
+from .metricas import medicion_actual, medicion_de_peticion, metricas
+from .perfilado import perfilar, token_valido
+
+
+class MedicionMiddleware:
+    """
+    Mide cada petición por fases y las informa en el encabezado Server-Timing.
+
+    Fases: db (tiempo y cantidad de consultas), vista (código de la vista, incluidos los
+    serializers, sin base de datos), serializacion (el renderer que genera el cuerpo de la
+    respuesta), excepcion (custom_exception_handler) y total. Cada petición también se suma a los
+    histogramas por ruta que expone /metrics.
+
+    Debe ir primero en MIDDLEWARE para que `total` incluya a los demás middleware. En las
+    respuestas por partes (exportaciones) solo se mide hasta que empieza el envío.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = perf_counter()
+        with medicion_de_peticion() as medicion:
+            with ExitStack() as envoltorios:
+                for conexion in connections.all():
+                    envoltorios.enter_context(conexion.execute_wrapper(medicion.envolver_consulta))
+                respuesta = self.get_response(request)
+            medicion.terminar_vista()
+        total = perf_counter() - inicio
+
+        respuesta['Server-Timing'] = medicion.server_timing(total)
+        coincidencia = request.resolver_match
+        ruta = (coincidencia.view_name or coincidencia.route) if coincidencia else 'sin_ruta'
+        metricas.observar(ruta, request.method, respuesta.status_code, medicion, total)
+        return respuesta
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicion_actual().iniciar_vista()
+
+    def process_template_response(self, request, response):
+        # Las respuestas de DRF pasan por el renderer después de este punto: eso es la serialización
+        medicion = medicion_actual()
+        medicion.terminar_vista()
+        render = response.render
+
+        def render_medido():
+            with medicion.tramo('serializacion'):
+                return render()
+
+        response.render = render_medido
+        return response
+
+
+class PerfiladoMiddleware:
+    """
+    Perfila a pedido las peticiones que traen el token de PERFILADO_TOKEN.
+
+    Con el encabezado X-Perfilar: <token> la petición se atiende bajo cProfile registrando
+    cada consulta SQL con su duración; el perfil queda guardado y la respuesta indica en
+    X-Perfil dónde descargarlo. Sin el token no agrega ningún costo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Las descargas de perfiles también llevan el token, pero no se perfilan
+        if not token_valido(request) or request.path.startswith(reverse('perfiles')):
+            return self.get_response(request)
+
+        respuesta, nombre = perfilar(request, self.get_response)
+        if nombre:
+            respuesta['X-Perfil'] = request.build_absolute_uri(reverse('perfil', args=[nombre]))
+        return respuesta
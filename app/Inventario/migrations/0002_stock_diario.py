@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockDiarioEcoladrillo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockDiarioMaterial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='registroecoladrillo',
+            index=models.Index(fields=['fecha', 'ecoladrillo'], name='registro_eco_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaterial',
+            index=models.Index(fields=['fecha', 'material'], name='registro_mat_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retiroecoladrillo',
+            index=models.Index(fields=['fecha', 'ecoladrillo'], name='retiro_eco_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockdiarioecoladrillo',
+            name='ecoladrillo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_diario', to='Inventario.ecoladrillo'),
+        ),
+        migrations.AddField(
+            model_name='stockdiariomaterial',
+            name='material',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_diario', to='Inventario.material'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockdiarioecoladrillo',
+            constraint=models.UniqueConstraint(fields=('fecha', 'ecoladrillo'), name='stock_diario_ecoladrillo_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockdiariomaterial',
+            constraint=models.UniqueConstraint(fields=('fecha', 'material'), name='stock_diario_material_unico'),
+        ),
+    ]
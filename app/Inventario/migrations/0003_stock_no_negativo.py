@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:22
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0002_stock_diario'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ecoladrillo',
+            name='cantidad',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='cantidad_disponible',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddConstraint(
+            model_name='ecoladrillo',
+            constraint=models.CheckConstraint(condition=models.Q(('cantidad__gte', 0)), name='ecoladrillo_cantidad_no_negativa'),
+        ),
+        migrations.AddConstraint(
+            model_name='material',
+            constraint=models.CheckConstraint(condition=models.Q(('cantidad_disponible__gte', 0)), name='material_cantidad_no_negativa'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0003_stock_no_negativo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reporte',
+            name='fecha_generacion',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
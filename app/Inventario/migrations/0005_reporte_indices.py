@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0004_reporte_listado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['tipo_reporte', 'fecha_generacion'], name='reporte_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporte',
+            index=models.Index(fields=['operario', 'fecha_generacion'], name='reporte_operario_fecha_idx'),
+        ),
+    ]
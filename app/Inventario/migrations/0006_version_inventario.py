@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+def crear_contador(apps, schema_editor):
+    apps.get_model('Inventario', 'VersionInventario').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0005_reporte_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(crear_contador, migrations.RunPython.noop),
+    ]
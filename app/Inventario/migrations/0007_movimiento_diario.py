@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:36
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def llenar_resumen(apps, schema_editor):
+    """Crea el resumen diario a partir de los movimientos ya registrados"""
+    RegistroEcoladrillo = apps.get_model('Inventario', 'RegistroEcoladrillo')
+    RetiroEcoladrillo = apps.get_model('Inventario', 'RetiroEcoladrillo')
+    RegistroMaterial = apps.get_model('Inventario', 'RegistroMaterial')
+
+    destinos = [
+        (apps.get_model('Inventario', 'MovimientoDiarioEcoladrillo'), 'ecoladrillo_id', [
+            (RegistroEcoladrillo, 'ecoladrillo', F('cantidad'), 'producido'),
+            (RetiroEcoladrillo, 'ecoladrillo', F('cantidad'), 'retirado'),
+        ]),
+        (apps.get_model('Inventario', 'MovimientoDiarioMaterial'), 'material_id', [
+            (RegistroMaterial, 'material', F('cantidad'), 'recibido'),
+            (RegistroEcoladrillo, 'ecoladrillo__material_principal',
+             F('cantidad') * F('ecoladrillo__cantidad_material_requerida'), 'consumido'),
+        ]),
+    ]
+    for modelo, campo_item, fuentes in destinos:
+        resumen = defaultdict(dict)
+        for fuente, campo, expresion, destino in fuentes:
+            for fila in fuente.objects.order_by().values(campo, 'fecha').annotate(total=Sum(expresion)):
+                resumen[(fila[campo], fila['fecha'])][destino] = fila['total']
+        modelo.objects.bulk_create(
+            [modelo(**{campo_item: item_id, 'fecha': fecha}, **cantidades)
+             for (item_id, fecha), cantidades in resumen.items()],
+            batch_size=2000,
+        )
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0006_version_inventario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoDiarioEcoladrillo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('producido', models.IntegerField(default=0)),
+                ('retirado', models.IntegerField(default=0)),
+                ('ecoladrillo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_diarios', to='Inventario.ecoladrillo')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'ecoladrillo'), name='movimiento_diario_ecoladrillo_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoDiarioMaterial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('recibido', models.IntegerField(default=0)),
+                ('consumido', models.IntegerField(default=0)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_diarios', to='Inventario.material')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'material'), name='movimiento_diario_material_unico')],
+            },
+        ),
+        migrations.RunPython(llenar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0008_trabajo_reporte'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroecoladrillo',
+            index=models.Index(fields=['fecha', 'id_registro'], name='registro_eco_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaterial',
+            index=models.Index(fields=['fecha', 'id_registro_material'], name='registro_mat_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retiroecoladrillo',
+            index=models.Index(fields=['fecha', 'id_retiro'], name='retiro_eco_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retiroecoladrillo',
+            index=models.Index(fields=['ecoladrillo', 'fecha', 'id_retiro'], name='retiro_eco_item_fecha_idx'),
+        ),
+    ]
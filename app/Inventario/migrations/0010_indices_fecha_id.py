@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0009_indices_paginacion_movimientos'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='registroecoladrillo',
+            name='registro_eco_fecha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='registromaterial',
+            name='registro_mat_fecha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='retiroecoladrillo',
+            name='retiro_eco_fecha_idx',
+        ),
+        migrations.AlterField(
+            model_name='retiroecoladrillo',
+            name='ecoladrillo',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='Inventario.ecoladrillo'),
+        ),
+    ]
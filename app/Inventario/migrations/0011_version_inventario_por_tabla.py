@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+TABLAS = ('ecoladrillo', 'material', 'registroecoladrillo', 'retiroecoladrillo', 'registromaterial')
+
+
+def crear_contadores(apps, schema_editor):
+    """Un contador por tabla; todos parten del valor global para que ninguna suma se repita"""
+    VersionInventario = apps.get_model('Inventario', 'VersionInventario')
+    valor = VersionInventario.objects.values_list('valor', flat=True).first() or 0
+    VersionInventario.objects.all().delete()
+    VersionInventario.objects.bulk_create([VersionInventario(tabla=tabla, valor=valor) for tabla in TABLAS])
+
+
+def crear_contador_global(apps, schema_editor):
+    VersionInventario = apps.get_model('Inventario', 'VersionInventario')
+    valor = max(VersionInventario.objects.values_list('valor', flat=True), default=0)
+    VersionInventario.objects.all().delete()
+    VersionInventario.objects.create(pk=1, valor=valor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0010_indices_fecha_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='versioninventario',
+            name='tabla',
+            field=models.CharField(default='', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.RunPython(crear_contadores, crear_contador_global),
+        migrations.AlterField(
+            model_name='versioninventario',
+            name='tabla',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventario', '0011_version_inventario_por_tabla'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='retiroecoladrillo',
+            name='ecoladrillo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Inventario.ecoladrillo'),
+        ),
+        migrations.AddIndex(
+            model_name='registroecoladrillo',
+            index=models.Index(fields=['fecha', 'ecoladrillo'], name='registro_eco_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaterial',
+            index=models.Index(fields=['fecha', 'material'], name='registro_mat_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retiroecoladrillo',
+            index=models.Index(fields=['fecha', 'ecoladrillo'], name='retiro_eco_fecha_idx'),
+        ),
+    ]
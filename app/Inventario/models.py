@@ -1,7 +1,275 @@
-from django.db import models
+from bisect import bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, timedelta
+
+from django.core.validators import MinValueValidator
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from model_utils.managers import InheritanceManager
+
+from .cache import cache_conteos
 
 # Create your models here.
 
+# Por debajo de esta cantidad un ecoladrillo o material se considera con stock bajo
+UMBRAL_STOCK_BAJO = 10
+
+# Filas que se traen o se insertan por viaje a la base de datos al recorrer tablas grandes
+TAMANO_BLOQUE_REPORTE = 2000
+
+def _ajustar_stock(modelo, campo, pk, delta):
+    """
+    Aplica un cambio de stock con un único UPDATE condicional.
+
+    Los descuentos llevan la condición `campo >= cantidad` en el WHERE, así dos
+    operaciones concurrentes no se pisan ni pueden dejar el stock negativo.
+    Retorna True si la fila se actualizó.
+    """
+    filas = modelo.objects.filter(pk=pk)
+    if delta < 0:
+        filas = filas.filter(**{f'{campo}__gte': -delta})
+    return filas.update(**{campo: F(campo) + delta}) == 1
+
+
+def _ajustar_stock_lote(modelo, campo, deltas):
+    """
+    Aplica varios cambios de stock {pk: delta} con un único UPDATE condicional.
+
+    Retorna False si algún descuento no alcanzó; en ese caso las demás filas sí se
+    actualizaron y quien llama debe revertir la transacción.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return True
+    delta = Case(
+        *[When(pk=pk, then=Value(cambio)) for pk, cambio in deltas.items()],
+        output_field=IntegerField(),
+    )
+    actualizadas = (
+        modelo.objects.filter(pk__in=deltas)
+        .filter(**{f'{campo}__gte': -delta})
+        .update(**{campo: F(campo) + delta})
+    )
+    return actualizadas == len(deltas)
+
+
+def recorrer_por_bloques(queryset, orden, tamano=TAMANO_BLOQUE_REPORTE):
+    """
+    Recorre un queryset de values() en el orden ascendente de los campos `orden` (el último
+    único, normalmente la clave primaria) con una consulta por bloque de `tamano` filas.
+
+    Cada bloque sigue desde la última fila leída (WHERE (a, b) > (último a, último b)), así
+    solo hay un bloque en memoria en cualquier motor. iterator() no alcanza para eso: solo
+    PostgreSQL lee de un cursor del servidor, en MySQL el driver trae el resultado completo
+    antes de entregar la primera fila.
+    Los campos de `orden` tienen que estar entre los de values().
+    """
+    queryset = queryset.order_by(*orden)
+    ultimo = None
+    while True:
+        bloque = queryset
+        if ultimo is not None:
+            siguiente = Q()
+            for i, campo in enumerate(orden):
+                siguiente |= Q(**{c: ultimo[c] for c in orden[:i]}, **{f'{campo}__gt': ultimo[campo]})
+            bloque = bloque.filter(siguiente)
+        filas = list(bloque[:tamano])
+        yield from filas
+        if len(filas) < tamano:
+            return
+        ultimo = filas[-1]
+
+
+class _StockInsuficiente(Exception):
+    """Revierte la transacción de un lote cuando un descuento condicional no alcanzó"""
+
+
+class VersionInventario(models.Model):
+    """
+    Contadores que aumentan con cada cambio de stock, de movimientos o del catálogo, uno
+    por tabla (ver TABLAS).
+
+    Los reportes en caché se guardan con la versión vigente al generarlos, así un
+    cambio del inventario los invalida sin tener que recorrer ninguna tabla. La versión
+    de varias tablas es la suma de sus contadores: como ninguno baja, cada cambio da una
+    suma nueva.
+
+    Los contadores se aumentan después del commit, en un UPDATE propio: las transacciones
+    que escriben no quedan esperando la fila de otra. A cambio, entre el commit y ese UPDATE
+    una lectura todavía ve la versión anterior. Lo que cambia sin pasar por los modelos
+    (QuerySet.update() o delete(), SQL directo) no aumenta ninguna versión.
+    """
+    # model_name de los modelos que cambian el inventario; las filas se crean en la migración 0011
+    # y, si faltan, con el primer cambio
+    TABLAS = ('ecoladrillo', 'material', 'registroecoladrillo', 'retiroecoladrillo', 'registromaterial')
+
+    tabla = models.CharField(max_length=50, unique=True)
+    valor = models.PositiveBigIntegerField(default=0)
+
+    # Versiones leídas una sola vez para toda una petición de solo lectura (ver leida_una_vez)
+    _fijada = ContextVar('version_inventario_fijada', default=None)
+
+    @classmethod
+    def _leer(cls):
+        return dict(cls.objects.values_list('tabla', 'valor'))
+
+    @classmethod
+    def actual(cls, *tablas):
+        """Versión de las tablas indicadas (de todas si no se indica ninguna)"""
+        valores = cls._fijada.get()
+        if valores is None:
+            valores = cls._leer()
+        return sum(valores.get(tabla, 0) for tabla in tablas or cls.TABLAS)
+
+    @classmethod
+    @contextmanager
+    def leida_una_vez(cls):
+        """
+        Lee las versiones y las reutiliza en todo el bloque, que no debe modificar el inventario
+
+        Así el ETag, las cachés y los conteos de una misma lectura usan la misma versión
+        con una sola consulta.
+        """
+        token = cls._fijada.set(cls._leer())
+        try:
+            yield
+        finally:
+            cls._fijada.reset(token)
+
+    @classmethod
+    def incrementar(cls, *tablas):
+        """Aumenta la versión de las tablas indicadas cuando se confirme la transacción en curso"""
+        transaction.on_commit(lambda: cls._aumentar(tablas))
+
+    @classmethod
+    def _aumentar(cls, tablas):
+        if cls.objects.filter(tabla__in=tablas).update(valor=F('valor') + 1) == len(set(tablas)):
+            return
+        # Faltan filas (flush, fixtures o una base creada sin migraciones): sin ellas ningún
+        # cambio invalidaría las cachés ni los ETag. Se crean y se vuelve a aumentar
+        cls.objects.bulk_create([cls(tabla=tabla) for tabla in cls.TABLAS], ignore_conflicts=True)
+        cls.objects.filter(tabla__in=tablas).update(valor=F('valor') + 1)
+
+    @classmethod
+    def contar(cls, queryset):
+        """
+        Cantidad de filas de un queryset, reutilizada mientras la versión de su tabla no cambie
+
+        Solo se guarda para ecoladrillos, materiales y movimientos, cuyos cambios aumentan
+        la versión; así el COUNT(*) de un listado grande se ejecuta una vez por versión y
+        no en cada página. Para los demás modelos se cuenta siempre.
+        """
+        tabla = queryset.model._meta.model_name
+        if tabla not in cls.TABLAS:
+            return queryset.count()
+        clave = (str(queryset.order_by().values('pk').query), cls.actual(tabla))
+        cantidad = cache_conteos.obtener(clave)
+        if cantidad is None:
+            cantidad = queryset.count()
+            cache_conteos.guardar(clave, cantidad)
+        return cantidad
+
+
+class _CambiaInventario:
+    """Mezcla para los modelos cuyo guardado o borrado cambia el resultado de los reportes"""
+
+    # Otras tablas de VersionInventario cuyo contenido o representación cambia con el guardado
+    tablas_relacionadas = ()
+
+    def _cambio_inventario(self):
+        VersionInventario.incrementar(self._meta.model_name, *self.tablas_relacionadas)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._cambio_inventario()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        self._cambio_inventario()
+        return resultado
+
+
+class _Movimiento(_CambiaInventario):
+    """
+    Mezcla para los movimientos de inventario: mantiene el resumen diario de movimientos
+    en la misma transacción en que el movimiento se crea, se modifica o se borra.
+
+    Al crear, cada subclase aplica su cambio de stock y de puntos de control antes de
+    guardar. Al editar o borrar se revierte lo que aportaba la versión guardada y se aplica
+    la nueva: stock, puntos de control y resumen diario cambian juntos o no cambia nada.
+    """
+
+    def aportes_diarios(self):
+        """Lo que el movimiento suma al resumen diario: [(modelo, item_id, fecha, {campo: cantidad})]"""
+        raise NotImplementedError
+
+    def efectos_stock(self):
+        """Lo que el movimiento suma al stock: [(modelo, campo, modelo_control, item_id, fecha, delta)]"""
+        raise NotImplementedError
+
+    def _aplicar_aportes(self, signo):
+        for modelo, item_id, fecha, cantidades in self.aportes_diarios():
+            modelo.sumar(item_id, fecha, **{campo: signo * valor for campo, valor in cantidades.items()})
+
+    def _guardado(self):
+        """La versión guardada del movimiento, bloqueada hasta el final de la transacción"""
+        return type(self).objects.select_for_update().get(pk=self.pk)
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # Sin savepoint: al crear, el guardado de cada movimiento ya abre su transacción
+            with transaction.atomic(savepoint=False):
+                super().save(*args, **kwargs)
+                self._aplicar_aportes(1)
+            return
+
+        with transaction.atomic():
+            guardado = self._guardado()
+            _reemplazar_efectos_stock(guardado.efectos_stock(), self.efectos_stock())
+            guardado._aplicar_aportes(-1)
+            super().save(*args, **kwargs)
+            self._aplicar_aportes(1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            guardado = self._guardado()
+            _reemplazar_efectos_stock(guardado.efectos_stock(), [])
+            guardado._aplicar_aportes(-1)
+            return super().delete(*args, **kwargs)
+
+
+def _reemplazar_efectos_stock(anteriores, nuevos):
+    """
+    Revierte los efectos de stock de un movimiento guardado y aplica los nuevos.
+
+    El stock de cada item cambia una sola vez por la diferencia neta, con el UPDATE
+    condicional de siempre: si algún stock quedaría negativo se lanza ValueError y quien
+    llama revierte la transacción. Los puntos de control se corrigen desde cada fecha.
+    """
+    netos = defaultdict(int)
+    for modelo, campo, _, item_id, _, delta in anteriores:
+        netos[(modelo, campo, item_id)] -= delta
+    for modelo, campo, _, item_id, _, delta in nuevos:
+        netos[(modelo, campo, item_id)] += delta
+
+    for (modelo, campo, item_id), delta in netos.items():
+        if delta and not _ajustar_stock(modelo, campo, item_id, delta):
+            nombre, actual = modelo.objects.values_list('nombre', campo).get(pk=item_id)
+            raise ValueError(
+                f"No hay suficiente stock de {nombre} para este cambio. "
+                f"Necesario: {-delta}, Stock actual: {actual}"
+            )
+
+    for _, _, modelo_control, item_id, fecha, delta in anteriores:
+        modelo_control.ajustar_desde(item_id, fecha, -delta)
+    for _, _, modelo_control, item_id, fecha, delta in nuevos:
+        modelo_control.ajustar_desde(item_id, fecha, delta)
+
+
 class Usuario(models.Model):
     id_usuario = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=100)
@@ -23,7 +291,10 @@ class Administrador(Usuario):
         return f"Administrador: {self.nombre}"
     
 
-class Ecoladrillo(models.Model):
+class Ecoladrillo(_CambiaInventario, models.Model):
+    # Los movimientos muestran el nombre del ecoladrillo y se borran con él
+    tablas_relacionadas = ('registroecoladrillo', 'retiroecoladrillo')
+
     SIZES = [
         ('small', 'Small'),
         ('medium', 'Medium'),
@@ -36,11 +307,26 @@ class Ecoladrillo(models.Model):
     size = models.CharField(max_length=20, choices=SIZES, default='medium')
     material_principal = models.ForeignKey('Material', on_delete=models.CASCADE, related_name='ecoladrillos')
     cantidad_material_requerida = models.IntegerField(default=1)  # Cantidad base de material necesaria
-    cantidad = models.IntegerField(default=0)  # Stock disponible
+    cantidad = models.IntegerField(default=0, validators=[MinValueValidator(0)])  # Stock disponible
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=Q(cantidad__gte=0), name='ecoladrillo_cantidad_no_negativa'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} ({self.get_size_display()}) - {self.material_principal.nombre}"
     
+    @classmethod
+    def resumen_stock(cls):
+        """Totales de stock de todos los ecoladrillos calculados en una sola consulta"""
+        return cls.objects.aggregate(
+            total_tipos_ecoladrillos=Count('pk'),
+            stock_total=Sum('cantidad', default=0),
+            tipos_con_stock_bajo=Count('pk', filter=Q(cantidad__lt=UMBRAL_STOCK_BAJO)),
+            tipos_sin_stock=Count('pk', filter=Q(cantidad=0)),
+        )
+    
     def calcular_material_necesario(self, cantidad_ecoladrillos):
         """Calcula la cantidad total de material necesaria para producir X ecoladrillos"""
         return cantidad_ecoladrillos * self.cantidad_material_requerida
@@ -54,54 +340,126 @@ class Ecoladrillo(models.Model):
         """Aumenta la cantidad de ecoladrillos"""
         if cantidad < 0:
             raise ValueError("La cantidad debe ser positiva")
+        _ajustar_stock(Ecoladrillo, 'cantidad', self.pk, cantidad)
+        VersionInventario.incrementar('ecoladrillo')
         self.cantidad += cantidad
-        self.save()
     
     def reducir_stock(self, cantidad):
         """Reduce la cantidad de ecoladrillos"""
         if cantidad <= 0:
             raise ValueError("La cantidad debe ser mayor a cero")
-        if self.cantidad < cantidad:
+        if not _ajustar_stock(Ecoladrillo, 'cantidad', self.pk, -cantidad):
+            self.refresh_from_db(fields=['cantidad'])
             raise ValueError(f"No hay suficientes ecoladrillos disponibles. Stock actual: {self.cantidad}")
+        VersionInventario.incrementar('ecoladrillo')
         self.cantidad -= cantidad
-        self.save()
     
 
-class Material(models.Model):
+class Material(_CambiaInventario, models.Model):
+    # Los ecoladrillos y los movimientos muestran el nombre del material y se borran con él
+    tablas_relacionadas = ('ecoladrillo', 'registroecoladrillo', 'retiroecoladrillo', 'registromaterial')
+
     id_insumo = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=100)
     tipo = models.CharField(max_length=50)
-    cantidad_disponible = models.IntegerField(default=0)
+    cantidad_disponible = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     unidad_medida = models.CharField(max_length=20)
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=Q(cantidad_disponible__gte=0), name='material_cantidad_no_negativa'),
+        ]
+
     def __str__(self):
         return f"{self.nombre} ({self.cantidad_disponible} {self.unidad_medida})"
 
+    @classmethod
+    def resumen_stock(cls):
+        """Totales de stock de todos los materiales calculados en una sola consulta"""
+        return cls.objects.aggregate(
+            total_tipos_materiales=Count('pk'),
+            stock_total=Sum('cantidad_disponible', default=0),
+            tipos_con_stock_bajo=Count('pk', filter=Q(cantidad_disponible__lt=UMBRAL_STOCK_BAJO)),
+            tipos_sin_stock=Count('pk', filter=Q(cantidad_disponible=0)),
+        )
+
     def agregar_stock(self, agregar_cantidad):
         """Aumenta la cantidad disponible de un material"""
         if agregar_cantidad < 0:
             raise ValueError("La cantidad debe ser positiva")
+        _ajustar_stock(Material, 'cantidad_disponible', self.pk, agregar_cantidad)
+        VersionInventario.incrementar('material')
         self.cantidad_disponible += agregar_cantidad
-        self.save()
+    
+    @classmethod
+    def agregar_stock_lote(cls, cantidades):
+        """
+        Aumenta el stock de varios materiales {id_insumo: cantidad} con un único UPDATE.
+
+        Si alguno de los materiales ya no existe no se aplica ningún cambio.
+        """
+        if any(cantidad < 0 for cantidad in cantidades.values()):
+            raise ValueError("La cantidad debe ser positiva")
+        with transaction.atomic():
+            if not _ajustar_stock_lote(cls, 'cantidad_disponible', cantidades):
+                raise ValueError("Alguno de los materiales no existe")
+            VersionInventario.incrementar('material')
     
     def reducir_stock(self, reducir_cantidad):
         """Reduce la cantidad disponible de un material"""
         if reducir_cantidad < 0:
             raise ValueError("La cantidad debe ser positiva")
-        if self.cantidad_disponible < reducir_cantidad:
+        if not _ajustar_stock(Material, 'cantidad_disponible', self.pk, -reducir_cantidad):
             raise ValueError("No hay suficiente stock para reducir")
+        VersionInventario.incrementar('material')
         self.cantidad_disponible -= reducir_cantidad
-        self.save()
 
-class RegistroEcoladrillo(models.Model):
+def _material_insuficiente(material_id, necesario):
+    """Lanza el error de material insuficiente con el stock que quedó en la base de datos"""
+    material = Material.objects.get(pk=material_id)
+    raise ValueError(
+        f"No hay suficiente {material.nombre} disponible. "
+        f"Necesario: {necesario} {material.unidad_medida}, "
+        f"Disponible: {material.cantidad_disponible} {material.unidad_medida}"
+    )
+
+
+class RegistroEcoladrillo(_Movimiento, models.Model):
+    tablas_relacionadas = ('ecoladrillo', 'material')
+
     id_registro = models.AutoField(primary_key=True)
     fecha = models.DateField()
     ecoladrillo = models.ForeignKey(Ecoladrillo, on_delete=models.CASCADE)
     cantidad = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            # Rangos de fechas y paginación keyset del historial por (fecha, id)
+            models.Index(fields=['fecha', 'id_registro'], name='registro_eco_fecha_id_idx'),
+            # Sumas por (fecha, item) al reconstruir el resumen diario y los puntos de control
+            models.Index(fields=['fecha', 'ecoladrillo'], name='registro_eco_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Registro {self.id_registro} - {self.ecoladrillo.nombre} - Fecha: {self.fecha} - Cantidad: {self.cantidad}"
     
+    def aportes_diarios(self):
+        ecoladrillo = self.ecoladrillo
+        return [
+            (MovimientoDiarioEcoladrillo, self.ecoladrillo_id, self.fecha, {'producido': self.cantidad}),
+            (MovimientoDiarioMaterial, ecoladrillo.material_principal_id, self.fecha,
+             {'consumido': ecoladrillo.calcular_material_necesario(self.cantidad)}),
+        ]
+    
+    def efectos_stock(self):
+        # El consumo se calcula con la cantidad_material_requerida actual, igual que el resumen diario
+        ecoladrillo = self.ecoladrillo
+        return [
+            (Ecoladrillo, 'cantidad', StockDiarioEcoladrillo, self.ecoladrillo_id, self.fecha, self.cantidad),
+            (Material, 'cantidad_disponible', StockDiarioMaterial, ecoladrillo.material_principal_id, self.fecha,
+             -ecoladrillo.calcular_material_necesario(self.cantidad)),
+        ]
+    
     def save(self, *args, **kwargs):
         if not self.pk:
             """Registra la producción de ecoladrillos y consume el material necesario"""
@@ -112,39 +470,113 @@ class RegistroEcoladrillo(models.Model):
             if not self.ecoladrillo:
                 raise ValueError("El ecoladrillo es requerido")
             
-            # Verificar si hay suficiente material
-            if not self.ecoladrillo.puede_producir(self.cantidad):
-                material_necesario = self.ecoladrillo.calcular_material_necesario(self.cantidad)
-                raise ValueError(
-                    f"No hay suficiente {self.ecoladrillo.material_principal.nombre} disponible. "
-                    f"Necesario: {material_necesario} {self.ecoladrillo.material_principal.unidad_medida}, "
-                    f"Disponible: {self.ecoladrillo.material_principal.cantidad_disponible} {self.ecoladrillo.material_principal.unidad_medida}"
-                )
-        
-            # Guardar el registro primero
-            super().save(*args, **kwargs)
-            
-            # Aumentar stock de ecoladrillos
-            self.ecoladrillo.agregar_stock(self.cantidad)
-            
-            # Reducir stock de material
-            material_usado = self.ecoladrillo.calcular_material_necesario(self.cantidad)
-            self.ecoladrillo.material_principal.reducir_stock(material_usado)
+            ecoladrillo = self.ecoladrillo
+            material_usado = ecoladrillo.calcular_material_necesario(self.cantidad)
+
+            with transaction.atomic():
+                # Consumir el material primero: el UPDATE condicional verifica que alcance
+                if not _ajustar_stock(Material, 'cantidad_disponible', ecoladrillo.material_principal_id, -material_usado):
+                    _material_insuficiente(ecoladrillo.material_principal_id, material_usado)
+
+                super().save(*args, **kwargs)
+
+                # Aumentar stock de ecoladrillos
+                _ajustar_stock(Ecoladrillo, 'cantidad', self.ecoladrillo_id, self.cantidad)
+
+                # Mantener consistentes los puntos de control si el registro es de una fecha pasada
+                StockDiarioEcoladrillo.ajustar_desde(self.ecoladrillo_id, self.fecha, self.cantidad)
+                StockDiarioMaterial.ajustar_desde(ecoladrillo.material_principal_id, self.fecha, -material_usado)
+
+            # Reflejar el cambio en las instancias cargadas sin releerlas
+            ecoladrillo.cantidad += self.cantidad
+            if Ecoladrillo.material_principal.is_cached(ecoladrillo):
+                ecoladrillo.material_principal.cantidad_disponible -= material_usado
         else:
-            # Si ya existe, solo guardar sin modificar stock
+            if self.cantidad <= 0:
+                raise ValueError("La cantidad debe ser mayor a cero")
+            # La edición ajusta stock, puntos de control y resumen diario (ver _Movimiento)
             super().save(*args, **kwargs)
 
+    @classmethod
+    def registrar_lote(cls, registros):
+        """
+        Registra varias producciones en una sola transacción.
+
+        Cada registro debe traer su ecoladrillo (con material_principal) cargado. El
+        material se descuenta sumado por material y el stock de los ecoladrillos se
+        actualiza con un UPDATE condicional cada uno, sin importar el tamaño del lote;
+        si un material no alcanza no se guarda ningún registro. Retorna los registros creados.
+        """
+        consumo = defaultdict(int)
+        produccion = defaultdict(int)
+        ajustes_ecoladrillo = defaultdict(int)
+        ajustes_material = defaultdict(int)
+
+        for registro in registros:
+            if registro.cantidad <= 0:
+                raise ValueError("La cantidad debe ser mayor a cero")
+            ecoladrillo = registro.ecoladrillo
+            material_usado = ecoladrillo.calcular_material_necesario(registro.cantidad)
+            consumo[ecoladrillo.material_principal_id] += material_usado
+            produccion[ecoladrillo.id_ecoladrillo] += registro.cantidad
+            ajustes_ecoladrillo[(ecoladrillo.id_ecoladrillo, registro.fecha)] += registro.cantidad
+            ajustes_material[(ecoladrillo.material_principal_id, registro.fecha)] -= material_usado
+
+        try:
+            with transaction.atomic():
+                if not _ajustar_stock_lote(Material, 'cantidad_disponible', {m: -u for m, u in consumo.items()}):
+                    raise _StockInsuficiente()
+
+                registros = cls.objects.bulk_create(registros)
+                _ajustar_stock_lote(Ecoladrillo, 'cantidad', produccion)
+
+                StockDiarioEcoladrillo.ajustar_lote(ajustes_ecoladrillo)
+                StockDiarioMaterial.ajustar_lote(ajustes_material)
+                MovimientoDiarioEcoladrillo.sumar_lote(
+                    {clave: {'producido': cantidad} for clave, cantidad in ajustes_ecoladrillo.items()}
+                )
+                MovimientoDiarioMaterial.sumar_lote(
+                    {clave: {'consumido': -cantidad} for clave, cantidad in ajustes_material.items()}
+                )
+                VersionInventario.incrementar('registroecoladrillo', 'ecoladrillo', 'material')
+        except _StockInsuficiente:
+            # Con la transacción ya revertida el stock leído es el real
+            disponibles = dict(Material.objects.filter(pk__in=consumo).values_list('id_insumo', 'cantidad_disponible'))
+            for material_id, material_usado in sorted(consumo.items()):
+                if disponibles.get(material_id, 0) < material_usado:
+                    _material_insuficiente(material_id, material_usado)
+            raise ValueError("No hay suficiente material disponible para el lote")
+
+        return registros
+
+
+class RetiroEcoladrillo(_Movimiento, models.Model):
+    tablas_relacionadas = ('ecoladrillo',)
 
-class RetiroEcoladrillo(models.Model):
     id_retiro = models.AutoField(primary_key=True)
     fecha = models.DateField()
     ecoladrillo = models.ForeignKey(Ecoladrillo, on_delete=models.CASCADE)
     cantidad = models.IntegerField(default=0)
     motivo = models.CharField(max_length=200)
 
+    class Meta:
+        indexes = [
+            # Rangos de fechas y paginación keyset del historial por (fecha, id)
+            models.Index(fields=['fecha', 'id_retiro'], name='retiro_eco_fecha_id_idx'),
+            models.Index(fields=['ecoladrillo', 'fecha', 'id_retiro'], name='retiro_eco_item_fecha_idx'),
+            # Sumas por (fecha, item) al reconstruir el resumen diario y los puntos de control
+            models.Index(fields=['fecha', 'ecoladrillo'], name='retiro_eco_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Retiro {self.id_retiro} - {self.ecoladrillo.nombre} - Cantidad: {self.cantidad}"
     
+    def aportes_diarios(self):
+        return [(MovimientoDiarioEcoladrillo, self.ecoladrillo_id, self.fecha, {'retirado': self.cantidad})]
+    
+    def efectos_stock(self):
+        return [(Ecoladrillo, 'cantidad', StockDiarioEcoladrillo, self.ecoladrillo_id, self.fecha, -self.cantidad)]
+    
     def save(self, *args, **kwargs):
         if not self.pk:
             """Reduce la cantidad de ecoladrillos cuando se crea un nuevo retiro"""
@@ -155,29 +587,633 @@ class RetiroEcoladrillo(models.Model):
             if not self.ecoladrillo:
                 raise ValueError("El ecoladrillo es requerido")
             
-            if self.ecoladrillo.cantidad < self.cantidad:
-                raise ValueError(f"No hay suficientes ecoladrillos disponibles. Stock actual: {self.ecoladrillo.cantidad}")
-            
-            # Guardar el retiro primero
-            super().save(*args, **kwargs)
-            
-            # Luego reducir el stock del ecoladrillo
+            with transaction.atomic():
+                # Descontar y verificar el stock en una sola operación
+                if not _ajustar_stock(Ecoladrillo, 'cantidad', self.ecoladrillo_id, -self.cantidad):
+                    self.ecoladrillo.refresh_from_db(fields=['cantidad'])
+                    raise ValueError(f"No hay suficientes ecoladrillos disponibles. Stock actual: {self.ecoladrillo.cantidad}")
+
+                super().save(*args, **kwargs)
+
+                StockDiarioEcoladrillo.ajustar_desde(self.ecoladrillo_id, self.fecha, -self.cantidad)
+
             self.ecoladrillo.cantidad -= self.cantidad
-            self.ecoladrillo.save()
         else:
-            # Si ya existe, solo guardar sin modificar stock
+            if self.cantidad <= 0:
+                raise ValueError("La cantidad debe ser mayor a cero")
+            # La edición ajusta stock, puntos de control y resumen diario (ver _Movimiento)
             super().save(*args, **kwargs)
     
-class RegistroMaterial(models.Model):
+
+    @classmethod
+    def registrar_lote(cls, retiros):
+        """
+        Registra varios retiros en una sola transacción.
+
+        La demanda se suma por ecoladrillo y se descuenta con un único UPDATE
+        condicional, y los retiros se insertan en bloque: el número de consultas no
+        depende de la cantidad de líneas. Si algún ecoladrillo no alcanza no se guarda
+        ningún retiro. Retorna los retiros creados.
+        """
+        demanda = defaultdict(int)
+        ajustes = defaultdict(int)
+        for retiro in retiros:
+            if retiro.cantidad <= 0:
+                raise ValueError("La cantidad debe ser mayor a cero")
+            demanda[retiro.ecoladrillo_id] += retiro.cantidad
+            ajustes[(retiro.ecoladrillo_id, retiro.fecha)] -= retiro.cantidad
+
+        try:
+            with transaction.atomic():
+                if not _ajustar_stock_lote(Ecoladrillo, 'cantidad', {e: -c for e, c in demanda.items()}):
+                    raise _StockInsuficiente()
+
+                retiros = cls.objects.bulk_create(retiros)
+                StockDiarioEcoladrillo.ajustar_lote(ajustes)
+                MovimientoDiarioEcoladrillo.sumar_lote(
+                    {clave: {'retirado': -cantidad} for clave, cantidad in ajustes.items()}
+                )
+                VersionInventario.incrementar('retiroecoladrillo', 'ecoladrillo')
+        except _StockInsuficiente:
+            for ecoladrillo in Ecoladrillo.objects.filter(pk__in=demanda).order_by('pk'):
+                if ecoladrillo.cantidad < demanda[ecoladrillo.pk]:
+                    raise ValueError(
+                        f"No hay suficientes ecoladrillos {ecoladrillo.nombre} disponibles. "
+                        f"Necesario: {demanda[ecoladrillo.pk]}, Stock actual: {ecoladrillo.cantidad}"
+                    )
+            raise ValueError("No hay suficientes ecoladrillos disponibles para el lote")
+
+        return retiros
+
+
+class RegistroMaterial(_Movimiento, models.Model):
+    tablas_relacionadas = ('material',)
+
     id_registro_material = models.AutoField(primary_key=True)
     fecha = models.DateField()
     cantidad = models.IntegerField(default=0)
     material = models.ForeignKey(Material, on_delete=models.CASCADE)
     origen = models.CharField(max_length=100, default='')
 
+    class Meta:
+        indexes = [
+            # Rangos de fechas y paginación keyset del historial por (fecha, id)
+            models.Index(fields=['fecha', 'id_registro_material'], name='registro_mat_fecha_id_idx'),
+            # Sumas por (fecha, item) al reconstruir el resumen diario y los puntos de control
+            models.Index(fields=['fecha', 'material'], name='registro_mat_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Registro {self.id_registro_material} - {self.material.nombre} - Cantidad: {self.cantidad}"
 
+    def aportes_diarios(self):
+        return [(MovimientoDiarioMaterial, self.material_id, self.fecha, {'recibido': self.cantidad})]
+
+    def efectos_stock(self):
+        return [(Material, 'cantidad_disponible', StockDiarioMaterial, self.material_id, self.fecha, self.cantidad)]
+
+    def save(self, *args, **kwargs):
+        if not self.pk:
+            """Registra el ingreso de material y aumenta su stock en la misma transacción"""
+
+            if self.cantidad < 0:
+                raise ValueError("La cantidad debe ser positiva")
+
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                _ajustar_stock(Material, 'cantidad_disponible', self.material_id, self.cantidad)
+                StockDiarioMaterial.ajustar_desde(self.material_id, self.fecha, self.cantidad)
+
+            if RegistroMaterial.material.is_cached(self):
+                self.material.cantidad_disponible += self.cantidad
+        else:
+            if self.cantidad < 0:
+                raise ValueError("La cantidad debe ser positiva")
+            # La edición ajusta stock, puntos de control y resumen diario (ver _Movimiento)
+            super().save(*args, **kwargs)
+
+class StockDiario(models.Model):
+    """Punto de control: stock de un item al cierre de un día"""
+    fecha = models.DateField()
+    cantidad = models.IntegerField(default=0)
+
+    # Nombre del campo ForeignKey al item en cada subclase
+    campo_item = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def ajustar_desde(cls, item_id, fecha, delta):
+        """
+        Propaga un movimiento a los puntos de control de su fecha en adelante.
+
+        Solo se guardan puntos de control de días cerrados, así los movimientos de
+        hoy (el caso normal) no necesitan ninguna consulta extra.
+        """
+        if isinstance(fecha, str):
+            fecha = date.fromisoformat(fecha)
+        if delta and fecha < timezone.localdate():
+            cls.objects.filter(**{f'{cls.campo_item}_id': item_id}, fecha__gte=fecha).update(
+                cantidad=F('cantidad') + delta
+            )
+
+    @classmethod
+    def ajustar_lote(cls, ajustes):
+        """
+        Propaga un lote de movimientos {(item_id, fecha): delta} a los puntos de control.
+
+        Usa un UPDATE por item: cada punto de control suma los movimientos del lote
+        con fecha igual o anterior a la suya.
+        """
+        hoy = timezone.localdate()
+        por_item = defaultdict(lambda: defaultdict(int))
+        for (item_id, fecha), delta in ajustes.items():
+            if isinstance(fecha, str):
+                fecha = date.fromisoformat(fecha)
+            if delta and fecha < hoy:
+                por_item[item_id][fecha] += delta
+
+        for item_id, deltas in por_item.items():
+            fechas = sorted(deltas)
+            acumulado = 0
+            casos = []
+            for fecha in fechas:
+                acumulado += deltas[fecha]
+                casos.append(When(fecha__gte=fecha, then=Value(acumulado)))
+            # La fecha más reciente primero: CASE toma la primera condición que se cumple
+            casos.reverse()
+            cls.objects.filter(**{f'{cls.campo_item}_id': item_id}, fecha__gte=fechas[0]).update(
+                cantidad=F('cantidad') + Case(*casos, default=Value(0), output_field=IntegerField())
+            )
+
+
+class StockDiarioEcoladrillo(StockDiario):
+    ecoladrillo = models.ForeignKey(Ecoladrillo, on_delete=models.CASCADE, related_name='stock_diario')
+
+    campo_item = 'ecoladrillo'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'ecoladrillo'], name='stock_diario_ecoladrillo_unico'),
+        ]
+
+    def __str__(self):
+        return f"Stock {self.ecoladrillo_id} al {self.fecha}: {self.cantidad}"
+
+
+class StockDiarioMaterial(StockDiario):
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name='stock_diario')
+
+    campo_item = 'material'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'material'], name='stock_diario_material_unico'),
+        ]
+
+    def __str__(self):
+        return f"Stock {self.material_id} al {self.fecha}: {self.cantidad}"
+
+
+def _como_fecha(fecha):
+    return date.fromisoformat(fecha) if isinstance(fecha, str) else fecha
+
+
+class MovimientoDiario(models.Model):
+    """
+    Resumen de los movimientos de un item en un día: una fila por (item, fecha).
+
+    Se mantiene en la misma transacción que cada movimiento, así las consultas por
+    período leen unas pocas filas por día en lugar de todos los movimientos.
+    """
+    fecha = models.DateField()
+
+    # Nombre del campo ForeignKey al item y de las cantidades acumuladas en cada subclase
+    campo_item = None
+    campos_cantidad = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def sumar(cls, item_id, fecha, **cantidades):
+        """Suma cantidades a la fila (item, fecha) y la crea si todavía no existe"""
+        cantidades = {campo: valor for campo, valor in cantidades.items() if valor}
+        if not cantidades:
+            return
+        filtro = {f'{cls.campo_item}_id': item_id, 'fecha': _como_fecha(fecha)}
+        cambios = {campo: F(campo) + valor for campo, valor in cantidades.items()}
+        if cls.objects.filter(**filtro).update(**cambios):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**filtro, **cantidades)
+        except IntegrityError:
+            # Otra transacción creó la fila entre el UPDATE y el INSERT
+            cls.objects.filter(**filtro).update(**cambios)
+
+    @classmethod
+    def sumar_lote(cls, cambios):
+        """
+        Suma un lote {(item_id, fecha): {campo: cantidad}} con un número fijo de consultas:
+        lee las filas existentes, inserta en bloque las que faltan y actualiza el resto
+        con un único UPDATE
+        """
+        campo = f'{cls.campo_item}_id'
+        pendientes = {}
+        for (item_id, fecha), cantidades in cambios.items():
+            cantidades = {c: v for c, v in cantidades.items() if v}
+            if cantidades:
+                pendientes[(item_id, _como_fecha(fecha))] = cantidades
+        if not pendientes:
+            return
+
+        existentes = {
+            (item_id, fecha): pk
+            for pk, item_id, fecha in cls.objects.filter(
+                **{f'{campo}__in': {item_id for item_id, _ in pendientes}},
+                fecha__in={fecha for _, fecha in pendientes},
+            ).values_list('pk', campo, 'fecha')
+        }
+
+        nuevas = {clave: cantidades for clave, cantidades in pendientes.items() if clave not in existentes}
+        if nuevas:
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create([
+                        cls(**{campo: item_id, 'fecha': fecha}, **cantidades)
+                        for (item_id, fecha), cantidades in nuevas.items()
+                    ])
+            except IntegrityError:
+                # Otra transacción insertó alguna de las filas: se suman una por una
+                for (item_id, fecha), cantidades in nuevas.items():
+                    cls.sumar(item_id, fecha, **cantidades)
+
+        por_pk = {existentes[clave]: cantidades for clave, cantidades in pendientes.items() if clave in existentes}
+        if por_pk:
+            actualizaciones = {}
+            for campo_cantidad in cls.campos_cantidad:
+                casos = [
+                    When(pk=pk, then=Value(cantidades[campo_cantidad]))
+                    for pk, cantidades in por_pk.items() if campo_cantidad in cantidades
+                ]
+                if casos:
+                    actualizaciones[campo_cantidad] = F(campo_cantidad) + Case(
+                        *casos, default=Value(0), output_field=IntegerField()
+                    )
+            cls.objects.filter(pk__in=por_pk).update(**actualizaciones)
+
+
+class MovimientoDiarioEcoladrillo(MovimientoDiario):
+    ecoladrillo = models.ForeignKey(Ecoladrillo, on_delete=models.CASCADE, related_name='movimientos_diarios')
+    producido = models.IntegerField(default=0)
+    retirado = models.IntegerField(default=0)
+
+    campo_item = 'ecoladrillo'
+    campos_cantidad = ('producido', 'retirado')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'ecoladrillo'], name='movimiento_diario_ecoladrillo_unico'),
+        ]
+
+    def __str__(self):
+        return f"Movimientos {self.ecoladrillo_id} el {self.fecha}: +{self.producido} -{self.retirado}"
+
+
+class MovimientoDiarioMaterial(MovimientoDiario):
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name='movimientos_diarios')
+    recibido = models.IntegerField(default=0)
+    consumido = models.IntegerField(default=0)
+
+    campo_item = 'material'
+    campos_cantidad = ('recibido', 'consumido')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'material'], name='movimiento_diario_material_unico'),
+        ]
+
+    def __str__(self):
+        return f"Movimientos {self.material_id} el {self.fecha}: +{self.recibido} -{self.consumido}"
+
+
+def _resumen_ecoladrillos_desde_movimientos(desde=None, hasta=None):
+    """Calcula {(id_ecoladrillo, fecha): {campo: cantidad}} agrupando los movimientos originales"""
+    fuentes = [
+        (RegistroEcoladrillo.objects.all(), 'ecoladrillo', F('cantidad'), 'producido'),
+        (RetiroEcoladrillo.objects.all(), 'ecoladrillo', F('cantidad'), 'retirado'),
+    ]
+    return _agrupar_por_dia(fuentes, desde, hasta)
+
+
+def _resumen_materiales_desde_movimientos(desde=None, hasta=None):
+    """Calcula {(id_insumo, fecha): {campo: cantidad}} con el consumo de la producción incluido"""
+    fuentes = [
+        (RegistroMaterial.objects.all(), 'material', F('cantidad'), 'recibido'),
+        (
+            RegistroEcoladrillo.objects.all(),
+            'ecoladrillo__material_principal',
+            F('cantidad') * F('ecoladrillo__cantidad_material_requerida'),
+            'consumido',
+        ),
+    ]
+    return _agrupar_por_dia(fuentes, desde, hasta)
+
+
+def _agrupar_por_dia(fuentes, desde, hasta):
+    """Suma cada fuente (queryset, campo_item, expresion, campo) por item y día"""
+    resumen = defaultdict(dict)
+    for queryset, campo_item, expresion, campo in fuentes:
+        if desde:
+            queryset = queryset.filter(fecha__gte=desde)
+        if hasta:
+            queryset = queryset.filter(fecha__lte=hasta)
+        filas = queryset.order_by().values(campo_item, 'fecha').annotate(total=Sum(expresion))
+        for fila in filas.iterator(chunk_size=TAMANO_BLOQUE_REPORTE):
+            resumen[(fila[campo_item], fila['fecha'])][campo] = fila['total']
+    return resumen
+
+
+def reconstruir_movimientos_diarios(desde=None, hasta=None):
+    """
+    Recalcula el resumen diario de movimientos a partir de los movimientos originales.
+
+    Borra las filas del rango (todo el historial si no se indica) y las vuelve a crear
+    en bloque. Retorna la cantidad de filas creadas de ecoladrillos y de materiales.
+    """
+    if desde and hasta and hasta < desde:
+        raise ValueError("La fecha final no puede ser anterior a la inicial")
+
+    totales = []
+    with transaction.atomic():
+        for modelo, resumen in (
+            (MovimientoDiarioEcoladrillo, _resumen_ecoladrillos_desde_movimientos(desde, hasta)),
+            (MovimientoDiarioMaterial, _resumen_materiales_desde_movimientos(desde, hasta)),
+        ):
+            filas = modelo.objects.all()
+            if desde:
+                filas = filas.filter(fecha__gte=desde)
+            if hasta:
+                filas = filas.filter(fecha__lte=hasta)
+            filas.delete()
+
+            modelo.objects.bulk_create(
+                [
+                    modelo(**{f'{modelo.campo_item}_id': item_id, 'fecha': fecha}, **cantidades)
+                    for (item_id, fecha), cantidades in resumen.items()
+                ],
+                batch_size=TAMANO_BLOQUE_REPORTE,
+            )
+            totales.append(len(resumen))
+    return tuple(totales)
+
+
+# Agrupaciones de las series de movimientos: función de truncado y paso entre periodos
+GRANULARIDADES = ('dia', 'semana', 'mes')
+
+# Periodos máximos de una serie; rangos más largos se piden con una granularidad mayor
+MAX_PERIODOS_SERIE = 1000
+
+
+def _inicio_periodo(fecha, granularidad):
+    if granularidad == 'semana':
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == 'mes':
+        return fecha.replace(day=1)
+    return fecha
+
+
+def _siguiente_periodo(fecha, granularidad):
+    if granularidad == 'semana':
+        return fecha + timedelta(days=7)
+    if granularidad == 'mes':
+        return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return fecha + timedelta(days=1)
+
+
+def _cantidad_periodos(desde, hasta, granularidad):
+    """Periodos de la serie entre desde y hasta, contados sin recorrerlos"""
+    if granularidad == 'mes':
+        return (hasta.year - desde.year) * 12 + hasta.month - desde.month + 1
+    if granularidad == 'semana':
+        return (hasta - _inicio_periodo(desde, granularidad)).days // 7 + 1
+    return (hasta - desde).days + 1
+
+
+def serie_movimientos_ecoladrillo(campo, granularidad, desde, hasta, ecoladrillo_id=None, material_id=None):
+    """
+    Suma `campo` ('producido' o 'retirado') por día, semana o mes entre desde y hasta.
+
+    Lee el resumen diario de movimientos y agrupa en la base de datos, así el costo
+    depende de la cantidad de periodos y no de la cantidad de movimientos. Los periodos
+    sin movimientos aparecen con cantidad 0; un rango de más de MAX_PERIODOS_SERIE
+    periodos lanza ValueError. Retorna [(inicio_periodo, cantidad)].
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad inválida. Opciones: {', '.join(GRANULARIDADES)}")
+    if hasta < desde:
+        raise ValueError("La fecha final no puede ser anterior a la inicial")
+    periodos = _cantidad_periodos(desde, hasta, granularidad)
+    if periodos > MAX_PERIODOS_SERIE:
+        raise ValueError(
+            f"El rango tiene {periodos} periodos y el máximo es {MAX_PERIODOS_SERIE}. "
+            f"Use un rango más corto o una granularidad mayor"
+        )
+
+    filas = MovimientoDiarioEcoladrillo.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+    if ecoladrillo_id:
+        filas = filas.filter(ecoladrillo_id=ecoladrillo_id)
+    if material_id:
+        filas = filas.filter(ecoladrillo__material_principal_id=material_id)
+
+    periodo = {'dia': F('fecha'), 'semana': TruncWeek('fecha'), 'mes': TruncMonth('fecha')}[granularidad]
+    sumas = dict(
+        filas.order_by()
+        .annotate(periodo=periodo)
+        .values('periodo')
+        .annotate(total=Sum(campo))
+        .values_list('periodo', 'total')
+    )
+
+    serie = []
+    inicio = _inicio_periodo(desde, granularidad)
+    while inicio <= hasta:
+        serie.append((inicio, sumas.get(inicio, 0)))
+        inicio = _siguiente_periodo(inicio, granularidad)
+    return serie
+
+
+def _movimientos_ecoladrillo():
+    """Fuentes de movimiento del stock de ecoladrillos: (queryset, campo_item, expresion, signo)"""
+    return [
+        (MovimientoDiarioEcoladrillo.objects.all(), 'ecoladrillo', F('producido') - F('retirado'), 1),
+    ]
+
+
+def _movimientos_material():
+    """Fuentes de movimiento del stock de materiales, incluido el consumo por producción"""
+    return [
+        (MovimientoDiarioMaterial.objects.all(), 'material', F('recibido') - F('consumido'), 1),
+    ]
+
+
+def _sumas_por_rango(movimientos, rangos):
+    """
+    Suma el movimiento neto de cada item en cada rango (desde, hasta].
+
+    Usa una sola consulta agrupada por fuente con una suma condicional por rango,
+    así el costo no crece con la cantidad de fechas pedidas.
+    Retorna {item_id: [neto_rango_0, neto_rango_1, ...]}
+    """
+    netos = {}
+    inferiores = [desde for desde, _ in rangos]
+    superiores = [hasta for _, hasta in rangos]
+
+    for queryset, campo_item, expresion, signo in movimientos:
+        # Acotar el escaneo a la unión de los rangos
+        if None not in inferiores:
+            queryset = queryset.filter(fecha__gt=min(inferiores))
+        if None not in superiores:
+            queryset = queryset.filter(fecha__lte=max(superiores))
+
+        sumas = {}
+        for i, (desde, hasta) in enumerate(rangos):
+            filtro = Q()
+            if desde is not None:
+                filtro &= Q(fecha__gt=desde)
+            if hasta is not None:
+                filtro &= Q(fecha__lte=hasta)
+            sumas[f'rango_{i}'] = Sum(expresion, filter=filtro, default=0)
+
+        for fila in queryset.order_by().values(campo_item).annotate(**sumas):
+            acumulado = netos.setdefault(fila[campo_item], [0] * len(rangos))
+            for i in range(len(rangos)):
+                acumulado[i] += signo * fila[f'rango_{i}']
+
+    return netos
+
+
+def _stock_historico(modelo_control, actuales, movimientos, fechas):
+    """
+    Reconstruye el stock de cada item al cierre de cada fecha.
+
+    Cada fecha parte del punto de control más cercano (el último anterior o, si no
+    existe, el primero posterior) y aplica solo los movimientos entre ambos. Sin
+    puntos de control descuenta del stock actual los movimientos posteriores.
+    """
+    campo = f'{modelo_control.campo_item}_id'
+    fechas_control = list(
+        modelo_control.objects.order_by('fecha').values_list('fecha', flat=True).distinct()
+    )
+
+    planes = []
+    for fecha in fechas:
+        posicion = bisect_right(fechas_control, fecha)
+        if posicion > 0:
+            control = fechas_control[posicion - 1]
+            planes.append((control, (control, fecha), 1))
+        elif fechas_control:
+            control = fechas_control[0]
+            planes.append((control, (fecha, control), -1))
+        else:
+            planes.append((None, (fecha, None), -1))
+
+    bases = {}
+    controles_usados = {control for control, _, _ in planes if control is not None}
+    if controles_usados:
+        filas = modelo_control.objects.filter(fecha__in=controles_usados).values_list('fecha', campo, 'cantidad')
+        for fecha_control, item_id, cantidad in filas:
+            bases[(fecha_control, item_id)] = cantidad
+
+    netos = _sumas_por_rango(movimientos, [rango for _, rango, _ in planes]) if planes else {}
+
+    resultado = {}
+    for i, (fecha, (control, _, signo)) in enumerate(zip(fechas, planes)):
+        stock = {}
+        for item_id, actual in actuales.items():
+            base = actual if control is None else bases.get((control, item_id), 0)
+            neto = netos.get(item_id)
+            stock[item_id] = base + signo * (neto[i] if neto else 0)
+        resultado[fecha] = stock
+    return resultado
+
+
+def stock_ecoladrillos_en_fechas(fechas, actuales=None):
+    """
+    Stock de cada ecoladrillo al cierre de cada fecha: {fecha: {id_ecoladrillo: cantidad}}
+
+    actuales permite reutilizar el stock actual ya cargado por quien llama.
+    """
+    if actuales is None:
+        actuales = dict(Ecoladrillo.objects.values_list('id_ecoladrillo', 'cantidad'))
+    return _stock_historico(StockDiarioEcoladrillo, actuales, _movimientos_ecoladrillo(), sorted(set(fechas)))
+
+
+def stock_materiales_en_fechas(fechas, actuales=None):
+    """Stock de cada material al cierre de cada fecha: {fecha: {id_insumo: cantidad}}"""
+    if actuales is None:
+        actuales = dict(Material.objects.values_list('id_insumo', 'cantidad_disponible'))
+    return _stock_historico(StockDiarioMaterial, actuales, _movimientos_material(), sorted(set(fechas)))
+
+
+def _guardar_stock_diario(modelo_control, inicial, movimientos, desde, hasta):
+    """
+    Guarda un punto de control por item y día avanzando con los movimientos diarios
+
+    Los puntos de control del rango se borran y se vuelven a crear: un bulk_create con
+    update_conflicts y unique_fields no está disponible en MySQL.
+    """
+    campo = modelo_control.campo_item
+    deltas = defaultdict(lambda: defaultdict(int))
+    for queryset, campo_item, expresion, signo in movimientos:
+        filas = (
+            queryset.filter(fecha__gt=desde, fecha__lte=hasta)
+            .order_by()
+            .values('fecha', campo_item)
+            .annotate(total=Sum(expresion))
+        )
+        for fila in filas:
+            deltas[fila['fecha']][fila[campo_item]] += signo * fila['total']
+
+    modelo_control.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+    stock = dict(inicial)
+    fecha = desde
+    while fecha <= hasta:
+        for item_id, delta in deltas.get(fecha, {}).items():
+            if item_id in stock:
+                stock[item_id] += delta
+        modelo_control.objects.bulk_create(
+            [modelo_control(fecha=fecha, cantidad=cantidad, **{f'{campo}_id': item_id})
+             for item_id, cantidad in stock.items()],
+            batch_size=500,
+        )
+        fecha += timedelta(days=1)
+
+
+def guardar_stock_diario(desde, hasta):
+    """
+    Calcula y guarda los puntos de control de stock entre desde y hasta (inclusive).
+
+    El primer día se reconstruye con el motor histórico y los siguientes avanzan con
+    los movimientos agrupados por día, sin volver a recorrer el historial completo.
+    Retorna la cantidad de días guardados.
+    """
+    if hasta < desde:
+        raise ValueError("La fecha final debe ser mayor o igual a la fecha inicial")
+    if hasta >= timezone.localdate():
+        raise ValueError("Solo se guardan puntos de control de días cerrados (anteriores a hoy)")
+
+    with transaction.atomic():
+        inicial_ecoladrillos = stock_ecoladrillos_en_fechas([desde])[desde]
+        inicial_materiales = stock_materiales_en_fechas([desde])[desde]
+        _guardar_stock_diario(StockDiarioEcoladrillo, inicial_ecoladrillos, _movimientos_ecoladrillo(), desde, hasta)
+        _guardar_stock_diario(StockDiarioMaterial, inicial_materiales, _movimientos_material(), desde, hasta)
+
+    return (hasta - desde).days + 1
+
+
 class Reporte(models.Model):
     TIPOS_REPORTE = [
         ('stock_fecha', 'Stock en Fecha'),
@@ -187,10 +1223,13 @@ class Reporte(models.Model):
     
     id_reporte = models.AutoField(primary_key=True)
     tipo_reporte = models.CharField(max_length=20, choices=TIPOS_REPORTE)
-    fecha_generacion = models.DateTimeField(auto_now_add=True)
+    fecha_generacion = models.DateTimeField(auto_now_add=True, db_index=True)
     operario = models.ForeignKey(Operario, on_delete=models.SET_NULL, null=True, blank=True)
     datos_reporte = models.JSONField()  # Almacena el contenido del reporte
 
+    # select_subclasses() resuelve el subtipo concreto de cada reporte en la misma consulta
+    objects = InheritanceManager()
+
     def obtener_ecoladrillos_sin_stock(self):
         """Método utilitario para obtener ecoladrillos sin stock desde datos_reporte"""
         if 'ecoladrillos_sin_stock' in self.datos_reporte:
@@ -229,49 +1268,86 @@ class Reporte(models.Model):
 
     class Meta:
         ordering = ['-fecha_generacion']
+        indexes = [
+            models.Index(fields=['tipo_reporte', 'fecha_generacion'], name='reporte_tipo_fecha_idx'),
+            models.Index(fields=['operario', 'fecha_generacion'], name='reporte_operario_fecha_idx'),
+        ]
+
+
+def _filas_ecoladrillos():
+    """
+    Recorre el catálogo de ecoladrillos como diccionarios, con el nombre del material
+    unido en la misma consulta y por bloques de TAMANO_BLOQUE_REPORTE filas
+    """
+    return recorrer_por_bloques(
+        Ecoladrillo.objects.values('id_ecoladrillo', 'nombre', 'descripcion', 'size', 'cantidad',
+                                   'cantidad_material_requerida', 'material_principal__nombre'),
+        ['id_ecoladrillo'],
+    )
+
+
+def _filas_materiales():
+    """Recorre el catálogo de materiales como diccionarios, por bloques"""
+    return recorrer_por_bloques(
+        Material.objects.values('id_insumo', 'nombre', 'tipo', 'cantidad_disponible', 'unidad_medida'),
+        ['id_insumo'],
+    )
 
 
 class ReporteStockFecha(Reporte):
     fecha_consulta = models.DateField(null=True, blank=True)  # Para reportes de stock en fecha
     
     def generar_datos_stock(self):
-        """Genera los datos de stock para todos los ecoladrillos y materiales en la fecha consultada"""
-        from django.utils import timezone
-        
-        # Obtener todos los ecoladrillos con su stock actual
+        """Genera los datos de stock de todos los ecoladrillos y materiales al cierre de la fecha consultada"""
+        fecha = self.fecha_consulta or timezone.localdate()
+        sizes = dict(Ecoladrillo.SIZES)
+
+        # Para fechas pasadas el stock se reconstruye desde los puntos de control;
+        # para hoy se usa la cantidad de cada fila
+        stock_ecoladrillos = stock_materiales = None
+        if fecha < timezone.localdate():
+            stock_ecoladrillos = stock_ecoladrillos_en_fechas([fecha])[fecha]
+            stock_materiales = stock_materiales_en_fechas([fecha])[fecha]
+
+        # Los datos y los totales se arman en una sola pasada sobre cada catálogo
         ecoladrillos_data = []
-        for ecoladrillo in Ecoladrillo.objects.all():
+        ecoladrillos_con_stock = 0
+        for fila in _filas_ecoladrillos():
+            cantidad = fila['cantidad'] if stock_ecoladrillos is None else stock_ecoladrillos[fila['id_ecoladrillo']]
             ecoladrillos_data.append({
-                'id': ecoladrillo.id_ecoladrillo,
-                'nombre': ecoladrillo.nombre,
-                'descripcion': ecoladrillo.descripcion,
-                'size': ecoladrillo.get_size_display(),
-                'material_principal': ecoladrillo.material_principal.nombre,
-                'cantidad_stock': ecoladrillo.cantidad,
-                'tiene_stock': ecoladrillo.cantidad > 0
+                'id': fila['id_ecoladrillo'],
+                'nombre': fila['nombre'],
+                'descripcion': fila['descripcion'],
+                'size': sizes.get(fila['size'], fila['size']),
+                'material_principal': fila['material_principal__nombre'],
+                'cantidad_stock': cantidad,
+                'tiene_stock': cantidad > 0
             })
-        
-        # Obtener todos los materiales con su stock actual
+            ecoladrillos_con_stock += cantidad > 0
+
         materiales_data = []
-        for material in Material.objects.all():
+        materiales_con_stock = 0
+        for fila in _filas_materiales():
+            cantidad = fila['cantidad_disponible'] if stock_materiales is None else stock_materiales[fila['id_insumo']]
             materiales_data.append({
-                'id': material.id_insumo,
-                'nombre': material.nombre,
-                'tipo': material.tipo,
-                'cantidad_disponible': material.cantidad_disponible,
-                'unidad_medida': material.unidad_medida,
-                'tiene_stock': material.cantidad_disponible > 0
+                'id': fila['id_insumo'],
+                'nombre': fila['nombre'],
+                'tipo': fila['tipo'],
+                'cantidad_disponible': cantidad,
+                'unidad_medida': fila['unidad_medida'],
+                'tiene_stock': cantidad > 0
             })
+            materiales_con_stock += cantidad > 0
         
         # Guardar en datos_reporte
         self.datos_reporte = {
-            'fecha_consulta': self.fecha_consulta.isoformat() if self.fecha_consulta else timezone.now().date().isoformat(),
+            'fecha_consulta': fecha.isoformat(),
             'ecoladrillos': ecoladrillos_data,
             'materiales': materiales_data,
             'total_ecoladrillos': len(ecoladrillos_data),
             'total_materiales': len(materiales_data),
-            'ecoladrillos_con_stock': len([e for e in ecoladrillos_data if e['tiene_stock']]),
-            'materiales_con_stock': len([m for m in materiales_data if m['tiene_stock']])
+            'ecoladrillos_con_stock': ecoladrillos_con_stock,
+            'materiales_con_stock': materiales_con_stock
         }
         self.save()
         return self.datos_reporte
@@ -282,41 +1358,42 @@ class ReporteStockFecha(Reporte):
 class ReporteResumenInventario(Reporte):
     def generar_datos_resumen(self):
         """Genera los datos de resumen del inventario, enfocándose en items sin stock"""
+        sizes = dict(Ecoladrillo.SIZES)
         
-        # Obtener ecoladrillos sin stock
+        # Separar ecoladrillos sin stock y con stock en una sola pasada
         ecoladrillos_sin_stock = []
         ecoladrillos_con_stock = []
         
-        for ecoladrillo in Ecoladrillo.objects.all():
+        for fila in _filas_ecoladrillos():
             ecoladrillo_data = {
-                'id': ecoladrillo.id_ecoladrillo,
-                'nombre': ecoladrillo.nombre,
-                'descripcion': ecoladrillo.descripcion,
-                'size': ecoladrillo.get_size_display(),
-                'material_principal': ecoladrillo.material_principal.nombre,
-                'cantidad_stock': ecoladrillo.cantidad,
-                'cantidad_material_requerida': ecoladrillo.cantidad_material_requerida
+                'id': fila['id_ecoladrillo'],
+                'nombre': fila['nombre'],
+                'descripcion': fila['descripcion'],
+                'size': sizes.get(fila['size'], fila['size']),
+                'material_principal': fila['material_principal__nombre'],
+                'cantidad_stock': fila['cantidad'],
+                'cantidad_material_requerida': fila['cantidad_material_requerida']
             }
             
-            if ecoladrillo.cantidad == 0:
+            if fila['cantidad'] == 0:
                 ecoladrillos_sin_stock.append(ecoladrillo_data)
             else:
                 ecoladrillos_con_stock.append(ecoladrillo_data)
         
-        # Obtener materiales sin stock
+        # Separar materiales sin stock y con stock
         materiales_sin_stock = []
         materiales_con_stock = []
         
-        for material in Material.objects.all():
+        for fila in _filas_materiales():
             material_data = {
-                'id': material.id_insumo,
-                'nombre': material.nombre,
-                'tipo': material.tipo,
-                'cantidad_disponible': material.cantidad_disponible,
-                'unidad_medida': material.unidad_medida
+                'id': fila['id_insumo'],
+                'nombre': fila['nombre'],
+                'tipo': fila['tipo'],
+                'cantidad_disponible': fila['cantidad_disponible'],
+                'unidad_medida': fila['unidad_medida']
             }
             
-            if material.cantidad_disponible == 0:
+            if fila['cantidad_disponible'] == 0:
                 materiales_sin_stock.append(material_data)
             else:
                 materiales_con_stock.append(material_data)
@@ -344,8 +1421,14 @@ class ReporteResumenRetiros(Reporte):
     fecha_inicio = models.DateField(null=True, blank=True)  # Para reportes de stock en período
     fecha_fin = models.DateField(null=True, blank=True)  # Para reportes de stock en período
     
-    def generar_datos_retiros(self):
-        """Genera los datos de retiros en el período especificado"""
+    def generar_datos_retiros(self, incluir_detalle=True):
+        """
+        Genera los datos de retiros en el período especificado
+        
+        El resumen por ecoladrillo y las estadísticas se agrupan en SQL; el período se
+        recorre con el índice (fecha, ecoladrillo) de los retiros. El detalle de cada retiro es opcional y se recorre por bloques;
+        sin él el reporte no depende de la cantidad de retiros del período.
+        """
         
         # Filtrar retiros por fecha si están especificadas
         retiros_query = RetiroEcoladrillo.objects.all()
@@ -355,34 +1438,28 @@ class ReporteResumenRetiros(Reporte):
         if self.fecha_fin:
             retiros_query = retiros_query.filter(fecha__lte=self.fecha_fin)
         
-        # Procesar datos de retiros
-        retiros_data = []
+        sizes = dict(Ecoladrillo.SIZES)
+        
+        # Agrupar por ecoladrillo en la base de datos
+        resumen_por_ecoladrillo = []
+        total_retiros = 0
         total_cantidad_retirada = 0
-        ecoladrillos_retirados = {}
         
-        for retiro in retiros_query:
-            retiro_data = {
-                'id_retiro': retiro.id_retiro,
-                'fecha': retiro.fecha.isoformat(),
-                'ecoladrillo_nombre': retiro.ecoladrillo.nombre,
-                'ecoladrillo_size': retiro.ecoladrillo.get_size_display(),
-                'cantidad': retiro.cantidad,
-                'motivo': retiro.motivo
-            }
-            retiros_data.append(retiro_data)
-            total_cantidad_retirada += retiro.cantidad
-            
-            # Agrupar por ecoladrillo
-            ecoladrillo_key = f"{retiro.ecoladrillo.nombre} ({retiro.ecoladrillo.get_size_display()})"
-            if ecoladrillo_key not in ecoladrillos_retirados:
-                ecoladrillos_retirados[ecoladrillo_key] = {
-                    'nombre': retiro.ecoladrillo.nombre,
-                    'size': retiro.ecoladrillo.get_size_display(),
-                    'total_retirado': 0,
-                    'numero_retiros': 0
-                }
-            ecoladrillos_retirados[ecoladrillo_key]['total_retirado'] += retiro.cantidad
-            ecoladrillos_retirados[ecoladrillo_key]['numero_retiros'] += 1
+        grupos = (
+            retiros_query.order_by()
+            .values('ecoladrillo', 'ecoladrillo__nombre', 'ecoladrillo__size')
+            .annotate(total_retirado=Sum('cantidad'), numero_retiros=Count('id_retiro'))
+            .order_by('-total_retirado', 'ecoladrillo__nombre')
+        )
+        for grupo in grupos:
+            resumen_por_ecoladrillo.append({
+                'nombre': grupo['ecoladrillo__nombre'],
+                'size': sizes.get(grupo['ecoladrillo__size'], grupo['ecoladrillo__size']),
+                'total_retirado': grupo['total_retirado'],
+                'numero_retiros': grupo['numero_retiros']
+            })
+            total_retiros += grupo['numero_retiros']
+            total_cantidad_retirada += grupo['total_retirado']
         
         # Guardar en datos_reporte
         self.datos_reporte = {
@@ -390,16 +1467,159 @@ class ReporteResumenRetiros(Reporte):
                 'fecha_inicio': self.fecha_inicio.isoformat() if self.fecha_inicio else None,
                 'fecha_fin': self.fecha_fin.isoformat() if self.fecha_fin else None
             },
-            'retiros': retiros_data,
-            'resumen_por_ecoladrillo': list(ecoladrillos_retirados.values()),
+            'resumen_por_ecoladrillo': resumen_por_ecoladrillo,
             'estadisticas': {
-                'total_retiros': len(retiros_data),
+                'total_retiros': total_retiros,
                 'total_cantidad_retirada': total_cantidad_retirada,
-                'tipos_ecoladrillos_diferentes': len(ecoladrillos_retirados)
+                'tipos_ecoladrillos_diferentes': len(resumen_por_ecoladrillo)
             }
         }
+        
+        if incluir_detalle:
+            filas = recorrer_por_bloques(
+                retiros_query.values('id_retiro', 'fecha', 'cantidad', 'motivo', 'ecoladrillo__nombre', 'ecoladrillo__size'),
+                ['fecha', 'id_retiro'],
+            )
+            self.datos_reporte['retiros'] = [
+                {
+                    'id_retiro': fila['id_retiro'],
+                    'fecha': fila['fecha'].isoformat(),
+                    'ecoladrillo_nombre': fila['ecoladrillo__nombre'],
+                    'ecoladrillo_size': sizes.get(fila['ecoladrillo__size'], fila['ecoladrillo__size']),
+                    'cantidad': fila['cantidad'],
+                    'motivo': fila['motivo']
+                }
+                for fila in filas
+            ]
+        
         self.save()
         return self.datos_reporte
     
     def __str__(self):
-        return f"Reporte Resumen Retiros {self.id_reporte} - {self.get_tipo_reporte_display()}"
\ No newline at end of file
+        return f"Reporte Resumen Retiros {self.id_reporte} - {self.get_tipo_reporte_display()}"
+
+class TrabajoReporte(models.Model):
+    """
+    Generación de un reporte pedida en modo asíncrono.
+
+    La cola vive en la base de datos: la API guarda el trabajo como pendiente y el comando
+    procesar_trabajos_reporte lo toma y genera el reporte fuera de la petición HTTP.
+    Varios procesadores pueden trabajar a la vez; tomar un trabajo es un UPDATE condicional
+    sobre el estado, así que cada trabajo lo ejecuta uno solo.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    # Intentos antes de marcar con error un trabajo cuyo procesador se detuvo a mitad
+    MAX_INTENTOS = 3
+
+    id_trabajo = models.AutoField(primary_key=True)
+    tipo_reporte = models.CharField(max_length=20, choices=Reporte.TIPOS_REPORTE)
+    parametros = models.JSONField(default=dict)  # Fechas y opciones, como llegaron a la API
+    operario = models.ForeignKey(Operario, on_delete=models.SET_NULL, null=True, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    progreso = models.PositiveSmallIntegerField(default=0)  # 0 en cola, 10 en proceso, 100 al terminar
+    intentos = models.PositiveSmallIntegerField(default=0)
+    procesador = models.CharField(max_length=100, blank=True)
+    mensaje_error = models.TextField(blank=True)
+    reporte = models.ForeignKey(Reporte, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Trabajo {self.id_trabajo} - {self.get_tipo_reporte_display()} - {self.get_estado_display()}"
+
+    @classmethod
+    def tomar_siguiente(cls, procesador):
+        """
+        Marca como en proceso el trabajo pendiente más antiguo y lo retorna, o None si no hay.
+
+        Si otro procesador gana el mismo trabajo el UPDATE no modifica filas y se prueba
+        con el siguiente.
+        """
+        while True:
+            candidato = (
+                cls.objects.filter(estado='pendiente')
+                .order_by('id_trabajo')
+                .values_list('id_trabajo', flat=True)
+                .first()
+            )
+            if candidato is None:
+                return None
+            tomados = cls.objects.filter(pk=candidato, estado='pendiente').update(
+                estado='en_proceso', procesador=procesador, progreso=10,
+                intentos=F('intentos') + 1, fecha_inicio=timezone.now()
+            )
+            if tomados:
+                return cls.objects.get(pk=candidato)
+
+    @classmethod
+    def liberar_abandonados(cls, antes_de):
+        """
+        Devuelve a la cola los trabajos en proceso desde antes de `antes_de` (su procesador
+        se detuvo); los que ya agotaron sus intentos quedan con error. Retorna cuántos liberó.
+        """
+        abandonados = cls.objects.filter(estado='en_proceso', fecha_inicio__lt=antes_de)
+        abandonados.filter(intentos__gte=cls.MAX_INTENTOS).update(
+            estado='error', fecha_fin=timezone.now(),
+            mensaje_error='El trabajo se interrumpió demasiadas veces'
+        )
+        return abandonados.update(estado='pendiente', procesador='', progreso=0)
+
+    def _generar(self):
+        """Crea y llena el reporte pedido; mismas reglas que la generación directa en la API"""
+        parametros = self.parametros
+        if self.tipo_reporte == 'stock_fecha':
+            reporte = ReporteStockFecha.objects.create(
+                tipo_reporte='stock_fecha', operario_id=self.operario_id,
+                fecha_consulta=date.fromisoformat(parametros['fecha']), datos_reporte={}
+            )
+            reporte.generar_datos_stock()
+        elif self.tipo_reporte == 'resumen_inventario':
+            reporte = ReporteResumenInventario.objects.create(
+                tipo_reporte='resumen_inventario', operario_id=self.operario_id, datos_reporte={}
+            )
+            reporte.generar_datos_resumen()
+        elif self.tipo_reporte == 'resumen_retiros':
+            reporte = ReporteResumenRetiros.objects.create(
+                tipo_reporte='resumen_retiros', operario_id=self.operario_id,
+                fecha_inicio=date.fromisoformat(parametros['fecha_inicio']),
+                fecha_fin=date.fromisoformat(parametros['fecha_fin']),
+                datos_reporte={}
+            )
+            reporte.generar_datos_retiros(incluir_detalle=parametros.get('incluir_detalle', True))
+        else:
+            raise ValueError(f"Tipo de reporte desconocido: {self.tipo_reporte}")
+        return reporte
+
+    def ejecutar(self):
+        """
+        Genera el reporte de un trabajo ya tomado y guarda el resultado.
+
+        La generación corre en una transacción: si falla no queda un reporte a medias y el
+        trabajo termina con estado error y el mensaje de la excepción.
+        """
+        try:
+            with transaction.atomic():
+                reporte = self._generar()
+        except Exception as e:
+            self.estado = 'error'
+            self.mensaje_error = str(e) or e.__class__.__name__
+        else:
+            self.estado = 'completado'
+            self.reporte = reporte
+            self.progreso = 100
+        self.fecha_fin = timezone.now()
+        self.save(update_fields=['estado', 'mensaje_error', 'reporte', 'progreso', 'fecha_fin'])
+        return self
+
+    class Meta:
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'id_trabajo'], name='trabajo_reporte_estado_idx'),
+        ]
@@ -0,0 +1,139 @@
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import re
+import zipfile
+from contextlib import ExitStack
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+# Funciones que se listan en el resumen de texto del perfil
+FUNCIONES_RESUMEN = 80
+
+NOMBRE_VALIDO = re.compile(r'^[\w.-]+\.zip$')
+
+# Un perfil a la vez por proceso: cProfile agrega costo y mide mejor sin otras peticiones perfiladas
+_perfilando = Lock()
+
+
+def token_valido(request):
+    """
+    Indica si la petición trae el token de perfilado en el encabezado X-Perfilar
+
+    No se acepta en la URL: quedaría en los logs de acceso y en el historial del navegador.
+    """
+    token = settings.PERFILADO_TOKEN
+    if not token:
+        return False
+    enviado = request.headers.get('X-Perfilar') or ''
+    return constant_time_compare(enviado, token)
+
+
+def directorio_perfiles():
+    return Path(settings.PERFILES_DIR)
+
+
+def ruta_perfil(nombre):
+    """Ruta del perfil guardado con ese nombre, o None si el nombre no es válido o no existe"""
+    if not NOMBRE_VALIDO.match(nombre):
+        return None
+    ruta = directorio_perfiles() / nombre
+    return ruta if ruta.is_file() else None
+
+
+def perfiles_guardados():
+    """Nombres de los perfiles guardados, del más reciente al más antiguo"""
+    directorio = directorio_perfiles()
+    if not directorio.is_dir():
+        return []
+    return sorted((ruta.name for ruta in directorio.glob('*.zip')), reverse=True)
+
+
+class _ConsultasRegistradas:
+    """
+    Envoltorio de conexión que guarda cada consulta con su duración
+
+    Los parámetros no se guardan: pueden traer datos personales o contraseñas.
+    """
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append({
+                'sql': sql,
+                'varias': many,
+                'ms': round((perf_counter() - inicio) * 1000, 3),
+            })
+
+
+def perfilar(request, get_response):
+    """
+    Atiende la petición bajo cProfile registrando el SQL ejecutado y guarda el perfil.
+
+    Retorna (respuesta, nombre del perfil); el nombre es None si ya se estaba perfilando
+    otra petición en este proceso, en cuyo caso la petición se atiende sin perfilar.
+    """
+    if not _perfilando.acquire(blocking=False):
+        return get_response(request), None
+    try:
+        registro = _ConsultasRegistradas()
+        perfil = cProfile.Profile()
+        inicio = perf_counter()
+        with ExitStack() as envoltorios:
+            for conexion in connections.all():
+                envoltorios.enter_context(conexion.execute_wrapper(registro))
+            respuesta = perfil.runcall(get_response, request)
+        total = perf_counter() - inicio
+    finally:
+        _perfilando.release()
+    return respuesta, _guardar(request, respuesta, perfil, registro.consultas, total)
+
+
+def _guardar(request, respuesta, perfil, consultas, total):
+    """
+    Guarda el perfil como un .zip con perfil.prof (para pstats, snakeviz, etc.), resumen.txt
+    y consultas.json, y borra los más antiguos por encima de PERFILES_MAXIMO
+    """
+    coincidencia = request.resolver_match
+    ruta = (coincidencia.view_name if coincidencia else None) or 'sin_ruta'
+    nombre = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{request.method}-{ruta}-{uuid4().hex[:8]}.zip"
+
+    perfil.create_stats()
+    # Se serializa antes de armar el resumen: pstats.Stats se queda con las estadísticas del perfil
+    datos = marshal.dumps(perfil.stats)
+    ms_db = sum(consulta['ms'] for consulta in consultas)
+    resumen = io.StringIO()
+    resumen.write(
+        f"{request.method} {request.get_full_path()}\n"
+        f"Estado {respuesta.status_code} en {total * 1000:.1f} ms; "
+        f"{len(consultas)} consulta(s) en {ms_db:.1f} ms\n\n"
+    )
+    pstats.Stats(perfil, stream=resumen).sort_stats('cumulative').print_stats(FUNCIONES_RESUMEN)
+    resumen.write('\nConsultas más lentas:\n')
+    for consulta in sorted(consultas, key=lambda c: c['ms'], reverse=True)[:20]:
+        resumen.write(f"{consulta['ms']:>10.3f} ms  {consulta['sql'][:300]}\n")
+
+    directorio = directorio_perfiles()
+    directorio.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(directorio / nombre, 'w', compression=zipfile.ZIP_DEFLATED) as archivo:
+        archivo.writestr('perfil.prof', datos)
+        archivo.writestr('resumen.txt', resumen.getvalue())
+        archivo.writestr('consultas.json', json.dumps(consultas, indent=2, ensure_ascii=False))
+
+    for antiguo in perfiles_guardados()[settings.PERFILES_MAXIMO:]:
+        (directorio / antiguo).unlink(missing_ok=True)
+    return nombre
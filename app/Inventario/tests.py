@@ -1,3 +1,1648 @@
-from django.test import TestCase
+"""
+Pruebas de la API y del inventario.
 
-# Create your tests here.
+Regresión de rendimiento: cada endpoint del router se llama con un inventario chico y otra vez con uno varias veces
+más grande: la cantidad de consultas por petición tiene que ser la misma en ambos casos y no
+pasar del máximo fijado en LIMITES_CONSULTAS. Con SQLite se revisa además con EXPLAIN QUERY
+PLAN que los filtros por fecha y por clave foránea usen índices.
+
+Las demás pruebas cubren el comportamiento de cada funcionalidad.
+"""
+import base64
+import io
+import json
+import tempfile
+import zipfile
+from datetime import date, datetime, time, timedelta
+from unittest import mock, skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.permissions import IsAuthenticated
+
+from .api.urls import router
+from .api.serializers import (
+    ReporteResumenInventarioSerializer, ReporteResumenRetirosSerializer, ReporteStockFechaSerializer
+)
+from .api.views import MaterialViewSet, ReporteViewSet
+from .cache import cache_conteos, cache_render_reportes, cache_reportes
+from .importacion import importar_registros_material
+from .models import (
+    Administrador, Ecoladrillo, Material, MovimientoDiarioEcoladrillo, MovimientoDiarioMaterial, Operario, RegistroEcoladrillo,
+    RegistroMaterial, Reporte, ReporteResumenInventario, ReporteResumenRetiros, ReporteStockFecha,
+    RetiroEcoladrillo, StockDiarioEcoladrillo, TrabajoReporte, VersionInventario,
+    guardar_stock_diario,
+    recorrer_por_bloques, stock_ecoladrillos_en_fechas, stock_materiales_en_fechas
+)
+
+# Consultas máximas por petición (sin contar SAVEPOINT, que existen solo porque la prueba
+# corre dentro de una transacción). Se miden con las cachés vacías. Las acciones de catálogo
+# y stock con ETag leen además la versión del inventario (una consulta, y la única en un 304).
+# El historial de reportes carga aparte los datos de los reportes que no tiene ya armados.
+LIMITES_CONSULTAS = {
+    'api-root': 0,
+    'operario-list': 2,
+    'operario-detail': 1,
+    'administrador-list': 2,
+    'administrador-detail': 1,
+    'ecoladrillo-list': 3,
+    'ecoladrillo-detail': 2,
+    'ecoladrillo-create': 3,
+    'ecoladrillo-update': 3,
+    'ecoladrillo-stock-bajo': 2,
+    'ecoladrillo-stock-disponible': 2,
+    'ecoladrillo-reporte-stock': 4,
+    'material-list': 3,
+    'material-detail': 2,
+    'material-create': 2,
+    'material-por-tipo': 2,
+    'material-stock-disponible': 2,
+    'material-reporte-stock': 4,
+    'registro-ecoladrillo-list': 3,
+    'registro-ecoladrillo-detail': 1,
+    'registro-ecoladrillo-create': 9,
+    'registro-ecoladrillo-lote': 13,
+    'registro-ecoladrillo-por-fecha': 3,
+    'registro-ecoladrillo-exportar': 1,
+    'registro-ecoladrillo-series': 1,
+    'retiro-ecoladrillo-list': 3,
+    'retiro-ecoladrillo-detail': 1,
+    'retiro-ecoladrillo-create': 6,
+    'retiro-ecoladrillo-por-fecha': 3,
+    'retiro-ecoladrillo-por-ecoladrillo': 3,
+    'retiro-ecoladrillo-exportar': 1,
+    'retiro-ecoladrillo-series': 1,
+    'registro-material-list': 3,
+    'registro-material-detail': 1,
+    'registro-material-create': 6,
+    'registro-material-exportar': 1,
+    'registro-material-importar': 8,
+    'reporte-list': 1,
+    'reporte-detail': 1,
+    'reporte-historial': 2,
+    'reporte-ver-datos': 1,
+    'reporte-obtener-con-serializer-especifico': 1,
+    'reporte-estadisticas-cache': 1,
+    'reporte-operarios-disponibles': 1,
+    'reporte-stock-en-fechas': 6,
+    'reporte-generar-stock-fecha': 14,
+    'reporte-generar-resumen-inventario': 8,
+    'reporte-generar-resumen-retiros': 7,
+    'reporte-generar-asincrono': 1,
+    'reporte-stock-fecha-list': 2,
+    'reporte-stock-fecha-detail': 1,
+    'reporte-resumen-inventario-list': 2,
+    'reporte-resumen-inventario-detail': 1,
+    'reporte-resumen-retiros-list': 2,
+    'reporte-resumen-retiros-detail': 1,
+    'trabajo-reporte-list': 2,
+    'trabajo-reporte-detail': 1,
+}
+
+FECHA_BASE = date(2025, 1, 1)
+
+
+def _contar_consultas(consultas):
+    return sum(
+        1 for consulta in consultas.captured_queries
+        if not consulta['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'))
+    )
+
+
+class InventarioDePrueba:
+    """Crea un inventario con catálogo, movimientos diarios y reportes, de tamaño configurable"""
+
+    def __init__(self):
+        self.dias = 0
+        self.operario = Operario.objects.create(
+            nombre='Operario Prueba', email='operario@prueba.com', cargo='Producción', contraseña='x'
+        )
+        self.materiales = []
+        self.ecoladrillos = []
+
+    def crecer(self, escala):
+        """Agrega `escala` materiales y ecoladrillos, y `escala` semanas de movimientos"""
+        nuevos_materiales = [
+            Material.objects.create(
+                nombre=f'Material {len(self.materiales) + i}', tipo='plástico' if i % 2 else 'vidrio',
+                cantidad_disponible=1_000_000, unidad_medida='kg'
+            )
+            for i in range(escala)
+        ]
+        self.materiales += nuevos_materiales
+        self.ecoladrillos += [
+            Ecoladrillo.objects.create(
+                nombre=f'Ecoladrillo {len(self.ecoladrillos) + i}', descripcion='prueba',
+                material_principal=material, cantidad_material_requerida=2, cantidad=0
+            )
+            for i, material in enumerate(nuevos_materiales)
+        ]
+
+        dias = range(self.dias, self.dias + 7 * escala)
+        self.dias += 7 * escala
+        RegistroEcoladrillo.registrar_lote([
+            RegistroEcoladrillo(fecha=FECHA_BASE + timedelta(days=dia), ecoladrillo=ecoladrillo, cantidad=20)
+            for dia in dias for ecoladrillo in self.ecoladrillos
+        ])
+        RetiroEcoladrillo.registrar_lote([
+            RetiroEcoladrillo(fecha=FECHA_BASE + timedelta(days=dia), ecoladrillo=ecoladrillo, cantidad=5, motivo='Venta')
+            for dia in dias for ecoladrillo in self.ecoladrillos
+        ])
+        for dia in dias:
+            RegistroMaterial(
+                fecha=FECHA_BASE + timedelta(days=dia), cantidad=100,
+                material=self.materiales[dia % len(self.materiales)], origen='Donación'
+            ).save()
+
+    def agregar_volumen(self, filas):
+        """
+        Agrega `filas` movimientos por tabla repartidos en un año, más operarios, reportes y
+        trabajos, sin pasar por la lógica de stock: solo sirve para que los planes de consulta
+        se elijan con tablas del tamaño de una base en uso
+        """
+        operarios = Operario.objects.bulk_create([
+            Operario(nombre=f'Operario {i}', email=f'operario{i}@volumen.com', cargo='Producción', contraseña='x')
+            for i in range(50)
+        ])
+        fechas = [FECHA_BASE - timedelta(days=1 + i % 365) for i in range(filas)]
+        ecoladrillos = self.ecoladrillos
+        RegistroEcoladrillo.objects.bulk_create([
+            RegistroEcoladrillo(fecha=fecha, ecoladrillo=ecoladrillos[i % len(ecoladrillos)], cantidad=1)
+            for i, fecha in enumerate(fechas)
+        ])
+        RetiroEcoladrillo.objects.bulk_create([
+            RetiroEcoladrillo(fecha=fecha, ecoladrillo=ecoladrillos[i % len(ecoladrillos)], cantidad=1, motivo='Venta')
+            for i, fecha in enumerate(fechas)
+        ])
+        RegistroMaterial.objects.bulk_create([
+            RegistroMaterial(fecha=fecha, cantidad=1, material=self.materiales[i % len(self.materiales)], origen='Compra')
+            for i, fecha in enumerate(fechas)
+        ])
+        Reporte.objects.bulk_create([
+            Reporte(tipo_reporte='resumen_retiros', operario=operarios[i % len(operarios)], datos_reporte={})
+            for i in range(filas // 10)
+        ])
+        TrabajoReporte.objects.bulk_create([
+            TrabajoReporte(tipo_reporte='resumen_retiros', estado='completado', progreso=100)
+            for _ in range(filas // 10)
+        ])
+
+
+class ConsultasPorEndpointTests(TestCase):
+    """La cantidad de consultas de cada endpoint no depende del tamaño del inventario"""
+
+    def setUp(self):
+        self.inventario = InventarioDePrueba()
+        self.inventario.crecer(2)
+        self.administrador = Administrador.objects.create(nombre='Admin', email='admin@prueba.com', contraseña='x')
+
+    def _peticiones(self):
+        """(nombre, método, url, datos) de todos los endpoints del router, con IDs existentes"""
+        ecoladrillo = self.inventario.ecoladrillos[0]
+        material = self.inventario.materiales[0]
+        registro = RegistroEcoladrillo.objects.order_by('pk').first()
+        retiro = RetiroEcoladrillo.objects.order_by('pk').first()
+        registro_material = RegistroMaterial.objects.order_by('pk').first()
+        reportes = {reporte.tipo_reporte: reporte for reporte in Reporte.objects.select_subclasses()}
+        trabajo = TrabajoReporte.objects.order_by('pk').first()
+        rango = f'fecha_inicio={FECHA_BASE}&fecha_fin={FECHA_BASE + timedelta(days=self.inventario.dias)}'
+        fecha_movimiento = str(FECHA_BASE + timedelta(days=3))
+
+        def url(nombre, *args):
+            return reverse(nombre, args=args)
+
+        return [
+            ('api-root', 'get', '/api/v1/', None),
+            ('operario-list', 'get', url('operario-list'), None),
+            ('operario-detail', 'get', url('operario-detail', self.inventario.operario.pk), None),
+            ('administrador-list', 'get', url('administrador-list'), None),
+            ('administrador-detail', 'get', url('administrador-detail', self.administrador.pk), None),
+            ('ecoladrillo-list', 'get', url('ecoladrillo-list'), None),
+            ('ecoladrillo-detail', 'get', url('ecoladrillo-detail', ecoladrillo.pk), None),
+            ('ecoladrillo-create', 'post', url('ecoladrillo-list'), {
+                'nombre': 'Nuevo', 'descripcion': 'prueba', 'material_principal': material.pk,
+            }),
+            ('ecoladrillo-update', 'patch', url('ecoladrillo-detail', ecoladrillo.pk), {'descripcion': 'editado'}),
+            ('ecoladrillo-stock-bajo', 'get', url('ecoladrillo-stock-bajo'), None),
+            ('ecoladrillo-stock-disponible', 'get', url('ecoladrillo-stock-disponible', ecoladrillo.pk), None),
+            ('ecoladrillo-reporte-stock', 'get', url('ecoladrillo-reporte-stock'), None),
+            ('material-list', 'get', url('material-list'), None),
+            ('material-detail', 'get', url('material-detail', material.pk), None),
+            ('material-create', 'post', url('material-list'), {
+                'nombre': 'Nuevo', 'tipo': 'papel', 'cantidad_disponible': 10, 'unidad_medida': 'kg',
+            }),
+            ('material-por-tipo', 'get', url('material-por-tipo') + '?tipo=vidrio', None),
+            ('material-stock-disponible', 'get', url('material-stock-disponible'), None),
+            ('material-reporte-stock', 'get', url('material-reporte-stock'), None),
+            ('registro-ecoladrillo-list', 'get', url('registro-ecoladrillo-list'), None),
+            ('registro-ecoladrillo-detail', 'get', url('registro-ecoladrillo-detail', registro.pk), None),
+            ('registro-ecoladrillo-create', 'post', url('registro-ecoladrillo-list'), {
+                'fecha': fecha_movimiento, 'ecoladrillo': ecoladrillo.pk, 'cantidad': 1,
+            }),
+            ('registro-ecoladrillo-lote', 'post', url('registro-ecoladrillo-list'), [
+                {'fecha': fecha_movimiento, 'ecoladrillo': otro.pk, 'cantidad': 1}
+                for otro in self.inventario.ecoladrillos[:2]
+            ]),
+            ('registro-ecoladrillo-por-fecha', 'get', url('registro-ecoladrillo-por-fecha') + f'?{rango}', None),
+            ('registro-ecoladrillo-exportar', 'get', url('registro-ecoladrillo-exportar'), None),
+            ('registro-ecoladrillo-series', 'get', url('registro-ecoladrillo-series') + f'?granularidad=semana&{rango}', None),
+            ('retiro-ecoladrillo-list', 'get', url('retiro-ecoladrillo-list'), None),
+            ('retiro-ecoladrillo-detail', 'get', url('retiro-ecoladrillo-detail', retiro.pk), None),
+            ('retiro-ecoladrillo-create', 'post', url('retiro-ecoladrillo-list'), {
+                'fecha': fecha_movimiento, 'ecoladrillo': ecoladrillo.pk, 'cantidad': 1, 'motivo': 'Venta',
+            }),
+            ('retiro-ecoladrillo-por-fecha', 'get', url('retiro-ecoladrillo-por-fecha') + f'?{rango}', None),
+            ('retiro-ecoladrillo-por-ecoladrillo', 'get',
+             url('retiro-ecoladrillo-por-ecoladrillo') + f'?ecoladrillo_id={ecoladrillo.pk}', None),
+            ('retiro-ecoladrillo-exportar', 'get', url('retiro-ecoladrillo-exportar') + '?formato=ndjson', None),
+            ('retiro-ecoladrillo-series', 'get', url('retiro-ecoladrillo-series') + f'?granularidad=mes&{rango}', None),
+            ('registro-material-list', 'get', url('registro-material-list'), None),
+            ('registro-material-detail', 'get', url('registro-material-detail', registro_material.pk), None),
+            ('registro-material-create', 'post', url('registro-material-list'), {
+                'fecha': fecha_movimiento, 'cantidad': 10, 'material': material.pk, 'origen': 'Compra',
+            }),
+            ('registro-material-exportar', 'get', url('registro-material-exportar'), None),
+            ('registro-material-importar', 'multipart', url('registro-material-importar'), {
+                'archivo': SimpleUploadedFile(
+                    'ingresos.csv', f'fecha,cantidad,material\n{fecha_movimiento},5,{material.pk}\n'.encode()
+                ),
+            }),
+            ('reporte-list', 'get', url('reporte-list'), None),
+            ('reporte-detail', 'get', url('reporte-detail', reportes['stock_fecha'].pk), None),
+            ('reporte-historial', 'get', url('reporte-historial') + '?completo=true', None),
+            ('reporte-ver-datos', 'get', url('reporte-ver-datos', reportes['resumen_retiros'].pk), None),
+            ('reporte-obtener-con-serializer-especifico', 'get',
+             url('reporte-obtener-con-serializer-especifico', reportes['resumen_inventario'].pk), None),
+            ('reporte-estadisticas-cache', 'get', url('reporte-estadisticas-cache'), None),
+            ('reporte-operarios-disponibles', 'get', url('reporte-operarios-disponibles'), None),
+            ('reporte-stock-en-fechas', 'get', url('reporte-stock-en-fechas') + '?fechas=' + ','.join(
+                str(FECHA_BASE + timedelta(days=dia)) for dia in range(0, self.inventario.dias, 3)
+            ), None),
+            ('reporte-generar-stock-fecha', 'post', url('reporte-generar-stock-fecha'), {
+                'fecha': fecha_movimiento, 'operario_id': self.inventario.operario.pk,
+            }),
+            ('reporte-generar-resumen-inventario', 'post', url('reporte-generar-resumen-inventario'), {
+                'operario_id': self.inventario.operario.pk,
+            }),
+            ('reporte-generar-resumen-retiros', 'post', url('reporte-generar-resumen-retiros'), {
+                'fecha_inicio': str(FECHA_BASE), 'fecha_fin': str(FECHA_BASE + timedelta(days=self.inventario.dias)),
+            }),
+            ('reporte-generar-asincrono', 'post', url('reporte-generar-resumen-inventario'), {'asincrono': True}),
+            ('reporte-stock-fecha-list', 'get', url('reporte-stock-fecha-list'), None),
+            ('reporte-stock-fecha-detail', 'get', url('reporte-stock-fecha-detail', reportes['stock_fecha'].pk), None),
+            ('reporte-resumen-inventario-list', 'get', url('reporte-resumen-inventario-list'), None),
+            ('reporte-resumen-inventario-detail', 'get',
+             url('reporte-resumen-inventario-detail', reportes['resumen_inventario'].pk), None),
+            ('reporte-resumen-retiros-list', 'get', url('reporte-resumen-retiros-list'), None),
+            ('reporte-resumen-retiros-detail', 'get',
+             url('reporte-resumen-retiros-detail', reportes['resumen_retiros'].pk), None),
+            ('trabajo-reporte-list', 'get', url('trabajo-reporte-list'), None),
+            ('trabajo-reporte-detail', 'get', url('trabajo-reporte-detail', trabajo.pk), None),
+        ]
+
+    def _medir(self, metodo, url, datos):
+        """Consultas de una petición con las cachés vacías; también consume las respuestas por partes"""
+        cache_reportes.limpiar()
+        cache_conteos.limpiar()
+        cache_render_reportes.limpiar()
+        # Los aumentos de versión que corren después del commit también cuentan
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            if metodo == 'get':
+                respuesta = self.client.get(url)
+            elif metodo == 'multipart':
+                respuesta = self.client.post(url, datos)
+            else:
+                respuesta = getattr(self.client, metodo)(url, datos, content_type='application/json')
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        self.assertLess(respuesta.status_code, 300, f'{metodo.upper()} {url}: {respuesta.status_code}')
+        return _contar_consultas(consultas)
+
+    def _medir_todo(self):
+        mediciones = {}
+        for nombre, metodo, url, datos in self._peticiones():
+            mediciones[nombre] = self._medir(metodo, url, datos)
+        return mediciones
+
+    def _preparar(self):
+        """Reportes y un trabajo en cola, para que los endpoints de detalle tengan qué mostrar"""
+        for accion, datos in (
+            ('generar_stock_fecha', {'fecha': str(FECHA_BASE)}),
+            ('generar_resumen_inventario', {}),
+            ('generar_resumen_retiros', {'fecha_inicio': str(FECHA_BASE)}),
+        ):
+            self.client.post(f'/api/v1/reportes/{accion}/', datos, content_type='application/json')
+        TrabajoReporte.objects.create(tipo_reporte='resumen_inventario')
+
+    def test_todos_los_endpoints_del_router_tienen_limite(self):
+        self._preparar()
+        cubiertos = {nombre.rsplit('-', 1)[0] if nombre.endswith(('-create', '-update', '-lote', '-asincrono'))
+                     else nombre for nombre, *_ in self._peticiones()}
+        cubiertos |= {'reporte-generar-stock-fecha', 'reporte-generar-resumen-inventario'}
+        rutas = {ruta.name for ruta in router.get_urls() if ruta.name}
+        faltantes = {ruta for ruta in rutas if ruta not in cubiertos and f'{ruta}-list' not in cubiertos}
+        self.assertFalse(faltantes, f'Endpoints sin prueba de consultas: {sorted(faltantes)}')
+        self.assertEqual({nombre for nombre, *_ in self._peticiones()}, set(LIMITES_CONSULTAS))
+
+    def test_consultas_no_dependen_del_tamano_del_inventario(self):
+        self._preparar()
+        chico = self._medir_todo()
+
+        self.inventario.crecer(6)
+        self._preparar()
+        grande = self._medir_todo()
+
+        for nombre, limite in LIMITES_CONSULTAS.items():
+            with self.subTest(endpoint=nombre):
+                self.assertEqual(grande[nombre], chico[nombre],
+                                 f'{nombre}: {chico[nombre]} consultas con el inventario chico, {grande[nombre]} con el grande')
+                self.assertLessEqual(grande[nombre], limite)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Los planes se revisan con EXPLAIN QUERY PLAN de SQLite')
+class PlanesDeConsultaTests(TestCase):
+    """Los filtros por rango de fechas y por clave foránea se resuelven con índices"""
+
+    # Tablas que pueden crecer sin límite: nunca se recorren completas al filtrar
+    TABLAS_GRANDES = (
+        'Inventario_registroecoladrillo', 'Inventario_retiroecoladrillo', 'Inventario_registromaterial',
+        'Inventario_movimientodiarioecoladrillo', 'Inventario_movimientodiariomaterial',
+        'Inventario_reporte', 'Inventario_trabajoreporte',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.inventario = InventarioDePrueba()
+        cls.inventario.crecer(2)
+        cls.inventario.agregar_volumen(5000)
+        # Con estadísticas el planificador elige como en una base en uso; con tablas chicas
+        # o sin ANALYZE puede preferir otro plan y la prueba no mostraría la regresión
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _planes(self, url):
+        """Planes de las consultas SELECT que hace una petición, con la SQL de cada una"""
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        self.assertEqual(respuesta.status_code, 200, url)
+        planes = []
+        with connection.cursor() as cursor:
+            for consulta in consultas.captured_queries:
+                if consulta['sql'].startswith('SELECT'):
+                    cursor.execute('EXPLAIN QUERY PLAN ' + consulta['sql'])
+                    planes.append((consulta['sql'], '\n'.join(fila[-1] for fila in cursor.fetchall())))
+        return planes
+
+    def _assert_usa_indices(self, url, indices_esperados=(), ordena_en_indice=True):
+        planes = self._planes(url)
+        texto = '\n'.join(plan for _, plan in planes)
+        for sql, plan in planes:
+            # Una consulta con filtro no recorre completa una tabla grande, ni siquiera por un
+            # índice: SCAN ... USING INDEX lee todas las entradas hasta llegar al rango pedido
+            if ' WHERE ' in sql:
+                for tabla in self.TABLAS_GRANDES:
+                    self.assertNotRegex(plan, rf'SCAN {tabla}\b', f'{url}\n{sql}\n{plan}')
+            if ordena_en_indice:
+                self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan, f'{url}\n{sql}\n{plan}')
+                self.assertNotIn('TEMP B-TREE FOR RIGHT PART OF ORDER BY', plan, f'{url}\n{sql}\n{plan}')
+        for indice in indices_esperados:
+            self.assertIn(indice, texto, f'{url} no usa {indice}:\n{texto}')
+
+    def _pagina_siguiente(self, url):
+        siguiente = self.client.get(url).json()['next']
+        self.assertIsNotNone(siguiente)
+        return siguiente
+
+    def test_historial_de_movimientos_por_rango_de_fechas(self):
+        rango = f'fecha_inicio={FECHA_BASE + timedelta(days=2)}&fecha_fin={FECHA_BASE + timedelta(days=9)}'
+        self._assert_usa_indices(f'/api/v1/registros-ecoladrillo/por_fecha/?{rango}', ['registro_eco_fecha_id_idx'])
+        self._assert_usa_indices(f'/api/v1/retiros-ecoladrillo/por_fecha/?{rango}', ['retiro_eco_fecha_id_idx'])
+
+    def test_paginas_siguientes_recorren_el_indice_fecha_id(self):
+        for modelo, url, indice in (
+            (RegistroEcoladrillo, '/api/v1/registros-ecoladrillo/?page_size=5', 'registro_eco_fecha_id_idx'),
+            (RetiroEcoladrillo, '/api/v1/retiros-ecoladrillo/?page_size=5', 'retiro_eco_fecha_id_idx'),
+            (RegistroMaterial, '/api/v1/registros-material/?page_size=5', 'registro_mat_fecha_id_idx'),
+        ):
+            with self.subTest(url=url):
+                siguiente = self._pagina_siguiente(url)
+                self._assert_usa_indices(siguiente, [indice])
+                anterior = self.client.get(siguiente).json()['previous']
+                self._assert_usa_indices(anterior, [indice])
+
+                # Una página a mitad del historial: el plan no puede depender de la posición
+                medio = modelo.objects.order_by('-fecha', '-pk')[modelo.objects.count() // 2]
+                for atras in ('0', '1'):
+                    cursor = base64.urlsafe_b64encode(f'{medio.fecha}|{medio.pk}|{atras}'.encode()).decode()
+                    self._assert_usa_indices(f'{url}&cursor={cursor}', [indice])
+
+    def test_retiros_por_ecoladrillo(self):
+        ecoladrillo = self.inventario.ecoladrillos[0]
+        url = f'/api/v1/retiros-ecoladrillo/por_ecoladrillo/?ecoladrillo_id={ecoladrillo.pk}&page_size=3'
+        self._assert_usa_indices(url, ['retiro_eco_item_fecha_idx'])
+        self._assert_usa_indices(self._pagina_siguiente(url), ['retiro_eco_item_fecha_idx'])
+
+    def test_exportacion_por_rango_de_fechas(self):
+        rango = f'fecha_inicio={FECHA_BASE + timedelta(days=2)}&fecha_fin={FECHA_BASE + timedelta(days=9)}'
+        self._assert_usa_indices(f'/api/v1/registros-material/exportar/?{rango}', ['registro_mat_fecha_id_idx'])
+
+    def test_series_usan_el_resumen_diario(self):
+        ecoladrillo = self.inventario.ecoladrillos[0]
+        rango = f'fecha_inicio={FECHA_BASE}&fecha_fin={FECHA_BASE + timedelta(days=9)}'
+        # Las series agrupan por periodo, así que el orden se resuelve con un B-tree temporal chico
+        self._assert_usa_indices(f'/api/v1/registros-ecoladrillo/series/?{rango}', ordena_en_indice=False)
+        self._assert_usa_indices(
+            f'/api/v1/retiros-ecoladrillo/series/?{rango}&ecoladrillo={ecoladrillo.pk}', ordena_en_indice=False
+        )
+
+    def test_historial_de_reportes_filtrado(self):
+        for accion in ('generar_stock_fecha', 'generar_resumen_inventario'):
+            self.client.post(f'/api/v1/reportes/{accion}/', {'fecha': str(FECHA_BASE)}, content_type='application/json')
+        operario = self.inventario.operario.pk
+        self._assert_usa_indices('/api/v1/reportes/historial/?tipo=stock_fecha&fecha_desde=2025-01-01',
+                                 ['reporte_tipo_fecha_idx'])
+        self._assert_usa_indices(f'/api/v1/reportes/historial/?operario={operario}', ['reporte_operario_fecha_idx'])
+
+    def test_cola_de_trabajos_por_estado(self):
+        # La consulta con la que cada procesador busca el próximo trabajo de la cola
+        plan = (
+            TrabajoReporte.objects.filter(estado='pendiente').order_by('id_trabajo')
+            .values_list('id_trabajo', flat=True)[:1].explain()
+        )
+        self.assertIn('trabajo_reporte_estado_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_filtros_por_clave_foranea(self):
+        ecoladrillo = self.inventario.ecoladrillos[0]
+        material = self.inventario.materiales[0]
+        for queryset in (
+            RegistroEcoladrillo.objects.filter(ecoladrillo=ecoladrillo),
+            RetiroEcoladrillo.objects.filter(ecoladrillo=ecoladrillo),
+            RegistroMaterial.objects.filter(material=material),
+            Ecoladrillo.objects.filter(material_principal=material),
+            ecoladrillo.movimientos_diarios.filter(fecha__gte=FECHA_BASE),
+        ):
+            with self.subTest(tabla=queryset.model._meta.db_table):
+                plan = queryset.explain()
+                self.assertRegex(plan, r'SEARCH \S+ USING (COVERING )?INDEX', plan)
+                self.assertNotIn('SCAN', plan)
+
+
+class StockHistoricoTests(TestCase):
+    """
+    El stock en una fecha coincide con reproducir los movimientos guardados hasta esa fecha,
+    también después de registrar en fechas pasadas y de editar o borrar movimientos
+    """
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.inicio = self.hoy - timedelta(days=10)
+        self.material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=0, unidad_medida='kg')
+        self.ecoladrillo = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='prueba', material_principal=self.material, cantidad_material_requerida=2
+        )
+        RegistroMaterial(fecha=self.inicio, material=self.material, cantidad=1000, origen='Compra').save()
+        self.registro = RegistroEcoladrillo(fecha=self.dia(2), ecoladrillo=self.ecoladrillo, cantidad=10)
+        self.registro.save()
+        RetiroEcoladrillo(fecha=self.dia(5), ecoladrillo=self.ecoladrillo, cantidad=3, motivo='Venta').save()
+        guardar_stock_diario(self.inicio, self.hoy - timedelta(days=1))
+
+    def dia(self, n):
+        return self.inicio + timedelta(days=n)
+
+    def _reproducir(self, fecha):
+        """Stock al cierre de la fecha sumando los movimientos guardados desde cero"""
+        def suma(queryset, expresion=F('cantidad')):
+            return queryset.filter(fecha__lte=fecha).aggregate(total=Sum(expresion, default=0))['total']
+
+        ecoladrillo = (
+            suma(RegistroEcoladrillo.objects.filter(ecoladrillo=self.ecoladrillo))
+            - suma(RetiroEcoladrillo.objects.filter(ecoladrillo=self.ecoladrillo))
+        )
+        material = (
+            suma(RegistroMaterial.objects.filter(material=self.material))
+            - suma(RegistroEcoladrillo.objects.filter(ecoladrillo__material_principal=self.material),
+                   F('cantidad') * F('ecoladrillo__cantidad_material_requerida'))
+        )
+        return ecoladrillo, material
+
+    def assertHistoriaCoherente(self):
+        fechas = [self.dia(n) for n in range(-1, 11)]
+        ecoladrillos = stock_ecoladrillos_en_fechas(fechas)
+        materiales = stock_materiales_en_fechas(fechas)
+        for fecha in fechas:
+            with self.subTest(fecha=fecha):
+                self.assertEqual(
+                    (ecoladrillos[fecha][self.ecoladrillo.pk], materiales[fecha][self.material.pk]),
+                    self._reproducir(fecha)
+                )
+        self.ecoladrillo.refresh_from_db()
+        self.material.refresh_from_db()
+        self.assertEqual((self.ecoladrillo.cantidad, self.material.cantidad_disponible), self._reproducir(self.hoy))
+
+    def test_registros_en_fechas_pasadas(self):
+        respuesta = self.client.post('/api/v1/registros-ecoladrillo/', {
+            'fecha': str(self.dia(1)), 'ecoladrillo': self.ecoladrillo.pk, 'cantidad': 4
+        }, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.client.post('/api/v1/retiros-ecoladrillo/', {
+            'fecha': str(self.dia(3)), 'ecoladrillo': self.ecoladrillo.pk, 'cantidad': 2, 'motivo': 'Venta'
+        }, content_type='application/json')
+        self.client.post('/api/v1/registros-material/', {
+            'fecha': str(self.dia(4)), 'material': self.material.pk, 'cantidad': 50
+        }, content_type='application/json')
+        self.assertHistoriaCoherente()
+
+    def test_editar_movimientos(self):
+        respuesta = self.client.patch(
+            f'/api/v1/registros-ecoladrillo/{self.registro.pk}/', {'cantidad': 20}, content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        respuesta = self.client.get(f'/api/v1/reportes/stock_en_fechas/?fechas={self.dia(2)},{self.dia(6)}')
+        self.assertEqual([fecha['ecoladrillos'][str(self.ecoladrillo.pk)] for fecha in respuesta.json()['stock']], [20, 17])
+        self.assertHistoriaCoherente()
+
+        # Cambiar la fecha y el item de un movimiento mueve sus efectos
+        retiro = RetiroEcoladrillo.objects.get()
+        self.client.patch(f'/api/v1/retiros-ecoladrillo/{retiro.pk}/', {'fecha': str(self.dia(8))}, content_type='application/json')
+        otro = Material.objects.create(nombre='Vidrio', tipo='vidrio', cantidad_disponible=0, unidad_medida='kg')
+        registro_material = RegistroMaterial.objects.get()
+        respuesta = self.client.patch(
+            f'/api/v1/registros-material/{registro_material.pk}/', {'cantidad': 900}, content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        RegistroMaterial(fecha=self.dia(1), material=otro, cantidad=5).save()
+        self.assertHistoriaCoherente()
+
+    def test_borrar_movimientos(self):
+        retiro = RetiroEcoladrillo.objects.get()
+        self.assertEqual(self.client.delete(f'/api/v1/retiros-ecoladrillo/{retiro.pk}/').status_code, 204)
+        self.assertHistoriaCoherente()
+        self.assertEqual(self.client.delete(f'/api/v1/registros-ecoladrillo/{self.registro.pk}/').status_code, 204)
+        self.assertHistoriaCoherente()
+        self.assertEqual(self.ecoladrillo.cantidad, 0)
+        self.assertEqual(self.material.cantidad_disponible, 1000)
+
+    def test_cambio_que_deja_stock_negativo_no_modifica_nada(self):
+        antes = (
+            list(StockDiarioEcoladrillo.objects.order_by('fecha').values_list('cantidad', flat=True)),
+            list(MovimientoDiarioEcoladrillo.objects.exclude(producido=0, retirado=0).order_by('fecha').values_list('producido', 'retirado')),
+        )
+        # Quedan 7 ecoladrillos: borrar la producción de 10 o bajarla a 2 dejaría el stock negativo
+        respuesta = self.client.delete(f'/api/v1/registros-ecoladrillo/{self.registro.pk}/')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('No hay suficiente stock de Verde', respuesta.json()['error'])
+        RetiroEcoladrillo(fecha=self.dia(6), ecoladrillo=self.ecoladrillo, cantidad=7, motivo='Venta').save()
+        respuesta = self.client.patch(
+            f'/api/v1/registros-ecoladrillo/{self.registro.pk}/', {'cantidad': 2}, content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(RegistroEcoladrillo.objects.get().cantidad, 10)
+        RetiroEcoladrillo.objects.filter(cantidad=7).get().delete()
+        self.assertEqual(antes, (
+            list(StockDiarioEcoladrillo.objects.order_by('fecha').values_list('cantidad', flat=True)),
+            list(MovimientoDiarioEcoladrillo.objects.exclude(producido=0, retirado=0).order_by('fecha').values_list('producido', 'retirado')),
+        ))
+        self.assertHistoriaCoherente()
+
+    def test_recalcular_puntos_de_control_existentes(self):
+        # Se borran y se vuelven a crear (sin update_conflicts, que MySQL no admite con unique_fields)
+        por_dia = StockDiarioEcoladrillo.objects.filter(fecha=self.dia(6)).count()
+        StockDiarioEcoladrillo.objects.filter(fecha__gt=self.dia(3)).update(cantidad=999)
+        guardar_stock_diario(self.dia(3), self.hoy - timedelta(days=1))
+        self.assertEqual(StockDiarioEcoladrillo.objects.filter(fecha=self.dia(6)).count(), por_dia)
+        self.assertFalse(StockDiarioEcoladrillo.objects.filter(cantidad=999).exists())
+        self.assertHistoriaCoherente()
+
+
+
+class StockCondicionalTests(TestCase):
+    """Los descuentos se validan en el mismo UPDATE que cambia el stock"""
+
+    def setUp(self):
+        self.material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=10, unidad_medida='kg')
+        self.ecoladrillo = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='prueba', material_principal=self.material,
+            cantidad_material_requerida=2, cantidad=3
+        )
+
+    def test_retiro_sin_stock_no_guarda_nada(self):
+        # La instancia en memoria dice que hay stock, la base de datos no
+        Ecoladrillo.objects.filter(pk=self.ecoladrillo.pk).update(cantidad=1)
+        with self.assertRaisesMessage(ValueError, 'No hay suficientes ecoladrillos disponibles'):
+            RetiroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.ecoladrillo, cantidad=2, motivo='Venta').save()
+        self.assertFalse(RetiroEcoladrillo.objects.exists())
+        self.ecoladrillo.refresh_from_db()
+        self.assertEqual(self.ecoladrillo.cantidad, 1)
+
+    def test_registro_sin_material_no_guarda_nada(self):
+        with self.assertRaisesMessage(ValueError, 'No hay suficiente PET disponible'):
+            RegistroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.ecoladrillo, cantidad=6).save()
+        self.assertFalse(RegistroEcoladrillo.objects.exists())
+        self.ecoladrillo.refresh_from_db()
+        self.material.refresh_from_db()
+        self.assertEqual((self.ecoladrillo.cantidad, self.material.cantidad_disponible), (3, 10))
+
+    def test_agregar_stock_lote_con_material_inexistente_no_cambia_nada(self):
+        with self.assertRaisesMessage(ValueError, 'Alguno de los materiales no existe'):
+            Material.agregar_stock_lote({self.material.pk: 5, self.material.pk + 1: 5})
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.cantidad_disponible, 10)
+        Material.agregar_stock_lote({self.material.pk: 5})
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.cantidad_disponible, 15)
+
+
+class LoteRegistrosTests(TestCase):
+    """Un lote de producción se guarda completo o no se guarda nada"""
+
+    def setUp(self):
+        self.pet = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=100, unidad_medida='kg')
+        self.vidrio = Material.objects.create(nombre='Vidrio', tipo='vidrio', cantidad_disponible=100, unidad_medida='kg')
+        self.verde = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='prueba', material_principal=self.pet, cantidad_material_requerida=2
+        )
+        self.azul = Ecoladrillo.objects.create(
+            nombre='Azul', descripcion='prueba', material_principal=self.vidrio, cantidad_material_requerida=5
+        )
+
+    def registrar(self, lineas):
+        return self.client.post('/api/v1/registros-ecoladrillo/', lineas, content_type='application/json')
+
+    def assertStock(self, verde, azul, pet, vidrio):
+        self.assertEqual(
+            [Ecoladrillo.objects.get(pk=e.pk).cantidad for e in (self.verde, self.azul)]
+            + [Material.objects.get(pk=m.pk).cantidad_disponible for m in (self.pet, self.vidrio)],
+            [verde, azul, pet, vidrio]
+        )
+
+    def test_lote_valido_actualiza_stock_y_resumen(self):
+        respuesta = self.registrar([
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.verde.pk, 'cantidad': 10},
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.verde.pk, 'cantidad': 5},
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.azul.pk, 'cantidad': 4},
+        ])
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual([registro['cantidad'] for registro in respuesta.json()], [10, 5, 4])
+        self.assertEqual(RegistroEcoladrillo.objects.count(), 3)
+        self.assertStock(verde=15, azul=4, pet=70, vidrio=80)
+        self.assertEqual(
+            MovimientoDiarioEcoladrillo.objects.get(ecoladrillo=self.verde, fecha=FECHA_BASE).producido, 15
+        )
+
+    def test_material_sumado_del_lote_no_alcanza(self):
+        # Cada línea alcanza por separado, las dos juntas no (60 kg de PET contra 100)
+        respuesta = self.registrar([
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.azul.pk, 'cantidad': 1},
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.verde.pk, 'cantidad': 30},
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.verde.pk, 'cantidad': 30},
+        ])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([linea['linea'] for linea in respuesta.json()['errores_por_linea']], [2, 3])
+        self.assertIn('Necesario: 120 kg, Disponible: 100 kg', respuesta.json()['errores'][0])
+        self.assertFalse(RegistroEcoladrillo.objects.exists())
+        self.assertStock(verde=0, azul=0, pet=100, vidrio=100)
+
+    def test_errores_de_formato_y_de_ecoladrillo_por_linea(self):
+        respuesta = self.registrar([
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.verde.pk, 'cantidad': 1},
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.verde.pk, 'cantidad': 0},
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.verde.pk + 99, 'cantidad': 1},
+        ])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(
+            [linea['linea'] for linea in respuesta.json()['errores_por_linea']], [2]
+        )
+        respuesta = self.registrar([
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.verde.pk, 'cantidad': 1},
+            {'fecha': str(FECHA_BASE), 'ecoladrillo': self.verde.pk + 99, 'cantidad': 1},
+        ])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['errores'], [f'Línea 2: ecoladrillo: No existe un ecoladrillo con ID {self.verde.pk + 99}'])
+        self.assertEqual(self.registrar([]).json()['error'], 'El lote no tiene líneas')
+        self.assertFalse(RegistroEcoladrillo.objects.exists())
+        self.assertStock(verde=0, azul=0, pet=100, vidrio=100)
+
+    def test_stock_que_cambia_despues_de_validar_revierte_el_lote(self):
+        registros = [
+            RegistroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.azul, cantidad=2),
+            RegistroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.verde, cantidad=30),
+        ]
+        # Otro operario consumió el PET entre la validación y el guardado
+        Material.objects.filter(pk=self.pet.pk).update(cantidad_disponible=50)
+        with self.assertRaisesMessage(ValueError, 'No hay suficiente PET disponible'):
+            RegistroEcoladrillo.registrar_lote(registros)
+        self.assertFalse(RegistroEcoladrillo.objects.exists())
+        self.assertFalse(MovimientoDiarioEcoladrillo.objects.exists())
+        self.assertStock(verde=0, azul=0, pet=50, vidrio=100)
+
+
+class LoteRetirosTests(TestCase):
+    """Un lote de retiros se guarda completo o no se guarda nada"""
+
+    def setUp(self):
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=0, unidad_medida='kg')
+        self.verde = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='prueba', material_principal=material, cantidad_material_requerida=1, cantidad=20
+        )
+        self.azul = Ecoladrillo.objects.create(
+            nombre='Azul', descripcion='prueba', material_principal=material, cantidad_material_requerida=1, cantidad=5
+        )
+
+    def retirar(self, lineas):
+        return self.client.post('/api/v1/retiros-ecoladrillo/', lineas, content_type='application/json')
+
+    def linea(self, ecoladrillo, cantidad):
+        return {'fecha': str(FECHA_BASE), 'ecoladrillo': ecoladrillo.pk, 'cantidad': cantidad, 'motivo': 'Despacho'}
+
+    def assertStock(self, verde, azul):
+        self.assertEqual(
+            [Ecoladrillo.objects.get(pk=e.pk).cantidad for e in (self.verde, self.azul)], [verde, azul]
+        )
+
+    def test_lote_valido_descuenta_la_demanda_sumada(self):
+        respuesta = self.retirar([self.linea(self.verde, 12), self.linea(self.azul, 5), self.linea(self.verde, 8)])
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(RetiroEcoladrillo.objects.count(), 3)
+        self.assertStock(verde=0, azul=0)
+        self.assertEqual(
+            MovimientoDiarioEcoladrillo.objects.get(ecoladrillo=self.verde, fecha=FECHA_BASE).retirado, 20
+        )
+
+    def test_demanda_sumada_que_no_alcanza_rechaza_todo(self):
+        respuesta = self.retirar([self.linea(self.verde, 12), self.linea(self.azul, 1), self.linea(self.verde, 9)])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([linea['linea'] for linea in respuesta.json()['errores_por_linea']], [1, 3])
+        self.assertIn('Necesario: 21, Stock actual: 20', respuesta.json()['errores'][0])
+        self.assertFalse(RetiroEcoladrillo.objects.exists())
+        self.assertStock(verde=20, azul=5)
+
+    def test_errores_de_formato_por_linea(self):
+        sin_motivo = self.linea(self.azul, 1)
+        del sin_motivo['motivo']
+        respuesta = self.retirar([self.linea(self.verde, 1), sin_motivo, self.linea(self.verde, -1)])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([linea['linea'] for linea in respuesta.json()['errores_por_linea']], [2, 3])
+        self.assertFalse(RetiroEcoladrillo.objects.exists())
+        self.assertStock(verde=20, azul=5)
+
+    def test_stock_que_cambia_despues_de_validar_revierte_el_lote(self):
+        retiros = [
+            RetiroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.verde, cantidad=10, motivo='Despacho'),
+            RetiroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.azul, cantidad=5, motivo='Despacho'),
+        ]
+        Ecoladrillo.objects.filter(pk=self.azul.pk).update(cantidad=4)
+        with self.assertRaisesMessage(ValueError, 'Azul'):
+            RetiroEcoladrillo.registrar_lote(retiros)
+        self.assertFalse(RetiroEcoladrillo.objects.exists())
+        self.assertFalse(MovimientoDiarioEcoladrillo.objects.exists())
+        self.assertStock(verde=20, azul=4)
+
+
+class ImportacionMaterialTests(TestCase):
+    """La importación de ingresos desde CSV es todo o nada"""
+
+    def setUp(self):
+        self.pet = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=10, unidad_medida='kg')
+        self.vidrio = Material.objects.create(nombre='Vidrio', tipo='vidrio', cantidad_disponible=0, unidad_medida='kg')
+
+    def csv(self, *filas):
+        return io.StringIO('\n'.join(('fecha,cantidad,material,origen',) + filas) + '\n')
+
+    def test_importacion_valida_suma_por_material(self):
+        resumen = importar_registros_material(self.csv(
+            f'{FECHA_BASE},5,PET,Compra',
+            f'{FECHA_BASE},7,{self.vidrio.pk},',
+            f'{FECHA_BASE},3,pet,Donación',
+        ), tamano_bloque=2)
+        self.assertEqual(resumen, {
+            'registros_importados': 3, 'materiales_actualizados': 2, 'total_errores': 0, 'errores': []
+        })
+        self.pet.refresh_from_db()
+        self.vidrio.refresh_from_db()
+        self.assertEqual((self.pet.cantidad_disponible, self.vidrio.cantidad_disponible), (18, 7))
+        self.assertEqual(MovimientoDiarioMaterial.objects.get(material=self.pet, fecha=FECHA_BASE).recibido, 8)
+
+    def test_fila_invalida_revierte_los_bloques_ya_insertados(self):
+        # Con bloques de 2 las primeras filas ya se insertaron cuando aparece el error
+        resumen = importar_registros_material(self.csv(
+            f'{FECHA_BASE},5,PET,',
+            f'{FECHA_BASE},5,PET,',
+            f'{FECHA_BASE},5,PET,',
+            f'{FECHA_BASE},0,PET,',
+            '2025-13-01,5,PET,',
+            f'{FECHA_BASE},5,Cartón,',
+        ), tamano_bloque=2)
+        self.assertEqual(resumen['registros_importados'], 0)
+        self.assertEqual(resumen['total_errores'], 3)
+        self.assertEqual(resumen['errores'], [
+            'Línea 5: cantidad: Debe ser mayor a cero',
+            'Línea 6: fecha: Formato de fecha inválido. Use YYYY-MM-DD',
+            "Línea 7: material: No existe un material con ID o nombre 'Cartón'",
+        ])
+        self.assertFalse(RegistroMaterial.objects.exists())
+        self.assertFalse(MovimientoDiarioMaterial.objects.exists())
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.cantidad_disponible, 10)
+
+    def test_endpoint(self):
+        def subir(contenido):
+            archivo = SimpleUploadedFile('ingresos.csv', contenido, content_type='text/csv')
+            return self.client.post('/api/v1/registros-material/importar/', {'archivo': archivo})
+
+        respuesta = subir(f'fecha,cantidad,material\n{FECHA_BASE},4,PET\n{FECHA_BASE},x,PET\n'.encode())
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['errores'], ['Línea 3: cantidad: Debe ser un número entero'])
+        self.assertEqual(subir(b'fecha,cantidad\n').json()['error'], 'Faltan columnas en el archivo: material')
+        self.assertFalse(RegistroMaterial.objects.exists())
+
+        respuesta = subir(f'fecha,cantidad,material\n{FECHA_BASE},4,PET\n'.encode())
+        self.assertEqual(respuesta.status_code, 201)
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.cantidad_disponible, 14)
+
+
+class RecorrerPorBloquesTests(TestCase):
+    """El recorrido por bloques devuelve las mismas filas que una sola consulta ordenada"""
+
+    def test_bloques_con_fechas_repetidas(self):
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=0, unidad_medida='kg')
+        for dia in (3, 1, 1, 2, 1, 3, 2):
+            RegistroMaterial(fecha=FECHA_BASE + timedelta(days=dia), material=material, cantidad=dia).save()
+        filas = RegistroMaterial.objects.values('fecha', 'id_registro_material', 'cantidad')
+        esperado = list(filas.order_by('fecha', 'id_registro_material'))
+        for tamano in (1, 2, 3, 7, 100):
+            with self.subTest(tamano=tamano):
+                with CaptureQueriesContext(connection) as consultas:
+                    recorridas = list(recorrer_por_bloques(filas, ['fecha', 'id_registro_material'], tamano))
+                self.assertEqual(recorridas, esperado)
+                self.assertEqual(len(consultas.captured_queries), len(esperado) // tamano + 1)
+
+
+class CacheReportesTests(TestCase):
+    """La caché de generación de reportes sigue a la versión del inventario de cada tabla"""
+
+    def setUp(self):
+        cache_reportes.limpiar()
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=100, unidad_medida='kg')
+        self.ecoladrillo = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='prueba', material_principal=material, cantidad_material_requerida=1, cantidad=10
+        )
+
+    def generar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/v1/reportes/generar_resumen_inventario/', {}, content_type='application/json').json()
+
+    def test_reporte_borrado_se_genera_de_nuevo(self):
+        primero = self.generar()
+        self.assertTrue(self.generar()['desde_cache'])
+        Reporte.objects.filter(pk=primero['reporte_id']).delete()
+        segundo = self.generar()
+        self.assertFalse(segundo['desde_cache'])
+        self.assertNotEqual(segundo['reporte_id'], primero['reporte_id'])
+        self.assertTrue(Reporte.objects.filter(pk=segundo['reporte_id']).exists())
+
+    def test_un_cambio_invalida_la_cache(self):
+        self.generar()
+        with self.captureOnCommitCallbacks(execute=True):
+            RetiroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.ecoladrillo, cantidad=1, motivo='Venta').save()
+        self.assertFalse(self.generar()['desde_cache'])
+
+    def test_versiones_por_tabla_despues_del_commit(self):
+        antes = {tabla: VersionInventario.actual(tabla) for tabla in VersionInventario.TABLAS}
+        with self.captureOnCommitCallbacks() as pendientes:
+            RetiroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.ecoladrillo, cantidad=1, motivo='Venta').save()
+            # Dentro de la transacción los contadores no cambian
+            self.assertEqual(antes, {tabla: VersionInventario.actual(tabla) for tabla in VersionInventario.TABLAS})
+        for callback in pendientes:
+            callback()
+        despues = {tabla: VersionInventario.actual(tabla) for tabla in VersionInventario.TABLAS}
+        self.assertEqual(
+            {tabla for tabla in VersionInventario.TABLAS if despues[tabla] != antes[tabla]},
+            {'retiroecoladrillo', 'ecoladrillo'}
+        )
+
+    def test_cambio_revertido_no_aumenta_la_version(self):
+        antes = VersionInventario.actual()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                RetiroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.ecoladrillo, cantidad=50, motivo='Venta').save()
+        self.assertEqual(VersionInventario.actual(), antes)
+
+
+class ResumenDiarioTests(TestCase):
+    """El resumen diario coincide con la suma de los movimientos después de cada forma de escribirlos"""
+
+    def setUp(self):
+        self.pet = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=500, unidad_medida='kg')
+        self.vidrio = Material.objects.create(nombre='Vidrio', tipo='vidrio', cantidad_disponible=500, unidad_medida='kg')
+        self.verde = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='prueba', material_principal=self.pet, cantidad_material_requerida=2
+        )
+        self.azul = Ecoladrillo.objects.create(
+            nombre='Azul', descripcion='prueba', material_principal=self.vidrio, cantidad_material_requerida=3
+        )
+
+    def dia(self, n):
+        return FECHA_BASE + timedelta(days=n)
+
+    def _sumar(self, queryset, campo_item, campo, expresion=F('cantidad')):
+        filas = queryset.order_by().values(campo_item, 'fecha').annotate(total=Sum(expresion))
+        return {(fila[campo_item], fila['fecha'], campo): fila['total'] for fila in filas}
+
+    def _resumen(self, modelo):
+        """Filas del resumen como {(item, fecha, campo): cantidad}, sin los ceros"""
+        return {
+            (getattr(fila, f'{modelo.campo_item}_id'), fila.fecha, campo): getattr(fila, campo)
+            for fila in modelo.objects.all()
+            for campo in modelo.campos_cantidad
+            if getattr(fila, campo)
+        }
+
+    def assertResumenCoincide(self):
+        ecoladrillos = {
+            **self._sumar(RegistroEcoladrillo.objects.all(), 'ecoladrillo', 'producido'),
+            **self._sumar(RetiroEcoladrillo.objects.all(), 'ecoladrillo', 'retirado'),
+        }
+        materiales = {
+            **self._sumar(RegistroMaterial.objects.all(), 'material', 'recibido'),
+            **self._sumar(RegistroEcoladrillo.objects.all(), 'ecoladrillo__material_principal', 'consumido',
+                          F('cantidad') * F('ecoladrillo__cantidad_material_requerida')),
+        }
+        self.assertEqual(self._resumen(MovimientoDiarioEcoladrillo), ecoladrillos)
+        self.assertEqual(self._resumen(MovimientoDiarioMaterial), materiales)
+
+    def test_guardar_editar_y_borrar(self):
+        registro = RegistroEcoladrillo(fecha=self.dia(0), ecoladrillo=self.verde, cantidad=10)
+        registro.save()
+        RegistroEcoladrillo(fecha=self.dia(0), ecoladrillo=self.verde, cantidad=5).save()
+        retiro = RetiroEcoladrillo(fecha=self.dia(1), ecoladrillo=self.verde, cantidad=4, motivo='Venta')
+        retiro.save()
+        ingreso = RegistroMaterial(fecha=self.dia(1), material=self.pet, cantidad=30)
+        ingreso.save()
+        self.assertResumenCoincide()
+
+        # Cambiar cantidad, fecha e item mueve lo que aportaba cada movimiento
+        registro.cantidad = 12
+        registro.fecha = self.dia(2)
+        registro.ecoladrillo = self.azul
+        registro.save()
+        retiro.fecha = self.dia(3)
+        retiro.save()
+        ingreso.material = self.vidrio
+        ingreso.save()
+        self.assertResumenCoincide()
+
+        retiro.delete()
+        registro.delete()
+        ingreso.delete()
+        self.assertResumenCoincide()
+
+    def test_lotes_e_importacion(self):
+        respuesta = self.client.post('/api/v1/registros-ecoladrillo/', [
+            {'fecha': str(self.dia(0)), 'ecoladrillo': self.verde.pk, 'cantidad': 10},
+            {'fecha': str(self.dia(0)), 'ecoladrillo': self.verde.pk, 'cantidad': 3},
+            {'fecha': str(self.dia(1)), 'ecoladrillo': self.azul.pk, 'cantidad': 7},
+        ], content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        respuesta = self.client.post('/api/v1/retiros-ecoladrillo/', [
+            {'fecha': str(self.dia(1)), 'ecoladrillo': self.verde.pk, 'cantidad': 6, 'motivo': 'Despacho'},
+            {'fecha': str(self.dia(1)), 'ecoladrillo': self.azul.pk, 'cantidad': 2, 'motivo': 'Despacho'},
+        ], content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        importar_registros_material(io.StringIO(
+            f'fecha,cantidad,material\n{self.dia(0)},8,PET\n{self.dia(2)},9,Vidrio\n{self.dia(2)},1,PET\n'
+        ))
+        self.assertResumenCoincide()
+
+        # Un lote rechazado no deja nada en el resumen
+        self.client.post('/api/v1/retiros-ecoladrillo/', [
+            {'fecha': str(self.dia(4)), 'ecoladrillo': self.azul.pk, 'cantidad': 99, 'motivo': 'Despacho'},
+        ], content_type='application/json')
+        self.assertResumenCoincide()
+
+
+class SeriesTests(TestCase):
+    """Series de producción y retiros por periodo"""
+
+    def setUp(self):
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=100, unidad_medida='kg')
+        self.ecoladrillo = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='prueba', material_principal=material, cantidad_material_requerida=1
+        )
+        # FECHA_BASE es miércoles 1 de enero
+        for dias, cantidad in ((0, 5), (0, 2), (1, 3), (15, 4), (40, 6)):
+            RegistroEcoladrillo(fecha=FECHA_BASE + timedelta(days=dias), ecoladrillo=self.ecoladrillo, cantidad=cantidad).save()
+
+    def serie(self, **params):
+        return self.client.get('/api/v1/registros-ecoladrillo/series/', params)
+
+    def test_periodos_sin_movimientos_aparecen_en_cero(self):
+        datos = self.serie(granularidad='dia', fecha_inicio='2024-12-31', fecha_fin='2025-01-03').json()
+        self.assertEqual(
+            [(p['periodo'], p['cantidad']) for p in datos['serie']],
+            [('2024-12-31', 0), ('2025-01-01', 7), ('2025-01-02', 3), ('2025-01-03', 0)]
+        )
+        datos = self.serie(granularidad='semana', fecha_inicio='2025-01-01', fecha_fin='2025-01-20').json()
+        self.assertEqual(
+            [(p['periodo'], p['cantidad']) for p in datos['serie']],
+            [('2024-12-30', 10), ('2025-01-06', 0), ('2025-01-13', 4), ('2025-01-20', 0)]
+        )
+        datos = self.serie(granularity='month', fecha_inicio='2024-12-15', fecha_fin='2025-03-01').json()
+        self.assertEqual(
+            [(p['periodo'], p['cantidad']) for p in datos['serie']],
+            [('2024-12-01', 0), ('2025-01-01', 14), ('2025-02-01', 6), ('2025-03-01', 0)]
+        )
+        self.assertEqual(datos['total'], 20)
+
+    def test_rango_con_demasiados_periodos(self):
+        respuesta = self.serie(granularidad='dia', fecha_inicio='2020-01-01', fecha_fin='2025-01-01')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('máximo es 1000', respuesta.json()['error'])
+        self.assertEqual(self.serie(granularidad='semana', fecha_inicio='2020-01-01', fecha_fin='2025-01-01').status_code, 200)
+        self.assertEqual(self.serie(granularidad='anio').status_code, 400)
+
+
+class TrabajosReporteTests(TestCase):
+    """Cola de generación asíncrona: tomar, reintentar y abandonar trabajos"""
+
+    def setUp(self):
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=100, unidad_medida='kg')
+        Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='prueba', material_principal=material, cantidad_material_requerida=1, cantidad=4
+        )
+
+    def test_pedido_asincrono_y_procesamiento(self):
+        respuesta = self.client.post(
+            '/api/v1/reportes/generar_resumen_inventario/', {'asincrono': True}, content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 202)
+        trabajo_id = respuesta.json()['trabajo_id']
+        self.assertFalse(Reporte.objects.exists())
+
+        call_command('procesar_trabajos_reporte', '--una-vez', '--hilos', '1', stdout=io.StringIO())
+        estado = self.client.get(f'/api/v1/trabajos-reporte/{trabajo_id}/').json()
+        self.assertEqual((estado['estado'], estado['progreso']), ('completado', 100))
+        reporte = Reporte.objects.get()
+        self.assertEqual(estado['reporte'], reporte.pk)
+        self.assertEqual(reporte.tipo_reporte, 'resumen_inventario')
+
+    def test_tomar_en_orden_y_una_sola_vez(self):
+        primero = TrabajoReporte.objects.create(tipo_reporte='resumen_inventario')
+        segundo = TrabajoReporte.objects.create(tipo_reporte='resumen_inventario')
+        tomado = TrabajoReporte.tomar_siguiente('a')
+        self.assertEqual((tomado.pk, tomado.estado, tomado.procesador, tomado.intentos), (primero.pk, 'en_proceso', 'a', 1))
+        self.assertEqual(TrabajoReporte.tomar_siguiente('b').pk, segundo.pk)
+        self.assertIsNone(TrabajoReporte.tomar_siguiente('c'))
+
+    def test_trabajo_abandonado_vuelve_a_la_cola_hasta_agotar_intentos(self):
+        trabajo = TrabajoReporte.objects.create(tipo_reporte='resumen_inventario')
+        for intento in range(1, TrabajoReporte.MAX_INTENTOS + 1):
+            self.assertEqual(TrabajoReporte.tomar_siguiente('a').intentos, intento)
+            # Un trabajo en proceso desde después del límite sigue siendo de su procesador
+            self.assertEqual(TrabajoReporte.liberar_abandonados(timezone.now() - timedelta(minutes=30)), 0)
+            liberados = TrabajoReporte.liberar_abandonados(timezone.now() + timedelta(seconds=1))
+            trabajo.refresh_from_db()
+            if intento < TrabajoReporte.MAX_INTENTOS:
+                self.assertEqual((liberados, trabajo.estado, trabajo.procesador), (1, 'pendiente', ''))
+        self.assertEqual((liberados, trabajo.estado), (0, 'error'))
+        self.assertEqual(trabajo.mensaje_error, 'El trabajo se interrumpió demasiadas veces')
+        self.assertIsNone(TrabajoReporte.tomar_siguiente('a'))
+
+    def test_error_de_generacion_no_deja_reporte(self):
+        TrabajoReporte.objects.create(tipo_reporte='stock_fecha', parametros={'fecha': 'no es fecha'})
+        trabajo = TrabajoReporte.tomar_siguiente('a').ejecutar()
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'error')
+        self.assertIn('no es fecha', trabajo.mensaje_error)
+        self.assertIsNone(trabajo.reporte)
+        self.assertFalse(Reporte.objects.exists())
+
+
+class ExportacionTests(TestCase):
+    """Contenido de las descargas del historial en CSV y NDJSON"""
+
+    def setUp(self):
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=0, unidad_medida='kg')
+        self.ecoladrillo = Ecoladrillo.objects.create(
+            nombre='Verde, grande', descripcion='prueba', material_principal=material, cantidad_material_requerida=1
+        )
+        RegistroMaterial(fecha=FECHA_BASE, material=material, cantidad=100, origen='Compra').save()
+        # Insertados fuera de orden para comprobar el orden (fecha, id)
+        self.registros = [
+            RegistroEcoladrillo.objects.create(fecha=FECHA_BASE + timedelta(days=dias), ecoladrillo=self.ecoladrillo, cantidad=cantidad)
+            for dias, cantidad in ((2, 5), (0, 3), (2, 7), (1, 4), (0, 1))
+        ]
+        RetiroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.ecoladrillo, cantidad=2, motivo='Venta "local"').save()
+
+    def descargar(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return b''.join(respuesta.streaming_content).decode()
+
+    def test_csv_ordenado_por_fecha_e_id(self):
+        esperado = ['id_registro,fecha,ecoladrillo,ecoladrillo_nombre,cantidad'] + [
+            f'{r.pk},{r.fecha},{self.ecoladrillo.pk},"Verde, grande",{r.cantidad}'
+            for r in sorted(self.registros, key=lambda r: (r.fecha, r.pk))
+        ]
+        # Con bloques de 2 filas el recorrido cruza fechas repetidas entre un bloque y otro
+        with mock.patch('Inventario.exportacion.TAMANO_BLOQUE', 2):
+            contenido = self.descargar('/api/v1/registros-ecoladrillo/exportar/')
+        self.assertEqual(contenido.splitlines(), esperado)
+
+        contenido = self.descargar(f'/api/v1/registros-ecoladrillo/exportar/?fecha_inicio={FECHA_BASE + timedelta(days=1)}&fecha_fin={FECHA_BASE + timedelta(days=1)}')
+        self.assertEqual(contenido.splitlines()[1:], [esperado[3]])
+
+    def test_ndjson(self):
+        lineas = self.descargar('/api/v1/retiros-ecoladrillo/exportar/?formato=ndjson').splitlines()
+        self.assertEqual([json.loads(linea) for linea in lineas], [{
+            'id_retiro': RetiroEcoladrillo.objects.get().pk, 'fecha': str(FECHA_BASE), 'ecoladrillo': self.ecoladrillo.pk,
+            'ecoladrillo_nombre': 'Verde, grande', 'cantidad': 2, 'motivo': 'Venta "local"',
+        }])
+        lineas = self.descargar('/api/v1/registros-material/exportar/?formato=ndjson').splitlines()
+        self.assertEqual(json.loads(lineas[0])['origen'], 'Compra')
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/v1/registros-ecoladrillo/exportar/?formato=xml').status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/v1/registros-ecoladrillo/exportar/?fecha_inicio=2025-02-01&fecha_fin=2025-01-01').status_code, 400
+        )
+
+
+class SeleccionCamposTests(TestCase):
+    """?fields= y ?omit= recortan la respuesta y la consulta"""
+
+    def setUp(self):
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=100, unidad_medida='kg')
+        self.ecoladrillo = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='descripción larga', material_principal=material, cantidad_material_requerida=1
+        )
+        RegistroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.ecoladrillo, cantidad=3).save()
+
+    def consultar(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        sql = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+        return respuesta.json(), sql
+
+    def test_fields(self):
+        datos, sql = self.consultar('/api/v1/ecoladrillos/?fields=id_ecoladrillo,nombre,cantidad,desconocido')
+        self.assertEqual(datos['results'], [{'id_ecoladrillo': self.ecoladrillo.pk, 'nombre': 'Verde', 'cantidad': 3}])
+        self.assertNotIn('"descripcion"', sql)
+        self.assertNotIn('JOIN', sql)
+
+        datos, sql = self.consultar('/api/v1/ecoladrillos/?fields=nombre,material_principal_nombre')
+        self.assertEqual(datos['results'], [{'nombre': 'Verde', 'material_principal_nombre': 'PET'}])
+        self.assertIn('JOIN', sql)
+
+    def test_omit(self):
+        datos, sql = self.consultar('/api/v1/registros-ecoladrillo/?omit=ecoladrillo_nombre,id_registro')
+        self.assertEqual(datos['results'], [{'fecha': str(FECHA_BASE), 'ecoladrillo': self.ecoladrillo.pk, 'cantidad': 3}])
+        self.assertNotIn('JOIN', sql)
+
+    def test_sin_seleccion_y_escrituras_envian_todo(self):
+        datos, _ = self.consultar(f'/api/v1/ecoladrillos/{self.ecoladrillo.pk}/')
+        self.assertIn('descripcion', datos)
+        self.assertIn('material_principal_nombre', datos)
+        # Los parámetros solo aplican a los GET
+        respuesta = self.client.patch(
+            f'/api/v1/ecoladrillos/{self.ecoladrillo.pk}/?fields=nombre', {'nombre': 'Azul'}, content_type='application/json'
+        )
+        self.assertIn('descripcion', respuesta.json())
+
+
+class MetricasTests(TestCase):
+    """/metrics solo responde con el token, o sin token configurado en DEBUG"""
+
+    def test_sin_token_configurado(self):
+        with override_settings(METRICAS_TOKEN=None, DEBUG=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(METRICAS_TOKEN=None, DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_con_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        respuesta = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        # Las peticiones rechazadas también se midieron
+        self.assertIn('ruta="metricas",metodo="GET",estado="403"', respuesta.content.decode())
+
+
+class PerfiladoTests(TestCase):
+    """El token de perfilado solo se acepta por encabezado y no queda en el perfil guardado"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(PERFILADO_TOKEN='secreto', PERFILES_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.directorio = directorio.name
+        Operario.objects.create(nombre='Ana', email='ana@privado.com', cargo='Producción', contraseña='x')
+
+    def test_token_en_url_no_perfila(self):
+        respuesta = self.client.get('/api/v1/operarios/?perfilar=secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('X-Perfil', respuesta)
+
+    def test_perfil_sin_token_ni_parametros(self):
+        respuesta = self.client.get(
+            '/api/v1/operarios/?email=ana@privado.com', HTTP_X_PERFILAR='secreto'
+        )
+        self.assertIn('X-Perfil', respuesta)
+        nombre = respuesta['X-Perfil'].rstrip('/').rsplit('/', 1)[-1]
+        with zipfile.ZipFile(f'{self.directorio}/{nombre}') as archivo:
+            resumen = archivo.read('resumen.txt').decode()
+            consultas = json.loads(archivo.read('consultas.json'))
+        self.assertIn('GET /api/v1/operarios/?email=ana@privado.com\n', resumen)
+        self.assertNotIn('secreto', resumen)
+        self.assertTrue(consultas)
+        self.assertTrue(all(set(consulta) == {'sql', 'varias', 'ms'} for consulta in consultas))
+
+
+class ETagInventarioTests(TestCase):
+    """Los GET con ETag responden 304 mientras no cambien las tablas de su versión"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.material = Material.objects.create(
+                nombre='PET', tipo='plástico', cantidad_disponible=100, unidad_medida='kg'
+            )
+            self.ecoladrillo = Ecoladrillo.objects.create(
+                nombre='Verde', descripcion='', material_principal=self.material, cantidad_material_requerida=1
+            )
+            RegistroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.ecoladrillo, cantidad=5).save()
+
+    def etag(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+        return respuesta['ETag']
+
+    def test_escritura_cambia_el_etag(self):
+        url = '/api/v1/materiales/reporte_stock/'
+        etag = self.etag(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.patch(
+                f'/api/v1/materiales/{self.material.pk}/', {'nombre': 'PET reciclado'}, content_type='application/json'
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_retiro_solo_cambia_el_etag_de_ecoladrillos(self):
+        etag_ecoladrillos = self.etag('/api/v1/ecoladrillos/')
+        etag_materiales = self.etag('/api/v1/materiales/')
+        with self.captureOnCommitCallbacks(execute=True):
+            RetiroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=self.ecoladrillo, cantidad=2, motivo='Venta').save()
+        self.assertEqual(self.client.get('/api/v1/ecoladrillos/', HTTP_IF_NONE_MATCH=etag_ecoladrillos).status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/materiales/', HTTP_IF_NONE_MATCH=etag_materiales).status_code, 304)
+
+    def test_versiones_faltantes_se_crean_con_la_primera_escritura(self):
+        # Como después de un flush o de cargar fixtures sin la migración de datos
+        VersionInventario.objects.all().delete()
+        etag = self.etag('/api/v1/materiales/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f'/api/v1/materiales/{self.material.pk}/', {'nombre': 'PET reciclado'}, content_type='application/json'
+            )
+        self.assertEqual(
+            set(VersionInventario.objects.values_list('tabla', flat=True)), set(VersionInventario.TABLAS)
+        )
+        respuesta = self.client.get('/api/v1/materiales/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_permisos_antes_del_304(self):
+        etag = self.etag('/api/v1/materiales/')
+        with mock.patch.object(MaterialViewSet, 'permission_classes', [IsAuthenticated]):
+            respuesta = self.client.get('/api/v1/materiales/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertNotIn('ETag', respuesta)
+
+
+class RenderReportesTests(TestCase):
+    """El detalle de un reporte generado se sirve desde sus bytes guardados solo si sigue vigente"""
+
+    def setUp(self):
+        cache_reportes.limpiar()
+        cache_render_reportes.limpiar()
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post('/api/v1/reportes/generar_resumen_inventario/', {}, content_type='application/json')
+        self.url = f"/api/v1/reportes/{respuesta.json()['reporte_id']}/"
+
+    def test_borrado_invalida_el_render(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Cache-Control'], 'private, no-cache')
+        etag = respuesta['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Reporte.objects.all().delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_permisos_antes_de_la_cache(self):
+        etag = self.client.get(self.url)['ETag']
+        with mock.patch.object(ReporteViewSet, 'permission_classes', [IsAuthenticated]):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 403)
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ReportesPorSubtipoTests(TestCase):
+    """El listado y el detalle de reportes resuelven el subtipo de cada reporte"""
+
+    def setUp(self):
+        cache_render_reportes.limpiar()
+        self.operario = Operario.objects.create(nombre='Ana', email='ana@prueba.com', cargo='Producción', contraseña='x')
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=100, unidad_medida='kg')
+        ecoladrillo = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='', material_principal=material, cantidad_material_requerida=1
+        )
+        RegistroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=ecoladrillo, cantidad=5).save()
+        RetiroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=ecoladrillo, cantidad=2, motivo='Venta').save()
+        self.parametros = {}
+        for i in range(3):
+            stock = ReporteStockFecha.objects.create(
+                tipo_reporte='stock_fecha', operario=self.operario, datos_reporte={},
+                fecha_consulta=FECHA_BASE + timedelta(days=i)
+            )
+            stock.generar_datos_stock()
+            inventario = ReporteResumenInventario.objects.create(
+                tipo_reporte='resumen_inventario', operario=self.operario, datos_reporte={}
+            )
+            inventario.generar_datos_resumen()
+            retiros = ReporteResumenRetiros.objects.create(
+                tipo_reporte='resumen_retiros', datos_reporte={},
+                fecha_inicio=FECHA_BASE, fecha_fin=FECHA_BASE + timedelta(days=i)
+            )
+            retiros.generar_datos_retiros()
+            self.parametros[stock.pk] = {'fecha_consulta': str(stock.fecha_consulta)}
+            self.parametros[inventario.pk] = {}
+            self.parametros[retiros.pk] = {'fecha_inicio': str(FECHA_BASE), 'fecha_fin': str(retiros.fecha_fin)}
+
+    def test_listado_paginado_con_parametros_de_cada_subtipo(self):
+        recibidos = []
+        url = '/api/v1/reportes/?page_size=4'
+        while url:
+            datos = self.client.get(url).json()
+            self.assertLessEqual(len(datos['results']), 4)
+            recibidos += datos['results']
+            url = datos['next']
+        self.assertEqual(sorted(fila['id_reporte'] for fila in recibidos), sorted(self.parametros))
+        for fila in recibidos:
+            with self.subTest(reporte=fila['id_reporte']):
+                self.assertEqual(fila['parametros'], self.parametros[fila['id_reporte']])
+                self.assertNotIn('datos_reporte', fila)
+
+    def test_detalle_de_cada_subtipo(self):
+        campos_propios = {
+            'stock_fecha': ('fecha_consulta', 'todos_ecoladrillos'),
+            'resumen_inventario': ('resumen_estadisticas', 'ecoladrillos_con_stock'),
+            'resumen_retiros': ('fecha_inicio', 'fecha_fin', 'estadisticas'),
+        }
+        for id_reporte, parametros in self.parametros.items():
+            with self.subTest(reporte=id_reporte):
+                respuesta = self.client.get(f'/api/v1/reportes/{id_reporte}/')
+                self.assertEqual(respuesta.status_code, 200)
+                datos = respuesta.json()
+                self.assertEqual(datos['id_reporte'], id_reporte)
+                for campo in campos_propios[datos['tipo_reporte']]:
+                    self.assertIn(campo, datos)
+                for campo, valor in parametros.items():
+                    self.assertEqual(datos[campo], valor)
+                self.assertTrue(datos['datos_reporte'])
+
+        inexistente = max(self.parametros) + 1
+        self.assertEqual(self.client.get(f'/api/v1/reportes/{inexistente}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/v1/reportes/{inexistente}/ver_datos/').status_code, 404)
+
+    # Campos que repiten datos_reporte y se omiten en la forma compacta
+    DERIVADOS = {
+        'stock_fecha': ReporteStockFechaSerializer.campos_derivados,
+        'resumen_inventario': ReporteResumenInventarioSerializer.campos_derivados,
+        'resumen_retiros': ReporteResumenRetirosSerializer.campos_derivados,
+    }
+
+    def assertForma(self, datos, completa):
+        """La representación trae datos_reporte y, solo en la forma completa, los campos derivados"""
+        derivados = self.DERIVADOS[datos['tipo_reporte']]
+        self.assertTrue(datos['datos_reporte'])
+        if completa:
+            self.assertEqual(set(derivados) - set(datos), set())
+        else:
+            self.assertEqual(set(derivados) & set(datos), set())
+
+    def test_forma_compacta_y_completa(self):
+        for consulta, completa in (('', False), ('&completo=true', True)):
+            filas = self.client.get(f'/api/v1/reportes/historial/?page_size=100{consulta}').json()['results']
+            self.assertEqual(len(filas), len(self.parametros))
+            for fila in filas:
+                self.assertForma(fila, completa)
+
+        for id_reporte in self.parametros:
+            with self.subTest(reporte=id_reporte):
+                completo = self.client.get(f'/api/v1/reportes/{id_reporte}/').json()
+                self.assertForma(completo, True)
+                compacto = self.client.get(f'/api/v1/reportes/{id_reporte}/?completo=false').json()
+                self.assertForma(compacto, False)
+                self.assertEqual(compacto['datos_reporte'], completo['datos_reporte'])
+                if completo['tipo_reporte'] == 'resumen_inventario':
+                    self.assertEqual(completo['resumen_estadisticas'], completo['datos_reporte']['resumen'])
+
+    def test_forma_en_los_viewsets_por_tipo(self):
+        for ruta in ('reportes-stock-fecha', 'reportes-resumen-inventario', 'reportes-resumen-retiros'):
+            with self.subTest(ruta=ruta):
+                filas = self.client.get(f'/api/v1/{ruta}/').json()['results']
+                self.assertEqual(len(filas), 3)
+                for fila in filas:
+                    self.assertForma(fila, False)
+                for fila in self.client.get(f'/api/v1/{ruta}/?completo=true').json()['results']:
+                    self.assertForma(fila, True)
+                id_reporte = filas[0]['id_reporte']
+                self.assertForma(self.client.get(f'/api/v1/{ruta}/{id_reporte}/').json(), True)
+                self.assertForma(self.client.get(f'/api/v1/{ruta}/{id_reporte}/?completo=false').json(), False)
+
+
+class HistorialReportesTests(TestCase):
+    """Los filtros del historial devuelven los reportes pedidos y rechazan los valores inválidos"""
+
+    def setUp(self):
+        cache_render_reportes.limpiar()
+        self.ana = Operario.objects.create(nombre='Ana', email='ana@prueba.com', cargo='Producción', contraseña='x')
+        self.luis = Operario.objects.create(nombre='Luis', email='luis@prueba.com', cargo='Producción', contraseña='x')
+        self.reportes = {}
+        for nombre, tipo, operario, dia, hora in (
+            ('inventario_ana_1', 'resumen_inventario', self.ana, 1, 8),
+            ('retiros_luis_2', 'resumen_retiros', self.luis, 2, 0),
+            ('retiros_ana_2_noche', 'resumen_retiros', self.ana, 2, 23),
+            ('inventario_luis_3', 'resumen_inventario', self.luis, 3, 12),
+        ):
+            reporte = Reporte.objects.create(tipo_reporte=tipo, operario=operario, datos_reporte={'generado': True})
+            momento = timezone.make_aware(datetime.combine(FECHA_BASE + timedelta(days=dia), time(hora, 30)))
+            Reporte.objects.filter(pk=reporte.pk).update(fecha_generacion=momento)
+            self.reportes[nombre] = reporte.pk
+
+    def historial(self, consulta):
+        respuesta = self.client.get(f'/api/v1/reportes/historial/?{consulta}')
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        return {fila['id_reporte'] for fila in respuesta.json()['results']}
+
+    def ids(self, *nombres):
+        return {self.reportes[nombre] for nombre in nombres}
+
+    def test_filtros(self):
+        dia = lambda n: FECHA_BASE + timedelta(days=n)
+        self.assertEqual(self.historial('tipo=resumen_retiros'), self.ids('retiros_luis_2', 'retiros_ana_2_noche'))
+        self.assertEqual(self.historial(f'operario={self.ana.pk}'), self.ids('inventario_ana_1', 'retiros_ana_2_noche'))
+        self.assertEqual(
+            self.historial(f'fecha_desde={dia(2)}'), self.ids('retiros_luis_2', 'retiros_ana_2_noche', 'inventario_luis_3')
+        )
+        # fecha_hasta incluye todo ese día, hasta las 23:59 de la hora local
+        self.assertEqual(
+            self.historial(f'fecha_hasta={dia(2)}'), self.ids('inventario_ana_1', 'retiros_luis_2', 'retiros_ana_2_noche')
+        )
+        self.assertEqual(
+            self.historial(f'fecha_desde={dia(2)}&fecha_hasta={dia(2)}'), self.ids('retiros_luis_2', 'retiros_ana_2_noche')
+        )
+        self.assertEqual(
+            self.historial(f'tipo=resumen_inventario&operario={self.luis.pk}&fecha_desde={dia(1)}&fecha_hasta={dia(3)}'),
+            self.ids('inventario_luis_3')
+        )
+        self.assertEqual(self.historial(f'fecha_desde={dia(4)}'), set())
+
+    def test_parametros_invalidos(self):
+        for consulta in (
+            'tipo=desconocido',
+            'fecha_desde=2025-13-01',
+            'fecha_hasta=ayer',
+            'operario=ana',
+            f'fecha_desde={FECHA_BASE + timedelta(days=3)}&fecha_hasta={FECHA_BASE}',
+        ):
+            with self.subTest(consulta=consulta):
+                respuesta = self.client.get(f'/api/v1/reportes/historial/?{consulta}')
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('error', respuesta.json())
+
+
+class ResumenRetirosTests(TestCase):
+    """El resumen de retiros agrupado en SQL coincide con sumar cada retiro del período"""
+
+    def setUp(self):
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=1000, unidad_medida='kg')
+        self.ecoladrillos = [
+            Ecoladrillo.objects.create(
+                nombre=nombre, descripcion='', material_principal=material, cantidad_material_requerida=1
+            )
+            for nombre in ('Verde', 'Azul', 'Rojo')
+        ]
+        for ecoladrillo in self.ecoladrillos:
+            RegistroEcoladrillo(fecha=FECHA_BASE, ecoladrillo=ecoladrillo, cantidad=100).save()
+        for i in range(30):
+            RetiroEcoladrillo(
+                fecha=FECHA_BASE + timedelta(days=i % 10), ecoladrillo=self.ecoladrillos[i % 2 + (i % 5 == 0)],
+                cantidad=1 + i % 4, motivo='Venta'
+            ).save()
+        self.inicio, self.fin = FECHA_BASE + timedelta(days=2), FECHA_BASE + timedelta(days=7)
+
+    def generar(self, **opciones):
+        reporte = ReporteResumenRetiros.objects.create(
+            tipo_reporte='resumen_retiros', fecha_inicio=self.inicio, fecha_fin=self.fin, datos_reporte={}
+        )
+        return reporte.generar_datos_retiros(**opciones)
+
+    def test_totales_coinciden_con_los_retiros(self):
+        datos = self.generar()
+        retiros = list(RetiroEcoladrillo.objects.filter(fecha__range=(self.inicio, self.fin)))
+        esperado = {}
+        for retiro in retiros:
+            total, cantidad = esperado.get(retiro.ecoladrillo.nombre, (0, 0))
+            esperado[retiro.ecoladrillo.nombre] = (total + retiro.cantidad, cantidad + 1)
+
+        self.assertEqual(
+            {fila['nombre']: (fila['total_retirado'], fila['numero_retiros']) for fila in datos['resumen_por_ecoladrillo']},
+            esperado
+        )
+        totales = [fila['total_retirado'] for fila in datos['resumen_por_ecoladrillo']]
+        self.assertEqual(totales, sorted(totales, reverse=True))
+        self.assertEqual(datos['estadisticas'], {
+            'total_retiros': len(retiros),
+            'total_cantidad_retirada': sum(retiro.cantidad for retiro in retiros),
+            'tipos_ecoladrillos_diferentes': len(esperado),
+        })
+        self.assertEqual(sorted(fila['id_retiro'] for fila in datos['retiros']), sorted(retiro.pk for retiro in retiros))
+
+    def test_sin_detalle_mantiene_los_totales(self):
+        completo = self.generar()
+        sin_detalle = self.generar(incluir_detalle=False)
+        self.assertNotIn('retiros', sin_detalle)
+        self.assertEqual(sin_detalle['resumen_por_ecoladrillo'], completo['resumen_por_ecoladrillo'])
+        self.assertEqual(sin_detalle['estadisticas'], completo['estadisticas'])
+
+
+class PaginacionMovimientosTests(TestCase):
+    """El cursor (fecha, id) recorre todos los movimientos aunque muchos compartan la fecha"""
+
+    def setUp(self):
+        material = Material.objects.create(nombre='PET', tipo='plástico', cantidad_disponible=1000, unidad_medida='kg')
+        self.ecoladrillo = Ecoladrillo.objects.create(
+            nombre='Verde', descripcion='', material_principal=material, cantidad_material_requerida=1
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            # La mayoría en un mismo día, para que el cursor tenga que desempatar por id
+            for i in range(23):
+                fecha = FECHA_BASE if i < 17 else FECHA_BASE + timedelta(days=i % 3 + 1)
+                RegistroEcoladrillo(fecha=fecha, ecoladrillo=self.ecoladrillo, cantidad=1).save()
+        self.url = '/api/v1/registros-ecoladrillo/?page_size=5'
+
+    def recorrer(self, url, enlace):
+        """Páginas (lista de ids) siguiendo `enlace` hasta el final"""
+        paginas = []
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            datos = respuesta.json()
+            paginas.append([fila['id_registro'] for fila in datos['results']])
+            url = datos[enlace]
+        return paginas, datos
+
+    def test_ida_y_vuelta_sin_repetir_ni_saltear(self):
+        esperado = list(RegistroEcoladrillo.objects.order_by('-fecha', '-pk').values_list('pk', flat=True))
+        paginas, ultima = self.recorrer(self.url, 'next')
+        self.assertEqual([pk for pagina in paginas for pk in pagina], esperado)
+        self.assertEqual([len(pagina) for pagina in paginas], [5, 5, 5, 5, 3])
+
+        # Desde la última página hacia atrás se ven las mismas páginas en orden inverso
+        atras, primera = self.recorrer(ultima['previous'], 'previous')
+        self.assertEqual(atras, paginas[-2::-1])
+        self.assertIsNone(primera['previous'])
+
+    def test_cursor_invalido(self):
+        adulterado = base64.urlsafe_b64encode(b'2025-01-01|no-es-id|0').decode()
+        for cursor in ('basura', '%%%', adulterado, base64.urlsafe_b64encode(b'2025-02-30|1|0').decode(),
+                       base64.urlsafe_b64encode(b'\xff\xfe').decode()):
+            with self.subTest(cursor=cursor):
+                respuesta = self.client.get(f'{self.url}&cursor={cursor}')
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertEqual(respuesta.json()['error'], 'Cursor inválido')
+
+    def test_count_sigue_a_las_altas(self):
+        self.assertEqual(self.client.get(self.url).json()['count'], 23)
+        with self.captureOnCommitCallbacks(execute=True):
+            RegistroEcoladrillo(fecha=FECHA_BASE + timedelta(days=10), ecoladrillo=self.ecoladrillo, cantidad=1).save()
+        datos = self.client.get(self.url).json()
+        self.assertEqual(datos['count'], 24)
+        self.assertEqual(datos['results'][0]['id_registro'], RegistroEcoladrillo.objects.latest('pk').pk)
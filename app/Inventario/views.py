@@ -1,3 +1,49 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from .metricas import metricas
+from .perfilado import perfiles_guardados, ruta_perfil, token_valido
+
+
+@require_GET
+def exponer_metricas(request):
+    """
+    Métricas de las peticiones de este proceso en el formato de texto de Prometheus
+
+    Exige el encabezado Authorization: Bearer <token> con METRICAS_TOKEN. Sin token
+    configurado solo responde con DEBUG activo.
+    """
+    token = settings.METRICAS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_GET
+def listar_perfiles(request):
+    """Perfiles guardados por PerfiladoMiddleware, del más reciente al más antiguo (requiere el token)"""
+    if not token_valido(request):
+        return HttpResponseForbidden()
+    return JsonResponse({
+        'perfiles': [
+            {'nombre': nombre, 'url': request.build_absolute_uri(reverse('perfil', args=[nombre]))}
+            for nombre in perfiles_guardados()
+        ]
+    })
+
+
+@require_GET
+def descargar_perfil(request, nombre):
+    """Descarga un perfil (.zip con perfil.prof, resumen.txt y consultas.json; requiere el token)"""
+    if not token_valido(request):
+        return HttpResponseForbidden()
+    ruta = ruta_perfil(nombre)
+    if ruta is None:
+        raise Http404('Perfil no encontrado')
+    return FileResponse(ruta.open('rb'), as_attachment=True, filename=nombre)
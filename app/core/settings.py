@@ -36,7 +36,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Por ahora sin restricciones
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'Inventario.api.pagination.ConteoCachePagination',  # Total en caché por versión del inventario
     'PAGE_SIZE': 20,  # 20 elementos por página
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -100,6 +100,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Inventario.middleware.MedicionMiddleware',  # Server-Timing y métricas de /metrics; va primero
+    'Inventario.middleware.PerfiladoMiddleware',  # Perfil a pedido con el encabezado X-Perfilar
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -188,4 +190,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Controla la redirección por defecto de Django al hacer login/logout
 LOGIN_REDIRECT_URL = '/api/users/me/'
-LOGOUT_REDIRECT_URL = '/api-auth/login/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/api-auth/login/'
+
+# /metrics exige el encabezado Authorization: Bearer <token>; sin token solo responde con DEBUG
+METRICAS_TOKEN = os.environ.get("METRICAS_TOKEN")
+
+# Perfilado a pedido: las peticiones con X-Perfilar: <token> se atienden bajo cProfile.
+# Sin token configurado el perfilado queda desactivado.
+PERFILADO_TOKEN = os.environ.get("PERFILADO_TOKEN")
+PERFILES_DIR = os.environ.get("PERFILES_DIR", os.path.join(BASE_DIR, 'perfiles'))
+PERFILES_MAXIMO = int(os.environ.get("PERFILES_MAXIMO", default=50))  # Se borran los más antiguos
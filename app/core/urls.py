@@ -16,8 +16,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from Inventario.views import descargar_perfil, exponer_metricas, listar_perfiles
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('Inventario.api.urls')),  # API endpoints
     path('api/auth/', include('Inventario.api.auth_urls')),  # Endpoints de autenticación
+    path('metrics', exponer_metricas, name='metricas'),  # Métricas en formato Prometheus
+    path('perfiles/', listar_perfiles, name='perfiles'),  # Perfiles de peticiones (X-Perfilar)
+    path('perfiles/<str:nombre>', descargar_perfil, name='perfil'),
 ]
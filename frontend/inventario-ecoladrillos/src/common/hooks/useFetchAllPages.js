@@ -0,0 +1,32 @@
+import { useCallback } from "react";
+import { useFetch } from "@hooks/useFetch";
+
+// Convierte el enlace absoluto de `paginacion.siguiente` en una ruta relativa a /api/v1
+const toApiPath = (link) => {
+  const { pathname, search } = new URL(link, window.location.origin);
+  return `${pathname.replace(/^\/api\/v1/, "")}${search}`;
+};
+
+// Igual que useFetch para los reportes de stock paginados: sigue los enlaces
+// `paginacion.siguiente` y junta todas las páginas del listado que viene bajo `key`
+export const useFetchAllPages = (baseUrl, key, errorMessage = "Hubo un error") => {
+  const { fetchData: fetchPage, loading, error } = useFetch(baseUrl, errorMessage);
+
+  const fetchData = useCallback(async () => {
+    const first = await fetchPage();
+    if (first.fetchErrorMsg) return first;
+
+    const items = [...(first[key] || [])];
+    let next = first.paginacion?.siguiente;
+    while (next) {
+      const page = await fetchPage(toApiPath(next));
+      if (page.fetchErrorMsg) return page;
+      items.push(...(page[key] || []));
+      next = page.paginacion?.siguiente;
+    }
+
+    return { ...first, [key]: items };
+  }, [fetchPage, key]);
+
+  return { fetchData, loading, error };
+};
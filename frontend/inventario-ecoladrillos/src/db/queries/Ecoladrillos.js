@@ -1,10 +1,15 @@
 import { useFetch } from "@hooks/useFetch";
+import { useFetchAllPages } from "@hooks/useFetchAllPages";
 import { useMutation } from "@hooks/useMutation";
 
 // --- MAIN ---
 // GET ecoladrillos
 export const useGetEcoladrillos = () => {
-  return useFetch("/ecoladrillos/reporte_stock", "Error al obtener los ecoladrillos");
+  return useFetchAllPages(
+    "/ecoladrillos/reporte_stock/?page_size=1000",
+    "ecoladrillos",
+    "Error al obtener los ecoladrillos"
+  );
 };
 
 // POST/PUT/DEL ecoladrillo
@@ -1,10 +1,15 @@
 import { useFetch } from "@hooks/useFetch";
+import { useFetchAllPages } from "@hooks/useFetchAllPages";
 import { useMutation } from "@hooks/useMutation";
 
 // -- MAIN --
 // GET materiales
 export const useGetMaterials = () => {
-  return useFetch("/materiales/reporte_stock", "Error al obtener los materiales");
+  return useFetchAllPages(
+    "/materiales/reporte_stock/?page_size=1000",
+    "materiales",
+    "Error al obtener los materiales"
+  );
 };
 
 // POST/PUT/DEL ecoladrillo